@@ -1,31 +1,23 @@
+import time
+
 import vortran
 
 if __name__ == "__main__":
-    my_connection = []
     devices = vortran.get_usb_ports()
-    lasers = list()
-    if devices:
-        for device in devices:
-            if devices[device]["is_manager"]:
-                manager = device
-            else:
-                lasers.append(device)
-                print("Attaching Endpoint", device)
+    for name, device in devices.items():
+        kind = "manager" if device.is_manager else "laser"
+        print(f"Found {kind} {name} on bus {device.bus}, address {device.address}")
+
+    for laser in vortran.get_lasers():
+        is_open = laser.open_connection()
+        print(f"IS CONNECTION OPEN: {is_open}")
+        if not is_open:
+            continue
+
+        print("Power:", laser.power)
+        print("Base plate temperature:", laser.base_plate_temperature)
+        print("Faults:", laser.fault_code)
 
-    my_timeout = 500
-    my_retries = 0
-    for laser in lasers:
-        new_connection = vortran.USB_ReadWrite(
-            devices[laser],
-            my_timeout,
-            my_retries,
-            is_protocol_laser=True,
-        )
-        my_connection.append(new_connection)
-        is_open = my_connection[-1].open_connection()
-        print("IS CONNECTION OPEN: {is_open}")
-        r = my_connection[-1].send_usb(
-            cmd="LE=1",
-            writeOnly=False,
-        )
-        print(r)
+        laser.on()
+        time.sleep(1)
+        laser.off()
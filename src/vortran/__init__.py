@@ -1,4 +1,61 @@
-from .usb import get_usb_ports
-from .usb_connection import USB_ReadWrite
-from .laser import Laser, get_lasers
-from .parser import parse_output, verify_result
+"""Control Vortran Stradus lasers over USB.
+
+Submodules, and with them pyusb, are only imported when one of the
+names below is first used, so e.g. ``from vortran import parse_output``
+does not load any USB code.
+"""
+
+# public name -> submodule defining it
+_LAZY_NAMES = {
+    "get_usb_ports": "usb",
+    "VortranDevice": "usb",
+    "USB_ReadWrite": "usb_connection",
+    "Laser": "laser",
+    "get_lasers": "laser",
+    "DeviceCache": "cache",
+    "DeviceInfo": "cache",
+    "LaserStatus": "status",
+    "decode_faults": "status",
+    "parse_output": "parser",
+    "parse_key_values": "parser",
+    "verify_result": "parser",
+    "ConnectionSupervisor": "supervisor",
+    "FaultEvent": "faults",
+    "FaultWatcher": "faults",
+    "TelemetryReader": "telemetry",
+    "TelemetryWriter": "telemetry",
+    "AdaptiveTimeouts": "timeouts",
+    "RetryBudget": "retry",
+    "RetryPolicy": "retry",
+    "PowerController": "control",
+    "LaserConfig": "config",
+    "apply_configs": "config",
+    "PipelinedLasers": "manager",
+    "get_managers": "manager",
+    "PollScheduler": "scheduler",
+    "WaitResult": "waiting",
+    "SafetyWatchdog": "watchdog",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name: str):
+    # __import__ rather than importlib so -X importtime reports it
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        # submodules, e.g. vortran.laser, as with an eager __init__
+        try:
+            return __import__(f"{__name__}.{name}", fromlist=["__name__"])
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(__import__(f"{__name__}.{module}", fromlist=[name]), name)
+    # cache so the next lookup doesn't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,166 @@
+"""
+analytics.py
+
+Vectorised statistics over telemetry arrays, e.g. as returned by
+TelemetryReader.read(): power stability, thermal drift and fault
+statistics. Requires numpy.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .status import LaserStatus
+from .telemetry import FAULT_UNKNOWN
+
+
+@dataclass
+class FaultStatistics:
+    """Occurrences and total active time (in seconds) of one status bit."""
+
+    count: int
+    duration: float
+
+
+@dataclass
+class TelemetrySummary:
+    samples: int
+    mean_power: float
+    power_rms_noise: float
+    power_drift: float
+    temperature_drift: float
+    faults: dict[LaserStatus, FaultStatistics]
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over a sliding window, ignoring NaNs.
+
+    The result has ``len(values) - window + 1`` entries along the last
+    axis; windows without any valid sample are NaN.
+
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    sums = _window_sum(np.where(valid, values, 0.0), window)
+    counts = _window_sum(valid.astype(float), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Population standard deviation over a sliding window, ignoring NaNs."""
+    values = np.asarray(values, dtype=float)
+    # centre first to keep the sum of squares well conditioned
+    values = values - np.nanmean(values, axis=-1, keepdims=True)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    counts = _window_sum(valid.astype(float), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _window_sum(filled, window) / counts
+        square = _window_sum(filled**2, window) / counts
+    return np.sqrt(np.maximum(square - mean**2, 0.0))
+
+
+def rms_noise(
+    power: np.ndarray, window: int | None = None, relative: bool = False
+) -> np.ndarray | float:
+    """RMS deviation of the power from its mean.
+
+    With ``window`` the deviation is taken from a rolling mean instead,
+    so slow drift does not count as noise. With ``relative`` the result
+    is divided by the mean power.
+
+    """
+    power = np.asarray(power, dtype=float)
+    if window is None:
+        baseline = np.nanmean(power, axis=-1, keepdims=True)
+        deviation = power - baseline
+    else:
+        baseline = rolling_mean(power, window)
+        # compare each window's centre sample against the window mean
+        start = (window - 1) // 2
+        deviation = power[..., start : start + baseline.shape[-1]] - baseline
+    result = np.sqrt(np.nanmean(deviation**2, axis=-1))
+    if relative:
+        result = result / np.nanmean(power, axis=-1)
+    return result
+
+
+def drift_slope(
+    timestamps: np.ndarray, values: np.ndarray, per: float = 3600.0
+) -> np.ndarray | float:
+    """Least-squares slope of ``values`` over time, in units per ``per``
+    seconds (default: per hour).
+
+    ``values`` may be 2D with one row per laser sharing the same
+    timestamps. NaN samples are ignored.
+
+    """
+    t = np.asarray(timestamps, dtype=float)
+    y = np.asarray(values, dtype=float)
+    valid = ~np.isnan(y)
+    n = valid.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_mean = np.where(valid, t, 0.0).sum(axis=-1) / n
+        y_mean = np.where(valid, y, 0.0).sum(axis=-1) / n
+        dt = np.where(valid, t - t_mean[..., None], 0.0)
+        dy = np.where(valid, y - y_mean[..., None], 0.0)
+        slope = (dt * dy).sum(axis=-1) / (dt**2).sum(axis=-1)
+    return slope * per
+
+
+def fault_statistics(
+    timestamps: np.ndarray, faults: np.ndarray
+) -> dict[LaserStatus, FaultStatistics]:
+    """Occurrence counts and durations for every LaserStatus bit.
+
+    An occurrence is a transition from clear to set (or a bit that is
+    already set in the first sample). A sample's bits are assumed to
+    hold until the next sample. Samples with an unknown fault code are
+    skipped.
+
+    """
+    t = np.asarray(timestamps, dtype=float)
+    faults = np.asarray(faults, dtype=np.uint32)
+    known = faults != FAULT_UNKNOWN
+    t = t[known]
+    faults = faults[known]
+
+    statuses = [status for status in LaserStatus if status]
+    masks = np.array([int(s) for s in statuses], dtype=np.uint32)
+    bits = (faults[:, None] & masks) != 0
+
+    if len(faults) == 0:
+        return {s: FaultStatistics(0, 0.0) for s in statuses}
+
+    rising = bits[1:] & ~bits[:-1]
+    counts = rising.sum(axis=0) + bits[0]
+    durations = (bits[:-1] * np.diff(t)[:, None]).sum(axis=0)
+    return {
+        status: FaultStatistics(int(count), float(duration))
+        for status, count, duration in zip(statuses, counts, durations)
+    }
+
+
+def summarize(data: dict[str, np.ndarray], window: int = 100) -> TelemetrySummary:
+    """Summarise one laser's telemetry as returned by TelemetryReader.read()."""
+    t = data["timestamp"]
+    power = data["power"]
+    window = max(1, min(window, len(power)))
+    return TelemetrySummary(
+        samples=len(t),
+        mean_power=float(np.nanmean(power)) if len(power) else float("nan"),
+        power_rms_noise=float(rms_noise(power, window)) if len(power) else float("nan"),
+        power_drift=float(drift_slope(t, power)),
+        temperature_drift=float(drift_slope(t, data["base_plate_temperature"])),
+        faults=fault_statistics(t, data["fault"]),
+    )
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    cumulative = np.cumsum(values, axis=-1)
+    zero = np.zeros(values.shape[:-1] + (1,))
+    cumulative = np.concatenate([zero, cumulative], axis=-1)
+    return cumulative[..., window:] - cumulative[..., :-window]
@@ -0,0 +1,171 @@
+"""
+cache.py
+
+On-disk cache of the static metadata of each laser, so that startup
+does not have to query it again.
+"""
+
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+
+from .parser import parse_output
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceInfo:
+    """Metadata of a laser that does not change while it is in use.
+    ``updated`` is the time.time() it was read from the device.
+
+    """
+
+    laser_id: str
+    wavelength: float | None
+    rated_power: float | None
+    max_power: float | None
+    firmware_version: str | None
+    updated: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceInfo":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+
+def _first(values: list[str] | None) -> str | None:
+    return values[0] if values else None
+
+
+def _float(values: list[str] | None) -> float | None:
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def read_device_info(laser) -> DeviceInfo | None:
+    """Query the static metadata from the device. Returns None if the
+    laser id could not be read.
+
+    """
+    laser_id = _first(parse_output(laser.send_query("?LI")))
+    if laser_id is None:
+        return None
+    return DeviceInfo(
+        laser_id=laser_id,
+        wavelength=_float(parse_output(laser.send_query("?LW"))),
+        rated_power=_float(parse_output(laser.send_query("?RP"))),
+        max_power=_float(parse_output(laser.send_query("?MAXP"))),
+        firmware_version=_first(parse_output(laser.send_query("?FV"))),
+        updated=time.time(),
+    )
+
+
+class DeviceCache:
+    """JSON file mapping a device identity to its DeviceInfo.
+
+    The identity is the USB serial number if the device reports one,
+    otherwise the laser id. On ``attach`` the entry is validated with a
+    single ``?LI`` query: if the laser id matches, the cached metadata
+    is used right away; if it doesn't (or there is no entry) the
+    metadata is read from the device. Entries older than ``max_age``
+    seconds are used but re-read on a background thread.
+
+    """
+
+    def __init__(self, path: str | Path, max_age: float = 7 * 24 * 3600) -> None:
+        self.path = Path(path)
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._entries: dict[str, DeviceInfo] = {}
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            entries = {key: DeviceInfo.from_dict(value) for key, value in data.items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Failed to read device cache %s: %s", self.path, e)
+            return
+        with self._lock:
+            self._entries.update(entries)
+
+    def save(self) -> None:
+        with self._lock:
+            data = {key: asdict(info) for key, info in self._entries.items()}
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+
+    def get(self, key: str) -> DeviceInfo | None:
+        return self._entries.get(key)
+
+    def put(self, key: str, info: DeviceInfo) -> None:
+        with self._lock:
+            self._entries[key] = info
+        self.save()
+
+    def is_stale(self, info: DeviceInfo) -> bool:
+        return time.time() - info.updated > self.max_age
+
+    def attach(self, laser) -> DeviceInfo | None:
+        """Set ``laser.info`` from the cache, reading it from the device
+        where needed. The laser must be connected.
+
+        """
+        laser_id = _first(parse_output(laser.send_query("?LI")))
+        if laser_id is None:
+            return None
+        key = laser.serial_number or laser_id
+        info = self.get(key)
+        stale = False
+        if info is not None and info.laser_id == laser_id:
+            self.hits += 1
+            stale = self.is_stale(info)
+        else:
+            self.misses += 1
+            info = read_device_info(laser)
+            if info is None:
+                return None
+            self.put(key, info)
+        laser.info = info
+        # only now, or a quick refresh would be overwritten
+        if stale:
+            self._refresh_later(laser, key)
+        return info
+
+    def _refresh_later(self, laser, key: str) -> None:
+        def refresh() -> None:
+            info = read_device_info(laser)
+            if info is None:
+                logger.warning("Failed to refresh cached metadata of %s", key)
+                return
+            self.put(key, info)
+            laser.info = info
+            self.refreshes += 1
+
+        thread = threading.Thread(
+            target=refresh, name="vortran-cache-refresh", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Wait for background refreshes to finish."""
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = [t for t in self._threads if t.is_alive()]
@@ -0,0 +1,281 @@
+"""
+cli.py
+
+The ``vortran`` command line tool.
+
+Device access (and with it pyusb) is only imported once a subcommand
+needs it, so ``vortran --help`` starts quickly.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import statistics
+import sys
+import time
+
+CLEAR_SCREEN = "\x1b[H\x1b[J"
+# the values of one ?LS reply
+WATCH_KEYS = ["C", "LPS", "LCS", "EPC", "DELAY"]
+WATCH_COLUMNS = ["#", "bus", "addr"] + WATCH_KEYS
+
+
+def _open_lasers(args: argparse.Namespace) -> list[tuple[int, object]]:
+    """Open the selected lasers. Returns (index, laser) pairs, with the
+    index in the list of all lasers.
+
+    """
+    from .laser import get_lasers
+
+    lasers = get_lasers()
+    indices = range(len(lasers))
+    if args.laser is not None:
+        if args.laser >= len(lasers):
+            raise SystemExit(f"No laser with index {args.laser} ({len(lasers)} found)")
+        indices = [args.laser]
+    opened = []
+    for i in indices:
+        laser = lasers[i]
+        if laser.open_connection():
+            opened.append((i, laser))
+        else:
+            print(
+                f"Failed to open laser on bus {laser.bus}, address {laser.address}",
+                file=sys.stderr,
+            )
+    if not opened:
+        raise SystemExit("No lasers available")
+    return opened
+
+
+def _format_table(header: list[str], rows: list[list]) -> str:
+    cells = [header] + [["" if c is None else str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in cells
+    )
+
+
+def _fault_names(bitmask: int | None) -> str | None:
+    from .status import decode_faults
+
+    if bitmask is None:
+        return None
+    return ",".join(status.name for status in decode_faults(bitmask)) or "-"
+
+
+def cmd_list(args: argparse.Namespace) -> int:
+    from .usb import get_usb_ports
+
+    devices = get_usb_ports()
+    rows = [
+        [name, d.bus, d.address, "manager" if d.is_manager else "laser"]
+        for name, d in devices.items()
+    ]
+    print(_format_table(["name", "bus", "address", "type"], rows))
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    for i, laser in _open_lasers(args):
+        laser_id = laser.laser_id
+        print(f"Laser {i} (bus {laser.bus}, address {laser.address})")
+        print(f"  id:               {laser_id[0] if laser_id else None}")
+        print(f"  wavelength:       {laser.laser_wavelength} nm")
+        print(f"  power:            {laser.power} mW")
+        print(f"  max power:        {laser.laser_max_power} mW")
+        print(f"  base plate temp.: {laser.base_plate_temperature} C")
+        print(f"  emission:         {laser.on_off}")
+        print(f"  faults:           {_fault_names(laser.fault_bitmask)}")
+    return 0
+
+
+def _watch_row(index: int, laser) -> list:
+    from .laser import QUERY_VERIFY
+    from .parser import parse_key_values
+
+    # one ?LS round-trip per laser and refresh
+    status = parse_key_values(laser.send_query("?LS", QUERY_VERIFY["?LS"])) or {}
+    return [index, laser.bus, laser.address] + [status.get(key) for key in WATCH_KEYS]
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    lasers = _open_lasers(args)
+    period = 1 / args.rate
+    refreshes = 0
+    with ThreadPoolExecutor(max_workers=len(lasers)) as pool:
+        next_refresh = time.monotonic()
+        try:
+            while args.count is None or refreshes < args.count:
+                # poll all lasers in parallel, one thread per device
+                rows = list(pool.map(lambda pair: _watch_row(*pair), lasers))
+                table = _format_table(WATCH_COLUMNS, rows)
+                if not args.no_clear:
+                    sys.stdout.write(CLEAR_SCREEN)
+                print(time.strftime("%H:%M:%S"))
+                print(table, flush=True)
+                refreshes += 1
+                next_refresh += period
+                time.sleep(max(0.0, next_refresh - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def benchmark(laser, command: str, count: int) -> dict[str, float]:
+    """Time ``count`` queries of one command and return latency
+    statistics (in ms) and the query rate.
+
+    """
+    from .laser import QUERY_VERIFY
+
+    alt_list = QUERY_VERIFY.get(command, [])
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        if laser.send_query(command, alt_list) is None:
+            failures += 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max": latencies[-1],
+        "qps": count / elapsed if elapsed > 0 else float("inf"),
+        "failures": failures,
+    }
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    rows = []
+    for i, laser in _open_lasers(args):
+        for command in args.commands:
+            result = benchmark(laser, command, args.count)
+            rows.append(
+                [
+                    i,
+                    command,
+                    f"{result['mean']:.2f}",
+                    f"{result['p50']:.2f}",
+                    f"{result['p95']:.2f}",
+                    f"{result['max']:.2f}",
+                    f"{result['qps']:.1f}",
+                    result["failures"],
+                ]
+            )
+    header = ["#", "command", "mean ms", "p50 ms", "p95 ms", "max ms", "q/s", "fail"]
+    print(_format_table(header, rows))
+    return 0
+
+
+def cmd_soak(args: argparse.Namespace) -> int:
+    import logging
+
+    from .soak import SoakLimits, SoakTest
+
+    # injected faults would otherwise flood the console
+    logging.getLogger("vortran").setLevel(logging.CRITICAL)
+    limits = SoakLimits()
+    if args.max_throughput_drop is not None:
+        limits.throughput_drop = args.max_throughput_drop
+    if args.max_latency_rise is not None:
+        limits.latency_rise = args.max_latency_rise
+    test = SoakTest(
+        lasers=args.lasers,
+        duration=args.duration,
+        interval=args.interval,
+        timeout_rate=args.fault_rate,
+        error_rate=args.fault_rate,
+        garble_rate=args.fault_rate,
+        limits=limits,
+        seed=args.seed,
+    )
+
+    def progress(sample) -> None:
+        rss = "-" if sample.rss is None else f"{sample.rss / 2**20:.1f}"
+        print(
+            f"{sample.elapsed:8.1f} s  {sample.throughput:8.0f} q/s  "
+            f"p50 {sample.p50:6.2f} ms  p99 {sample.p99:6.2f} ms  "
+            f"fail {sample.failures:5d}  handlers {sample.handlers}  "
+            f"objects {sample.objects}  RSS {rss} MiB",
+            flush=True,
+        )
+
+    result = test.run(progress)
+    print(f"injected faults: {result.injected}, Laser instances: {result.instances}")
+    for problem in result.degraded:
+        print(f"DEGRADED: {problem}", file=sys.stderr)
+    return 0 if result.ok else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vortran", description="Control and monitor Vortran Stradus lasers."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="list attached lasers and managers")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("status", help="show the state of each laser")
+    p.add_argument("-l", "--laser", type=int, help="only use the laser with this index")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("watch", help="live table of all lasers")
+    p.add_argument("-l", "--laser", type=int, help="only use the laser with this index")
+    p.add_argument("-r", "--rate", type=float, default=2.0, help="refreshes per second")
+    p.add_argument("-n", "--count", type=int, help="stop after this many refreshes")
+    p.add_argument("--no-clear", action="store_true", help="don't clear the screen")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("bench", help="measure query latency and rate")
+    p.add_argument("-l", "--laser", type=int, help="only use the laser with this index")
+    p.add_argument("-n", "--count", type=int, default=100, help="queries per command")
+    p.add_argument(
+        "commands",
+        nargs="*",
+        default=["?LP", "?BPT", "?FC", "?LS"],
+        help="query commands to time",
+    )
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("soak", help="load test against emulated lasers")
+    p.add_argument("--lasers", type=int, default=4, help="number of emulated lasers")
+    p.add_argument("-d", "--duration", type=float, default=3600, help="seconds")
+    p.add_argument(
+        "-i", "--interval", type=float, default=10, help="seconds per sample"
+    )
+    p.add_argument(
+        "--fault-rate",
+        type=float,
+        default=0.01,
+        help="probability of each injected fault per transfer",
+    )
+    p.add_argument(
+        "--max-throughput-drop",
+        type=float,
+        help="allowed throughput drop, as a fraction of the start (0.3)",
+    )
+    p.add_argument(
+        "--max-latency-rise",
+        type=float,
+        help="allowed p99 latency rise, relative to the start (1.0)",
+    )
+    p.add_argument("--seed", type=int, default=0, help="seed for the injected faults")
+    p.set_defaults(func=cmd_soak)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "rate", 1) <= 0:
+        raise SystemExit("--rate must be positive")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+config.py
+
+Declarative laser configuration: read the current state, work out what
+differs and only send those commands.
+"""
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Any
+
+from .parser import parse_key_values
+
+logger = logging.getLogger(__name__)
+
+# (config field, setting key, query returning it, or None if ?LS has it)
+# in the order the settings are applied: the control mode first, as it
+# decides which setpoint is used, then setpoints before the modes that
+# make them active
+SETTINGS = [
+    ("control_mode", "C", None),
+    ("power", "LP", None),
+    ("pulse_power", "PP", "?PP"),
+    ("pulsed", "PUL", "?PUL"),
+    ("external_power_control", "EPC", None),
+    ("delay", "DELAY", None),
+]
+
+CONTROL_MODES = {"power": "0", "current": "1"}
+
+
+@dataclass
+class LaserConfig:
+    """Desired state of a laser. Fields left at None are not touched.
+
+    ``control_mode`` is "power" or "current"; powers are in mW.
+
+    """
+
+    control_mode: str | None = None
+    power: float | None = None
+    pulse_power: float | None = None
+    pulsed: bool | None = None
+    external_power_control: bool | None = None
+    delay: bool | None = None
+
+    def __post_init__(self) -> None:
+        if self.control_mode is not None and self.control_mode not in CONTROL_MODES:
+            raise ValueError(f"control_mode must be one of {list(CONTROL_MODES)}")
+
+    def settings(self) -> dict[str, str]:
+        """The requested settings as they are sent to the device."""
+        wanted = {}
+        for name, key, _ in SETTINGS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name == "control_mode":
+                wanted[key] = CONTROL_MODES[value]
+            elif isinstance(value, bool):
+                wanted[key] = str(int(value))
+            else:
+                # the device takes one decimal
+                wanted[key] = f"{value:05.1f}"
+        return wanted
+
+
+@dataclass
+class Change:
+    key: str
+    old: str | None
+    new: str
+
+
+@dataclass
+class ApplyReport:
+    """What ``apply_config`` did to one laser. ``elapsed`` is in
+    seconds; ``queries`` counts the transactions used to read the state.
+    ``unread`` lists the settings whose current value could not be read;
+    they are sent (and listed in ``changes``) regardless.
+
+    """
+
+    laser: Any
+    changes: list[Change] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    unread: list[str] = field(default_factory=list)
+    queries: int = 0
+    elapsed: float = 0.0
+    error: str | None = None
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changes)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _same(key: str, current: str | None, wanted: str) -> bool:
+    if current is None:
+        return False
+    try:
+        return round(float(current), 1) == round(float(wanted), 1)
+    except ValueError:
+        return current.strip() == wanted
+
+
+def read_state(laser, keys: Iterable[str]) -> tuple[dict[str, str], int, list[str]]:
+    """Read the current value of the given setting keys. ``?LS``
+    covers the control mode, power setting, EPC and DELAY in one
+    transaction; other keys cost one query each. Returns the values,
+    the number of queries used and the keys that could not be read.
+
+    """
+    from .laser import QUERY_VERIFY
+
+    keys = set(keys)
+    state: dict[str, str] = {}
+    queries = 0
+    if keys & {"C", "LP", "EPC", "DELAY"}:
+        status = parse_key_values(laser.send_query("?LS", QUERY_VERIFY["?LS"]))
+        queries += 1
+        if status:
+            state.update(status)
+            if "LPS" in status:
+                # compare the power setting, not the measured power
+                state["LP"] = status["LPS"]
+    for _, key, query in SETTINGS:
+        if key in keys and query is not None:
+            values = parse_key_values(laser.send_query(query))
+            queries += 1
+            if values and key in values:
+                state[key] = values[key]
+    unread = [key for _, key, _ in SETTINGS if key in keys and key not in state]
+    return state, queries, unread
+
+
+def apply_config(laser, config: LaserConfig, dry_run: bool = False) -> ApplyReport:
+    """Bring a laser to ``config``, sending only the settings that
+    differ from its current state, in the order of SETTINGS.
+
+    """
+    start = time.monotonic()
+    report = ApplyReport(laser=laser)
+    wanted = config.settings()
+    try:
+        state, report.queries, report.unread = read_state(laser, wanted)
+        if report.unread:
+            logger.warning(
+                "Failed to read the current %s, sending regardless",
+                ", ".join(report.unread),
+            )
+        for key, value in wanted.items():
+            current = state.get(key)
+            if _same(key, current, value):
+                report.unchanged.append(key)
+                continue
+            if not dry_run:
+                response = laser.send_usb(f"{key}={value}")
+                if response is None:
+                    report.error = f"No response setting {key}={value}"
+                    break
+            report.changes.append(Change(key, current, value))
+    except Exception as e:
+        logger.exception("Applying configuration failed")
+        report.error = repr(e)
+    report.elapsed = time.monotonic() - start
+    if report.changes:
+        logger.info(
+            "Applied %s in %.3f s",
+            ", ".join(f"{c.key}={c.new}" for c in report.changes),
+            report.elapsed,
+        )
+    return report
+
+
+def apply_configs(
+    lasers: list,
+    config: LaserConfig | list[LaserConfig],
+    dry_run: bool = False,
+) -> list[ApplyReport]:
+    """Apply one configuration to all lasers, or one configuration per
+    laser, with all lasers configured in parallel.
+
+    """
+    configs = config if isinstance(config, list) else [config] * len(lasers)
+    if len(configs) != len(lasers):
+        raise ValueError("Need one configuration per laser")
+    if not lasers:
+        return []
+    with ThreadPoolExecutor(max_workers=len(lasers)) as pool:
+        return list(
+            pool.map(
+                lambda args: apply_config(*args, dry_run=dry_run), zip(lasers, configs)
+            )
+        )
@@ -0,0 +1,233 @@
+"""
+control.py
+
+Closed-loop power stabilisation: a PID loop that reads the measured
+power and adjusts the power or current setting.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+import logging
+import math
+import statistics
+import threading
+import time
+
+from .laser import Laser
+from .parser import parse_output, verify_result
+
+logger = logging.getLogger(__name__)
+
+ACTUATORS = {"power": ("?LPS", "LP"), "current": ("?LCS", "LC")}
+
+
+@dataclass
+class LoopStats:
+    """Timing of the control loop over the last ``window`` iterations.
+    Times are in seconds.
+
+    """
+
+    iterations: int
+    rate: float
+    mean_period: float
+    jitter: float
+    max_period: float
+    failed_reads: int
+    writes: int
+    skipped_writes: int
+
+
+class PowerController:
+    """PID controller holding the measured laser power at a setpoint.
+
+    Each iteration costs one ``?LP`` round-trip and, only if the rounded
+    output changed, one write-only ``LP=``/``LC=`` command (no response
+    read). Neither does the flush read ordinary commands start with,
+    and the read is not retried: if no valid reply arrives within
+    ``timeout`` seconds the iteration is skipped. The output starts at
+    the current setting of the actuator and the PID terms are added to
+    it.
+
+    The setpoint is clamped to [0, laser_max_power]. The output is
+    clamped to ``output_limits`` (for the power actuator by default the
+    same range); while the output is saturated the integral only moves
+    in the direction that leaves saturation (anti-windup).
+
+    With ``rate=None`` the loop runs as fast as the device answers,
+    otherwise at most ``rate`` iterations per second.
+
+    """
+
+    def __init__(
+        self,
+        laser: Laser,
+        setpoint: float,
+        kp: float = 0.5,
+        ki: float = 1.0,
+        kd: float = 0.0,
+        actuator: str = "power",
+        output_limits: tuple[float | None, float | None] | None = None,
+        rate: float | None = None,
+        window: int = 1000,
+        timeout: float = 0.1,
+    ) -> None:
+        if actuator not in ACTUATORS:
+            raise ValueError(f"actuator must be one of {list(ACTUATORS)}")
+        self.laser = laser
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.actuator = actuator
+        self.rate = rate
+        self.timeout = timeout
+        self.max_power = laser.laser_max_power
+        if output_limits is None:
+            output_limits = (
+                (0.0, self.max_power) if actuator == "power" else (0.0, None)
+            )
+        self.output_limits = output_limits
+        self.setpoint = setpoint
+
+        query, self._command = ACTUATORS[actuator]
+        bias = parse_output(laser.send_query(query))
+        self.bias = float(bias[0]) if bias else setpoint
+        self.output = self.bias
+        self.integral = 0.0
+        self.measurement: float | None = None
+
+        self.failed_reads = 0
+        self.writes = 0
+        self.skipped_writes = 0
+        self._iterations = 0
+        self._last_error: float | None = None
+        self._last_time: float | None = None
+        self._last_written: str | None = None
+        self._periods: deque[float] = deque(maxlen=window)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def setpoint(self) -> float:
+        return self._setpoint
+
+    @setpoint.setter
+    def setpoint(self, value: float) -> None:
+        upper = self.max_power if self.max_power is not None else math.inf
+        clamped = min(max(value, 0.0), upper)
+        if clamped != value:
+            logger.warning("Setpoint %.1f clamped to %.1f", value, clamped)
+        self._setpoint = clamped
+
+    def step(self) -> float | None:
+        """Run one iteration: read, update and write. Returns the new
+        output, or None if the power could not be read.
+
+        """
+        now = time.monotonic()
+        if self._last_time is not None:
+            self._periods.append(now - self._last_time)
+        dt = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+        self._iterations += 1
+
+        power = self._read_power()
+        if power is None:
+            self.failed_reads += 1
+            return None
+        self.measurement = power
+
+        error = self.setpoint - power
+        derivative = 0.0
+        if self._last_error is not None and dt > 0:
+            derivative = (error - self._last_error) / dt
+        self._last_error = error
+
+        integral = self.integral + error * dt
+        unclamped = (
+            self.bias + self.kp * error + self.ki * integral + self.kd * derivative
+        )
+        output = self._clamp(unclamped)
+        # anti-windup: don't integrate further into saturation
+        if output == unclamped or (unclamped > output) != (error > 0):
+            self.integral = integral
+        self.output = output
+
+        self._write(output)
+        return output
+
+    def _read_power(self) -> float | None:
+        """One ``?LP`` transaction, without flush read or retries."""
+        result = self.laser.send_usb("?LP", flush=False, timeout=self.timeout)
+        if not result or not verify_result(result, ["?LP"]):
+            return None
+        value = parse_output(result)
+        try:
+            return float(value[0]) if value else None
+        except ValueError:
+            return None
+
+    def _clamp(self, value: float) -> float:
+        lower, upper = self.output_limits
+        if lower is not None:
+            value = max(value, lower)
+        if upper is not None:
+            value = min(value, upper)
+        return value
+
+    def _write(self, value: float) -> None:
+        cmd = f"{self._command}={value:05.1f}"
+        if cmd == self._last_written:
+            # the device only takes one decimal, nothing would change
+            self.skipped_writes += 1
+            return
+        self.laser.send_usb(cmd, writeOnly=True, flush=False)
+        self._last_written = cmd
+        self.writes += 1
+
+    def stats(self) -> LoopStats:
+        periods = list(self._periods)
+        mean = statistics.fmean(periods) if periods else 0.0
+        return LoopStats(
+            iterations=self._iterations,
+            rate=1 / mean if mean > 0 else 0.0,
+            mean_period=mean,
+            jitter=statistics.pstdev(periods) if len(periods) > 1 else 0.0,
+            max_period=max(periods, default=0.0),
+            failed_reads=self.failed_reads,
+            writes=self.writes,
+            skipped_writes=self.skipped_writes,
+        )
+
+    def start(self) -> None:
+        """Run the loop on a dedicated thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._last_time = None
+        self._thread = threading.Thread(
+            target=self._run, name="vortran-power-controller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        period = 1 / self.rate if self.rate else 0.0
+        next_step = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception:
+                logger.exception("Power controller iteration failed")
+            if period:
+                next_step += period
+                delay = next_step - time.monotonic()
+                if delay < 0:
+                    next_step = time.monotonic()
+                    delay = 0
+                self._stop.wait(delay)
@@ -0,0 +1,169 @@
+"""
+emulation.py
+
+An in-memory stand-in for a pyusb device that speaks the Stradus HID
+protocol. Useful for tests and for developing without hardware.
+"""
+
+from collections import deque
+import array
+import threading
+
+import usb.core
+
+from .usb_connection import USB_ReadWrite
+
+DEFAULT_VALUES = {
+    "C": "0",
+    "CC": "1",
+    "DELAY": "0",
+    "EPC": "0",
+    "FC": "0",
+    "FD": "No Faults",
+    "FP": "1.0",
+    "FV": "1.0.0",
+    "IL": "1",
+    "LC": "100.0",
+    "LCS": "100.0",
+    "LE": "0",
+    "LH": "10.0",
+    "LI": "EMULATED",
+    "LP": "50.0",
+    "LPS": "50.0",
+    "LW": "488",
+    "MAXP": "100.0",
+    "OBT": "25.0",
+    "BPT": "25.0",
+    "PP": "50.0",
+    "PUL": "0",
+    "RP": "100.0",
+}
+
+STATUS_KEYS = ["C", "LPS", "LCS", "EPC", "DELAY"]
+
+
+class _EmulatedContext:
+    """Minimal replacement for the pyusb device context used by
+    ``usb.util.claim_interface`` and ``usb.util.release_interface``.
+
+    """
+
+    def __init__(self) -> None:
+        self.claimed: set[int] = set()
+
+    def managed_claim_interface(self, device, interface) -> None:
+        self.claimed.add(interface)
+
+    def managed_release_interface(self, device, interface) -> None:
+        self.claimed.discard(interface)
+
+
+class EmulatedConnection:
+    """Emulates the control/interrupt transfers of a Stradus laser.
+
+    Commands are written with ``ctrl_transfer`` and replies are read
+    from endpoint 0x81 in 64 byte packets, just like the real device.
+    Reads fail at once when no packet is pending, unless
+    ``blocking_reads`` is set: then they wait up to their timeout like
+    libusb does (needed by a background reader). Subclasses can change
+    what is sent for a response request by overriding ``pending_reply``.
+
+    """
+
+    iSerialNumber = 3
+
+    def __init__(
+        self,
+        values: dict[str, str] | None = None,
+        bus: int = 1,
+        address: int = 1,
+        serial_number: str | None = "EMU0001",
+        blocking_reads: bool = False,
+    ) -> None:
+        self.values = dict(DEFAULT_VALUES)
+        if values:
+            self.values.update(values)
+        self.bus = bus
+        self.address = address
+        self.serial_number = serial_number
+        self.blocking_reads = blocking_reads
+        self.commands: list[str] = []
+        self.resets = 0
+        self.alive = True
+        self._ctx = _EmulatedContext()
+        self._pending = ""
+        self._packets: deque[array.array] = deque()
+        self._arrived = threading.Condition()
+
+    def is_kernel_driver_active(self, interface: int) -> bool:
+        return False
+
+    def detach_kernel_driver(self, interface: int) -> None:
+        pass
+
+    def reset(self) -> None:
+        self._check_alive()
+        self.resets += 1
+
+    def set_configuration(self) -> None:
+        self._check_alive()
+
+    def respond(self, cmd: str) -> str:
+        """Returns the reply of the device to a single command."""
+        if cmd == "?LS":
+            lines = [f"?{key}={self.values[key]}" for key in STATUS_KEYS]
+        elif cmd.startswith("?") and cmd[1:] in self.values:
+            lines = [f"{cmd}={self.values[cmd[1:]]}"]
+        elif "=" in cmd and cmd.split("=")[0] in self.values:
+            key, value = cmd.split("=", 1)
+            self.values[key] = value
+            lines = [cmd]
+        else:
+            lines = [f"{cmd}=INVALID"]
+        return "\r\n" + "\r\n".join(lines) + "\r\n\r\n"
+
+    def pending_reply(self) -> str | None:
+        """The text sent for a response request (0xA2): the reply to
+        the last command, until it is acknowledged. None sends nothing.
+
+        """
+        return self._pending
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue, wIndex, data) -> int:
+        self._check_alive()
+        op = data[0]
+        if op == USB_ReadWrite.SET_CMD_QUERY[0]:
+            cmd = bytes(data[1:]).split(b"\xff")[0].decode("ascii").strip()
+            self.commands.append(cmd)
+            self._pending = self.respond(cmd)
+        elif op == USB_ReadWrite.GET_RESPONSE_STATUS[0]:
+            self._packets.append(self._packet([0x01, 0xFF]))
+        elif op == USB_ReadWrite.GET_RESPONSE[0]:
+            reply = self.pending_reply()
+            if reply is not None:
+                payload = reply.encode("ascii")
+                for i in range(0, max(len(payload), 1), 63):
+                    self._packets.append(self._packet([0x00], payload[i : i + 63]))
+        elif op == USB_ReadWrite.SET_RESPONSE_RECEIVED[0]:
+            self._pending = ""
+        with self._arrived:
+            self._arrived.notify_all()
+        return len(data)
+
+    def read(self, endpoint: int, size: int, timeout: int | None = None) -> array.array:
+        self._check_alive()
+        if not self._packets and self.blocking_reads:
+            with self._arrived:
+                self._arrived.wait_for(lambda: self._packets, (timeout or 0) / 1000)
+            self._check_alive()
+        if not self._packets:
+            raise usb.core.USBTimeoutError("Operation timed out", -7, 110)
+        return self._packets.popleft()
+
+    def _packet(self, header: list[int], payload: bytes = b"") -> array.array:
+        data = bytes(header) + payload
+        return array.array("B", data + bytes(64 - len(data)))
+
+    def _check_alive(self) -> None:
+        if not self.alive:
+            raise usb.core.USBError("No such device", -4, 19)
@@ -0,0 +1,162 @@
+"""
+faults.py
+
+Edge-triggered fault monitoring. The fault code is polled as a
+single integer and only decoded when it changes.
+"""
+
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import threading
+import time
+
+from .laser import Laser
+from .status import LaserStatus, decode_faults
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FaultEvent:
+    """A single fault bit that was raised or cleared.
+
+    ``latency`` is an upper bound on how long the transition went
+    unnoticed: the time between the previous poll and the poll that
+    saw the change.
+
+    """
+
+    status: LaserStatus
+    active: bool
+    bitmask: int
+    previous: int
+    timestamp: float
+    latency: float
+    text: list[str] | None = None
+
+
+FaultCallback = Callable[[FaultEvent], None]
+
+
+class FaultWatcher:
+    """Polls the fault code of a laser and calls back on transitions.
+
+    Each poll is one ``?FC`` round-trip and an integer compare. Only
+    when the bitmask differs from the previous poll are the changed
+    bits decoded, ``fault_text`` read (if ``fetch_text`` is set) and
+    the callbacks called. Callbacks run on the watcher thread.
+
+    """
+
+    def __init__(
+        self,
+        laser: Laser,
+        interval: float = 0.05,
+        fetch_text: bool = True,
+        history: int = 1000,
+    ) -> None:
+        self.laser = laser
+        self.interval = interval
+        self.fetch_text = fetch_text
+        self.bitmask: int | None = None
+        self.events: deque[FaultEvent] = deque(maxlen=history)
+        self.polls = 0
+        self.failed_polls = 0
+        self.max_latency = 0.0
+        self._callbacks: list[tuple[LaserStatus | None, FaultCallback]] = []
+        self._last_poll: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_callback(
+        self, callback: FaultCallback, status: LaserStatus | None = None
+    ) -> None:
+        """Register a callback, optionally only for a single status bit."""
+        self._callbacks.append((status, callback))
+
+    def remove_callback(self, callback: FaultCallback) -> None:
+        self._callbacks = [(s, cb) for s, cb in self._callbacks if cb is not callback]
+
+    def poll(self) -> list[FaultEvent]:
+        """Read the fault code once and return (and dispatch) any
+        transitions.
+
+        """
+        bitmask = self.laser.fault_bitmask
+        now = time.monotonic()
+        previous_poll = self._last_poll
+        self._last_poll = now
+        self.polls += 1
+        if bitmask is None:
+            self.failed_polls += 1
+            return []
+
+        previous = self.bitmask
+        self.bitmask = bitmask
+        if previous is None:
+            previous = 0
+        if bitmask == previous:
+            return []
+
+        latency = 0.0 if previous_poll is None else now - previous_poll
+        self.max_latency = max(self.max_latency, latency)
+        text = self.laser.fault_text if self.fetch_text else None
+        timestamp = time.time()
+
+        events = []
+        changed = bitmask ^ previous
+        for status in decode_faults(changed):
+            events.append(
+                FaultEvent(
+                    status=status,
+                    active=bool(bitmask & status),
+                    bitmask=bitmask,
+                    previous=previous,
+                    timestamp=timestamp,
+                    latency=latency,
+                    text=text,
+                )
+            )
+        for event in events:
+            self.events.append(event)
+            self._dispatch(event)
+        return events
+
+    def _dispatch(self, event: FaultEvent) -> None:
+        for status, callback in list(self._callbacks):
+            if status is not None and status != event.status:
+                continue
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Fault callback failed for %s", event.status.name)
+
+    def start(self) -> None:
+        """Start polling on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="vortran-fault-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            self.poll()
+            next_poll += self.interval
+            delay = next_poll - time.monotonic()
+            if delay < 0:
+                # fell behind, don't try to catch up with a burst
+                next_poll = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
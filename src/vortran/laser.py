@@ -1,30 +1,29 @@
-from enum import IntFlag
+from pathlib import Path
 from typing import Any
 import logging
+import time
 
+from .cache import DeviceCache, DeviceInfo
+from .config import ApplyReport, LaserConfig, apply_config
 from .usb_connection import USB_ReadWrite
-from .usb import get_usb_ports, VortranDevice
+from .usb import get_usb_ports, map_lasers_to_managers, VortranDevice
 from .parser import parse_output, verify_result
+from .status import LaserStatus, decode_faults
+from .retry import Outcome, RetryPolicy, RetryStats
+from .timeouts import AdaptiveTimeouts
+from .waiting import (
+    WaitCondition,
+    WaitResult,
+    fault_cleared,
+    get_poller,
+    power_settled,
+    warmup_done,
+)
 
 logger = logging.getLogger(__name__)
 
-
-class LaserStatus(IntFlag):
-    EMISSION_ACTIVE = 0
-    STANDBY = 1
-    WARMUP = 2
-    OUT_OF_RANGE = 4
-    INVALID_COMMAND = 8
-    INTERLOCK_OPEN = 16
-    TEC_OFF = 32
-    DIODE_OVER_CURRENT = 64
-    DIODE_TEMPERATURE_FAULT = 128
-    BASE_PLATE_TEMPERATURE_FAULT = 256
-    BUFFER_OVERFLOW = 512
-    EEPROM_ERROR = 1024
-    WATCH_DOG_ERROR = 8192
-    FATAL_ERROR = 16384
-    DIODE_END_OF_LIFE = 32768
+# queries whose response does not echo the command itself
+QUERY_VERIFY = {"?LS": ["?C", "?LPS", "?LCS", "?EPC", "?DELAY"]}
 
 
 class Laser(USB_ReadWrite):
@@ -32,8 +31,18 @@ class Laser(USB_ReadWrite):
     wrappers around different commands. To see the possible values of
     each function result, please consult the manual.
 
+    If ``info`` is set (see DeviceCache), the static metadata (laser
+    id, wavelength, rated and maximum power, firmware version) is
+    returned from it instead of being queried.
+
     """
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.retry_policy = RetryPolicy()
+        self.retry_stats = RetryStats()
+        self.info: DeviceInfo | None = None
+
     def enable_power_control_mode(self) -> None:
         self.send_usb("C=0")
 
@@ -69,7 +78,7 @@ class Laser(USB_ReadWrite):
 
     @property
     def current(self) -> float | None:
-        curent = parse_output(self.send_query("?LC"))
+        current = parse_output(self.send_query("?LC"))
         if current:
             current = float(current[0])
         return current
@@ -137,22 +146,23 @@ class Laser(USB_ReadWrite):
     def computer_control(self) -> list[str] | None:
         return parse_output(self.send_query("?CC"))
 
+    @property
+    def fault_bitmask(self) -> int | None:
+        """Fault code as a plain integer, read in a single round-trip."""
+        fault = parse_output(self.send_query("?FC"))
+        if fault:
+            try:
+                return int(fault[0])
+            except ValueError:
+                logger.warning("Failed to parse fault code: %s", fault[0])
+        return None
+
     @property
     def fault_code(self) -> list[LaserStatus] | None:
-        self.send_query("?FC")
-        fault = self.read_usb(timeout=1)
-        if (
-            fault is not None
-            and verify_result(fault, ["?FC"]) == True
-            and parse_output(fault) is not None
-        ):
-            result = parse_output(fault)[0]  # type: ignore
-            fault = LaserStatus(
-                result
-            )  # returns an error, might require parsing to get single value
-            return list(fault)
-        else:
+        fault = self.fault_bitmask
+        if fault is None:
             return None
+        return decode_faults(fault)
 
     @property
     def fault_text(self) -> list[str] | None:
@@ -164,6 +174,8 @@ class Laser(USB_ReadWrite):
 
     @property
     def firmware_version(self) -> list[str] | None:
+        if self.info is not None and self.info.firmware_version is not None:
+            return [self.info.firmware_version]
         return parse_output(self.send_query("?FV"))
 
     @property
@@ -179,6 +191,8 @@ class Laser(USB_ReadWrite):
 
     @property
     def laser_id(self) -> list[str] | None:
+        if self.info is not None:
+            return [self.info.laser_id]
         return parse_output(self.send_query("?LI"))
 
     @property
@@ -190,12 +204,12 @@ class Laser(USB_ReadWrite):
 
     @property
     def laser_status(self) -> list[str] | None:
-        return parse_output(
-            self.send_query("?LS", alt_list=["?C", "?LPS", "?LCS", "?EPC", "?DELAY"])
-        )
+        return parse_output(self.send_query("?LS", alt_list=QUERY_VERIFY["?LS"]))
 
     @property
     def laser_wavelength(self) -> float | None:
+        if self.info is not None and self.info.wavelength is not None:
+            return self.info.wavelength
         wavelength = parse_output(self.send_query("?LW"))
         if wavelength:
             wavelength = float(wavelength[0])
@@ -203,6 +217,8 @@ class Laser(USB_ReadWrite):
 
     @property
     def laser_max_power(self) -> float | None:
+        if self.info is not None and self.info.max_power is not None:
+            return self.info.max_power
         power = parse_output(self.send_query("?MAXP"))
         if power:
             power = float(power[0])
@@ -214,40 +230,167 @@ class Laser(USB_ReadWrite):
 
     @property
     def rated_power(self) -> float | None:
+        if self.info is not None and self.info.rated_power is not None:
+            return self.info.rated_power
         power = parse_output(self.send_query("?RP"))
         if power:
             power = float(power[0])
         return power
 
+    def enable_adaptive_timeouts(
+        self, path: str | None = None, model: str | None = None, **kwargs
+    ) -> AdaptiveTimeouts:
+        """Learn response timeouts per command instead of using the fixed
+        response window. If a file is given, latencies previously saved
+        for this device model (by default ``device_model``) are loaded.
+        Further keyword arguments are passed to AdaptiveTimeouts.
+
+        """
+        kwargs.setdefault("default", self.response_timeout)
+        timeouts = AdaptiveTimeouts(**kwargs)
+        if path is not None:
+            timeouts.load(path, model or self.device_model)
+        self.timeouts = timeouts
+        return timeouts
+
+    def save_timeouts(self, path: str, model: str | None = None) -> None:
+        """Store the learned latencies for this device model."""
+        if self.timeouts is not None:
+            self.timeouts.save(path, model or self.device_model)
+
+    @property
+    def device_model(self) -> str:
+        """Wavelength, rated power and firmware version, e.g.
+        "488-100-1.0.0", shared by all lasers of the same model.
+
+        """
+        wavelength = self.laser_wavelength
+        rated_power = self.rated_power
+        firmware = self.firmware_version
+        return "-".join(
+            [
+                "unknown" if wavelength is None else f"{wavelength:g}",
+                "unknown" if rated_power is None else f"{rated_power:g}",
+                firmware[0] if firmware else "unknown",
+            ]
+        )
+
+    def apply_config(self, config: LaserConfig, dry_run: bool = False) -> ApplyReport:
+        """Bring the laser to ``config``, only sending the settings that
+        differ from the current state. See vortran.config.
+
+        """
+        return apply_config(self, config, dry_run)
+
+    def wait_until(
+        self, condition: WaitCondition, timeout: float | None = None
+    ) -> WaitResult:
+        """Wait until ``condition`` holds or ``timeout`` seconds pass.
+        Waiters on the same laser share one adaptive polling thread. See
+        vortran.waiting.
+
+        """
+        return get_poller(self).wait(condition, timeout)
+
+    def wait_for_warmup(
+        self, timeout: float | None = None, expected: float | None = None
+    ) -> WaitResult:
+        return self.wait_until(warmup_done(expected), timeout)
+
+    def wait_for_power(
+        self,
+        setpoint: float | None = None,
+        tolerance: float = 0.02,
+        timeout: float | None = None,
+        hold: float = 0.0,
+    ) -> WaitResult:
+        return self.wait_until(power_settled(setpoint, tolerance, hold=hold), timeout)
+
+    def wait_for_fault_cleared(
+        self, status: LaserStatus | None = None, timeout: float | None = None
+    ) -> WaitResult:
+        return self.wait_until(fault_cleared(status), timeout)
+
     def send_query(self, command: str, alt_list: list[str] = []) -> str | None:
         """Sends a query command to the laser and returns the
-        result. If the result is None or empty, it tries again before
-        returning None.
+        result. If the result is None or does not match the command,
+        it is retried according to ``retry_policy``: missing responses
+        are re-read first, mismatched ones re-sent, before returning
+        None.
 
         """
-        result = self.send_usb(command)
         if not alt_list:
             verify_list = [command]
         else:
             verify_list = alt_list
 
-        if (result is not None) and verify_result(result, verify_list):
-            data = result
-        else:  # if result is None or not verified, ask again
-            logger.debug("Query failed, trying second attempt for command: %s", command)
-            second_try = self.send_usb(command)
-            if (second_try is not None) and verify_result(second_try, verify_list):
-                data = second_try
-            else:
-                data = None
-
-        return data
-
-
-def get_lasers() -> list[Laser]:
+        self.retry_stats.requests += 1
+        # the whole ladder runs under one hold of the (re-entrant) lock,
+        # or a re-read could pick up another thread's response
+        with self.lock:
+            result = self.send_usb(command)
+            outcome = _classify(result, verify_list)
+            if outcome is Outcome.OK:
+                self.retry_stats.first_try += 1
+                return result
+
+            stats = self.retry_stats
+            budget = self.retry_policy.budget(command)
+            rereads = budget.rereads
+            resends = budget.resends
+            started = time.monotonic()
+            try:
+                while True:
+                    stats.record(outcome)
+                    if self.preempt.is_set():
+                        # an emergency off is waiting for the lock
+                        stats.failures += 1
+                        return None
+                    if outcome is Outcome.TIMEOUT and rereads > 0:
+                        logger.debug(
+                            "Query timed out, re-reading response: %s", command
+                        )
+                        rereads -= 1
+                        stats.rereads += 1
+                        result = self.reread_response(command)
+                        outcome = _classify(result, verify_list)
+                        if outcome is Outcome.OK:
+                            stats.reread_successes += 1
+                            return result
+                    elif resends > 0 and self.retry_policy.may_resend(command):
+                        logger.debug("Query failed, re-sending command: %s", command)
+                        resends -= 1
+                        stats.resends += 1
+                        result = self.send_usb(command)
+                        outcome = _classify(result, verify_list)
+                        if outcome is Outcome.OK:
+                            stats.resend_successes += 1
+                            return result
+                    else:
+                        if resends > 0:
+                            stats.blocked_resends += 1
+                        stats.failures += 1
+                        return None
+            finally:
+                stats.retry_time += time.monotonic() - started
+
+
+def _classify(result: str | None, verify_list: list[str]) -> Outcome:
+    if not result:
+        return Outcome.TIMEOUT
+    if verify_result(result, verify_list):
+        return Outcome.OK
+    return Outcome.MISMATCH
+
+
+def get_lasers(cache: str | Path | DeviceCache | None = None) -> list[Laser]:
     """Returns a list containing possible connections to
     lasers. First laser is index 0 of the return value.
 
+    With a ``cache`` (a DeviceCache or the path of its file) the lasers
+    are connected and their static metadata is taken from the cache,
+    see DeviceCache.attach.
+
     """
 
     connections = []
@@ -255,14 +398,18 @@ def get_lasers() -> list[Laser]:
     devices = get_usb_ports()
     lasers = []
     if devices:
+        if any(d.is_manager for d in devices.values()):
+            map_lasers_to_managers(devices)
         for device in devices:
-            if devices[device].is_manager:
-                manager = device
-            else:
+            if not devices[device].is_manager:
                 lasers.append(device)
-                logger.info("Found laser device: %s", device)
+                logger.info(
+                    "Found laser device: %s (manager: %s)",
+                    device,
+                    devices[device].manager,
+                )
 
-    my_timeout = 500
+    my_timeout = 1000
     my_retries = 0
     for laser in lasers:
         new_connection = Laser(
@@ -272,4 +419,11 @@ def get_lasers() -> list[Laser]:
             is_protocol_laser=True,
         )
         connections.append(new_connection)
+
+    if cache is not None:
+        if not isinstance(cache, DeviceCache):
+            cache = DeviceCache(cache)
+        for connection in connections:
+            if connection.open_connection():
+                cache.attach(connection)
     return connections
@@ -0,0 +1,162 @@
+"""
+manager.py
+
+Grouped access to the lasers attached to a Vortran manager device.
+"""
+
+from contextlib import ExitStack
+import logging
+
+import usb.core
+
+from .laser import Laser, QUERY_VERIFY, get_lasers
+from .parser import parse_output, verify_result
+from .usb_connection import turns_emission_on
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedLasers:
+    """The lasers attached to one manager, addressed as a group.
+
+    This does not talk to the manager device, which documents no bulk
+    command set: every laser still gets its own write, status poll and
+    response read. The transfers are pipelined instead, the command is
+    written to every laser first and then each response is collected.
+    This skips the flush read that every single ``send_usb`` starts
+    with, and lets the lasers process the command in parallel.
+
+    Lasers whose grouped response is missing or wrong fall back to a
+    normal per-laser transaction. If ``max_failed_rounds`` grouped
+    operations in a row get no good response at all, grouping is
+    switched off and all operations go through the per-laser path.
+
+    """
+
+    def __init__(
+        self, name: str | None, lasers: list[Laser], max_failed_rounds: int = 3
+    ) -> None:
+        self.name = name
+        self.lasers = lasers
+        self.grouped = True
+        self.max_failed_rounds = max_failed_rounds
+        self.grouped_ok = 0
+        self.fallbacks = 0
+        self._failed_rounds = 0
+
+    def query_all(self, command: str) -> list[str | None]:
+        """Send a query to all lasers and return the raw responses."""
+        verify_list = QUERY_VERIFY.get(command, [command])
+        results, _ = self._grouped(command, verify_list)
+        for i, laser in enumerate(self.lasers):
+            if results[i] is None:
+                self.fallbacks += 1
+                results[i] = laser.send_query(command, QUERY_VERIFY.get(command, []))
+        return results
+
+    def parse_all(self, command: str) -> list[list[str] | None]:
+        """Like query_all, but returns the parsed values."""
+        return [parse_output(result) for result in self.query_all(command)]
+
+    def send_all(self, command: str) -> list[str | None]:
+        """Send a setter to all lasers. A laser whose response is lost is
+        asked for it again, but the command is never sent twice; lasers
+        it could not be written to get it through the per-laser path.
+
+        """
+        # the reply may format the value differently, so only check the key
+        verify_list = [command.split("=")[0]]
+        results, written = self._grouped(command, verify_list)
+        for i, laser in enumerate(self.lasers):
+            if results[i] is not None:
+                continue
+            self.fallbacks += 1
+            if i in written:
+                response = laser.reread_response(command)
+            else:
+                response = laser.send_usb(command)
+            if response and verify_result(response, verify_list):
+                results[i] = response
+        return results
+
+    def _grouped(
+        self, command: str, verify_list: list[str]
+    ) -> tuple[list[str | None], set[int]]:
+        """Write the command to all lasers, then collect the responses.
+        Returns the verified responses (None where missing) and the
+        indices of the lasers the command was written to.
+
+        """
+        results: list[str | None] = [None] * len(self.lasers)
+        written: set[int] = set()
+        if not self.grouped or not self.lasers:
+            return results, written
+
+        stripped_cmd = command.lower()
+        with ExitStack() as stack:
+            # fixed lock order so two groups sharing a laser can't deadlock
+            for laser in sorted(self.lasers, key=id):
+                stack.enter_context(laser.lock)
+
+            for i, laser in enumerate(self.lasers):
+                if (
+                    laser.supervisor is not None
+                    and not laser.supervisor.ensure_connected()
+                ):
+                    continue
+                # an emergency off is in progress or has inhibited LE=1
+                # (refused and logged by the per-laser fallback)
+                if laser.preempt.is_set() or (
+                    laser.emission_inhibited.is_set() and turns_emission_on(command)
+                ):
+                    continue
+                # no flush read, but stale packets a background reader
+                # queued would be taken for the status and response
+                if laser.reader is not None and laser.reader.is_running:
+                    laser.reader.clear()
+                try:
+                    laser._write_command(command)
+                    written.add(i)
+                except usb.core.USBError as e:
+                    laser._handle_usb_error(e)
+
+            for i in sorted(written):
+                laser = self.lasers[i]
+                if laser.preempt.is_set():
+                    continue
+                try:
+                    laser._wait_status()
+                    response = laser._read_response(stripped_cmd)
+                except usb.core.USBError as e:
+                    laser._handle_usb_error(e)
+                    continue
+                if response and verify_result(response, verify_list):
+                    results[i] = response
+
+        good = sum(result is not None for result in results)
+        self.grouped_ok += good
+        if good:
+            self._failed_rounds = 0
+        else:
+            self._failed_rounds += 1
+            if self._failed_rounds >= self.max_failed_rounds:
+                logger.warning(
+                    "Grouped access via manager %s failed %d times, using per-laser access",
+                    self.name,
+                    self._failed_rounds,
+                )
+                self.grouped = False
+        return results, written
+
+
+def get_managers(lasers: list[Laser] | None = None) -> list[PipelinedLasers]:
+    """Group lasers by the manager they are attached to. Lasers without
+    a manager are returned in a group whose name is None.
+
+    """
+    if lasers is None:
+        lasers = get_lasers()
+    groups: dict[str | None, list[Laser]] = {}
+    for laser in lasers:
+        groups.setdefault(laser.manager, []).append(laser)
+    return [PipelinedLasers(name, members) for name, members in groups.items()]
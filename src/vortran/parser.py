@@ -36,3 +36,22 @@ def verify_result(input: str, command: list[str]) -> bool:
     result = all(cmd in input for cmd in command)
 
     return result
+
+
+def parse_key_values(input: str | None) -> dict[str, str] | None:
+    """Parses a response into a dictionary keyed by command name,
+    e.g. ``{"C": "0", "LPS": "50.0"}`` for a ``?LS`` response. Lines
+    without a value are skipped.
+    """
+
+    if input is None:
+        return None
+
+    result = {}
+    for line in input.splitlines():
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        result[key.strip().lstrip("?").upper()] = value.strip()
+
+    return result
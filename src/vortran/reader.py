@@ -0,0 +1,130 @@
+"""
+reader.py
+
+A background thread that drains the interrupt IN endpoint of a laser
+into a queue, so transactions wait on a condition variable instead of
+blocking in libusb.
+"""
+
+from collections import deque
+import array
+import logging
+import threading
+import time
+
+import usb.core
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_IN = 0x81
+
+
+class EndpointReader:
+    """Continuously reads packets from endpoint 0x81 of ``owner`` (a
+    USB_ReadWrite) into a bounded queue of (monotonic time, packet).
+
+    ``get`` wakes up as soon as a packet arrives. When the queue is
+    full the oldest packet is dropped and counted in ``dropped``.
+    ``clear`` also drops a packet that was already read but not yet
+    queued when it was called. Read
+    errors are passed to the owner's error handling; while the owner is
+    disconnected the reader idles and picks up the new handle once the
+    connection is re-opened.
+
+    """
+
+    def __init__(
+        self, owner, maxlen: int = 64, poll_timeout: int = 100, idle: float = 0.05
+    ) -> None:
+        self.owner = owner
+        self.poll_timeout = poll_timeout
+        self.idle = idle
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: deque[tuple[float, array.array]] = deque(maxlen=maxlen)
+        # bumped by clear(), to recognise packets read before it
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def get(self, timeout: int) -> array.array | None:
+        """Wait up to ``timeout`` ms for the next packet."""
+        packet = self.get_timestamped(timeout)
+        return None if packet is None else packet[1]
+
+    def get_timestamped(self, timeout: int) -> tuple[float, array.array] | None:
+        deadline = time.monotonic() + timeout / 1000
+        with self._cond:
+            while not self._queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_running:
+                    return None
+                self._cond.wait(remaining)
+            return self._queue.popleft()
+
+    def clear(self) -> int:
+        """Drop all queued packets, returning how many there were."""
+        with self._cond:
+            count = len(self._queue)
+            self._queue.clear()
+            self._generation += 1
+        if count:
+            logger.debug("Discarded %d stale packets", count)
+        return count
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        name = f"vortran-reader-{self.owner.bus}-{self.owner.address}"
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            connection = self.owner.connection
+            if connection is None or not self.owner.is_connected:
+                self._stop.wait(self.idle)
+                continue
+            try:
+                packet = connection.read(ENDPOINT_IN, 64, self.poll_timeout)
+            except usb.core.USBTimeoutError:
+                continue
+            except usb.core.USBError as e:
+                self.errors += 1
+                logger.debug("Reader USB error: %s", e.args)
+                self.owner._handle_usb_error(e)
+                self._stop.wait(self.idle)
+                continue
+            # a clear() between the read returning and the packet being
+            # queued means it was sent before the next command
+            self._put(packet, self._generation)
+
+    def _put(self, packet: array.array, generation: int) -> None:
+        """Queue a packet, unless clear() was called since it was read."""
+        with self._cond:
+            if generation != self._generation:
+                logger.debug("Discarded a packet read before clear()")
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append((time.monotonic(), packet))
+            self.received += 1
+            self._cond.notify_all()
@@ -0,0 +1,103 @@
+"""
+reassembly.py
+
+Collects a response that spans several 64 byte HID packets.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# bytes of payload per packet after the report byte
+PAYLOAD_SIZE = 63
+
+
+class ResponseBuffer:
+    """Accumulates packet payloads into a preallocated bytearray.
+
+    A packet whose payload is shorter than PAYLOAD_SIZE (i.e. padded
+    with 0x00) is the last packet of a message; a full packet means
+    more may follow. A response is complete when a short packet arrives
+    after a line end or the echoed command was seen, or when no further
+    packet arrives after a full packet that ends a line.
+
+    Scanning for the line end and the echo is incremental, so each byte
+    is looked at only once however many packets a response has. At most
+    ``max_size`` bytes are kept; the rest of an oversized response is
+    dropped and ``overflow`` set.
+
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.max_size = max_size
+        self._buffer = bytearray(max_size)
+        self.reset()
+
+    def reset(self, echo: str = "") -> None:
+        """Start a new response, optionally completing on ``echo``
+        (compared case-insensitively).
+
+        """
+        self.size = 0
+        self.packets = 0
+        self.overflow = False
+        self.has_line_end = False
+        self.has_echo = False
+        self._echo = echo.lower().encode("ascii")
+        self._scanned = 0
+        self._last_full = False
+
+    def feed(self, payload) -> bool:
+        """Add the payload of one packet (without the report byte).
+        Returns True once the response is complete.
+
+        """
+        payload = bytes(payload)
+        length = payload.find(0)
+        if length < 0:
+            length = len(payload)
+        self.packets += 1
+        # data after the first NUL is padding, drop it
+        chunk = payload[:length]
+        short = length < PAYLOAD_SIZE
+
+        room = self.max_size - self.size
+        if len(chunk) > room:
+            if not self.overflow:
+                logger.warning(
+                    "Response longer than %d bytes, truncating", self.max_size
+                )
+            self.overflow = True
+            chunk = chunk[:room]
+        self._buffer[self.size : self.size + len(chunk)] = chunk
+        self.size += len(chunk)
+        self._scan()
+
+        self._last_full = not short
+        return (short and (self.has_line_end or self.has_echo)) or self.overflow
+
+    def timed_out_read(self) -> bool:
+        """Call when a read returned no packet. Returns True if the
+        response can be considered complete: the last packet was full
+        and ended a line, so no padding packet is coming.
+
+        """
+        return (
+            self._last_full
+            and self.size > 0
+            and self._buffer[self.size - 1] == ord("\n")
+        )
+
+    def _scan(self) -> None:
+        if not self.has_line_end:
+            if self._buffer.find(b"\n", self._scanned, self.size) >= 0:
+                self.has_line_end = True
+        if self._echo and not self.has_echo:
+            # the echo may straddle two packets
+            start = max(0, self._scanned - len(self._echo) + 1)
+            if self._echo in self._buffer[start : self.size].lower():
+                self.has_echo = True
+        self._scanned = self.size
+
+    def text(self) -> str:
+        return self._buffer[: self.size].decode("latin-1")
@@ -0,0 +1,77 @@
+"""
+retry.py
+
+Retry policy for queries: decide whether a failed response should be
+re-read or the command re-sent, and keep track of what retries cost.
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+
+from .timeouts import command_key
+
+
+class Outcome(Enum):
+    OK = "ok"
+    TIMEOUT = "timeout"
+    MISMATCH = "mismatch"
+
+
+@dataclass
+class RetryBudget:
+    rereads: int = 1
+    resends: int = 1
+
+
+@dataclass
+class RetryPolicy:
+    """How to retry a command whose response was missing or wrong.
+
+    A timeout (no response) is first answered with up to ``rereads``
+    cheap re-reads of the pending response (0xA2), since the reply may
+    just have been late. A mismatch (a response that does not belong
+    to the command) or running out of re-reads leads to re-sending the
+    command up to ``resends`` times, but only for idempotent commands:
+    queries, plus setters listed in ``idempotent``.
+
+    ``budgets`` overrides the retry counts per command, keyed like
+    ``command_key`` (e.g. ``"?FD"`` or ``"LP="``).
+
+    """
+
+    rereads: int = 1
+    resends: int = 1
+    budgets: dict[str, RetryBudget] = field(default_factory=dict)
+    idempotent: set[str] = field(default_factory=set)
+
+    def budget(self, cmd: str) -> RetryBudget:
+        return self.budgets.get(
+            command_key(cmd), RetryBudget(self.rereads, self.resends)
+        )
+
+    def may_resend(self, cmd: str) -> bool:
+        key = command_key(cmd)
+        return key.startswith("?") or key in self.idempotent
+
+
+@dataclass
+class RetryStats:
+    """What retries did and cost; times are in seconds."""
+
+    requests: int = 0
+    first_try: int = 0
+    timeouts: int = 0
+    mismatches: int = 0
+    rereads: int = 0
+    reread_successes: int = 0
+    resends: int = 0
+    resend_successes: int = 0
+    failures: int = 0
+    blocked_resends: int = 0
+    retry_time: float = 0.0
+
+    def record(self, outcome: Outcome) -> None:
+        if outcome is Outcome.TIMEOUT:
+            self.timeouts += 1
+        elif outcome is Outcome.MISMATCH:
+            self.mismatches += 1
@@ -0,0 +1,281 @@
+"""
+scheduler.py
+
+Polls properties of many lasers at individual rates, with one worker
+thread per USB bus.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any
+
+from .laser import Laser
+
+logger = logging.getLogger(__name__)
+
+# polls per second; laser_hours only changes slowly
+DEFAULT_RATES = {
+    "fault_bitmask": 20.0,
+    "power": 5.0,
+    "base_plate_temperature": 1.0,
+    "optical_block_temperature": 1.0,
+    "laser_hours": 1 / 3600,
+}
+
+SampleCallback = Callable[[Laser, str, Any], None]
+
+
+@dataclass(order=True)
+class _Task:
+    release: float
+    deadline: float = field(compare=False)
+    period: float = field(compare=False)
+    laser: Laser = field(compare=False)
+    name: str = field(compare=False)
+    active: bool = field(default=True, compare=False)
+
+
+@dataclass
+class BusStats:
+    """Load of one bus worker. Times are in seconds; ``utilisation`` is
+    the fraction of wall time spent in transactions.
+
+    """
+
+    bus: int | None
+    polls: int
+    failures: int
+    missed_deadlines: int
+    busy_time: float
+    utilisation: float
+    max_lateness: float
+
+
+class _BusWorker:
+    """Runs the tasks of one bus in earliest-deadline-first order.
+
+    A task is released once per period and its deadline is the end of
+    that period. Among the released tasks the one with the earliest
+    deadline runs next. A poll that finishes after its deadline counts
+    as a missed deadline; periods skipped entirely because the bus fell
+    behind count as missed as well, and are not made up with a burst.
+
+    """
+
+    def __init__(self, bus: int | None, scheduler: "PollScheduler") -> None:
+        self.bus = bus
+        self.scheduler = scheduler
+        self.tasks: list[_Task] = []
+        self._waiting: list[_Task] = []
+        self._ready: list[tuple[float, int, _Task]] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self.polls = 0
+        self.failures = 0
+        self.missed_deadlines = 0
+        self.busy_time = 0.0
+        self.max_lateness = 0.0
+        self.started: float | None = None
+
+    def add(self, task: _Task) -> None:
+        with self._cond:
+            self.tasks.append(task)
+            self._release(task)
+
+    def _release(self, task: _Task) -> None:
+        with self._cond:
+            heapq.heappush(self._waiting, task)
+            self._cond.notify()
+
+    def remove(self, laser: Laser, name: str | None = None) -> None:
+        with self._cond:
+            for task in self.tasks:
+                if task.laser is laser and name in (None, task.name):
+                    # dropped lazily when it comes up in the heaps
+                    task.active = False
+            self.tasks = [task for task in self.tasks if task.active]
+
+    def _next(self) -> _Task | None:
+        """Block until a task is released; None once stopped."""
+        stop = self.scheduler._stop
+        with self._cond:
+            while not stop.is_set():
+                now = self.scheduler.clock()
+                while self._waiting and self._waiting[0].release <= now:
+                    task = heapq.heappop(self._waiting)
+                    heapq.heappush(
+                        self._ready, (task.deadline, next(self._counter), task)
+                    )
+                while self._ready:
+                    task = heapq.heappop(self._ready)[2]
+                    if task.active:
+                        return task
+                delay = self._waiting[0].release - now if self._waiting else None
+                self._cond.wait(delay)
+        return None
+
+    def run_once(self, task: _Task) -> None:
+        clock = self.scheduler.clock
+        start = clock()
+        self.max_lateness = max(self.max_lateness, start - task.release)
+        value = None
+        try:
+            value = getattr(task.laser, task.name)
+        except Exception:
+            logger.exception("Polling %s failed", task.name)
+        finished = clock()
+        self.busy_time += finished - start
+        self.polls += 1
+        if value is None:
+            self.failures += 1
+        if finished > task.deadline:
+            self.missed_deadlines += 1
+        self.scheduler._record(task.laser, task.name, value)
+
+        # release the next period; skip periods already over
+        release = task.release + task.period
+        if release + task.period <= finished:
+            skipped = int((finished - release) // task.period)
+            self.missed_deadlines += skipped
+            release += skipped * task.period
+        task.release = release
+        task.deadline = release + task.period
+        if task.active:
+            self._release(task)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.started = self.scheduler.clock()
+        name = f"vortran-poll-bus-{self.bus}"
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float | None = None) -> None:
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while (task := self._next()) is not None:
+            self.run_once(task)
+
+    def stats(self) -> BusStats:
+        now = self.scheduler.clock()
+        elapsed = now - self.started if self.started is not None else 0.0
+        return BusStats(
+            bus=self.bus,
+            polls=self.polls,
+            failures=self.failures,
+            missed_deadlines=self.missed_deadlines,
+            busy_time=self.busy_time,
+            utilisation=self.busy_time / elapsed if elapsed > 0 else 0.0,
+            max_lateness=self.max_lateness,
+        )
+
+
+class PollScheduler:
+    """Polls laser properties at per-property rates.
+
+    ``rates`` maps property names of ``Laser`` to polls per second and
+    applies to every laser added; ``add`` can override single entries.
+    All transactions on one USB bus are run by a single worker thread,
+    so a busy bus cannot starve the others and a bus is never shared by
+    competing threads. The latest value of each property is kept in
+    ``values`` and passed to ``callback`` (called on the bus worker).
+    Releases and deadlines are taken from ``clock``.
+
+    """
+
+    def __init__(
+        self,
+        lasers: list[Laser] | None = None,
+        rates: dict[str, float] | None = None,
+        callback: SampleCallback | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.callback = callback
+        self.clock = clock
+        self.values: dict[tuple[Laser, str], Any] = {}
+        self.timestamps: dict[tuple[Laser, str], float] = {}
+        self._workers: dict[int | None, _BusWorker] = {}
+        self._stop = threading.Event()
+        self._running = False
+        for laser in lasers or []:
+            self.add(laser)
+
+    def add(self, laser: Laser, rates: dict[str, float] | None = None) -> None:
+        """Schedule the properties of a laser, using ``rates`` in
+        addition to (or instead of) the scheduler-wide rates.
+
+        """
+        merged = {**self.rates, **(rates or {})}
+        worker = self._workers.get(laser.bus)
+        if worker is None:
+            worker = self._workers[laser.bus] = _BusWorker(laser.bus, self)
+            if self._running:
+                worker.start()
+        now = self.clock()
+        for name, rate in merged.items():
+            if rate <= 0:
+                continue
+            if not hasattr(type(laser), name):
+                raise ValueError(f"Laser has no property {name!r}")
+            period = 1 / rate
+            worker.add(_Task(now, now + period, period, laser, name))
+
+    def remove(self, laser: Laser, name: str | None = None) -> None:
+        """Stop polling a laser, or only one of its properties."""
+        worker = self._workers.get(laser.bus)
+        if worker is not None:
+            worker.remove(laser, name)
+
+    def _record(self, laser: Laser, name: str, value: Any) -> None:
+        key = (laser, name)
+        self.values[key] = value
+        self.timestamps[key] = time.time()
+        if self.callback is not None:
+            try:
+                self.callback(laser, name, value)
+            except Exception:
+                logger.exception("Poll callback failed for %s", name)
+
+    def get(self, laser: Laser, name: str) -> Any:
+        """Latest polled value, or None if not polled yet."""
+        return self.values.get((laser, name))
+
+    @property
+    def buses(self) -> list[int | None]:
+        return list(self._workers)
+
+    def stats(self) -> dict[int | None, BusStats]:
+        return {bus: worker.stats() for bus, worker in self._workers.items()}
+
+    def start(self) -> None:
+        """Start one worker thread per bus."""
+        self._stop.clear()
+        self._running = True
+        for worker in self._workers.values():
+            worker.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._running = False
+        for worker in self._workers.values():
+            worker.join(timeout)
+
+    def __enter__(self) -> "PollScheduler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
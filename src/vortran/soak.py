@@ -0,0 +1,352 @@
+"""
+soak.py
+
+Long-running load test against emulated lasers with injected faults.
+Tracks throughput, latency, logging handlers, Python objects and the
+resident memory over time and reports any that degrade.
+"""
+
+from dataclasses import dataclass, field
+import gc
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+
+import usb.core
+
+from .emulation import EmulatedConnection
+from .laser import Laser
+from .usb import VortranDevice
+
+logger = logging.getLogger(__name__)
+
+# commands sent by each worker, round-robin
+WORKLOAD = ["power", "fault_bitmask", "laser_status", "base_plate_temperature", "set"]
+
+
+class FaultInjectingConnection(EmulatedConnection):
+    """Emulated laser that randomly drops responses (a timeout), fails
+    transfers with a USBError, or garbles response packets.
+
+    The error is LIBUSB_ERROR_PIPE, which is not a disconnect, so the
+    laser keeps being used. Faults are drawn from a seeded generator so
+    a run can be repeated.
+
+    """
+
+    def __init__(
+        self,
+        timeout_rate: float = 0.0,
+        error_rate: float = 0.0,
+        garble_rate: float = 0.0,
+        seed: int | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.timeout_rate = timeout_rate
+        self.error_rate = error_rate
+        self.garble_rate = garble_rate
+        self.injected = {"timeout": 0, "error": 0, "garble": 0}
+        self._random = random.Random(seed)
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue, wIndex, data) -> int:
+        if self._random.random() < self.error_rate:
+            self.injected["error"] += 1
+            raise usb.core.USBError("Pipe error", -9, 32)
+        return super().ctrl_transfer(bmRequestType, bRequest, wValue, wIndex, data)
+
+    def pending_reply(self) -> str | None:
+        reply = super().pending_reply()
+        if self._random.random() < self.timeout_rate:
+            self.injected["timeout"] += 1
+            return None
+        if reply and self._random.random() < self.garble_rate:
+            self.injected["garble"] += 1
+            return self._garble(reply)
+        return reply
+
+    def _garble(self, text: str) -> str:
+        chars = list(text)
+        for _ in range(max(1, len(chars) // 8)):
+            position = self._random.randrange(len(chars))
+            chars[position] = chr(self._random.randrange(33, 127))
+        return "".join(chars)
+
+
+@dataclass
+class SoakSample:
+    """Measurements over one interval of a soak run. Latencies are in
+    ms, ``rss`` in bytes (None where it can't be read).
+
+    """
+
+    elapsed: float
+    transactions: int
+    failures: int
+    exceptions: int
+    throughput: float
+    p50: float
+    p99: float
+    handlers: int
+    objects: int
+    rss: int | None
+
+
+@dataclass
+class SoakLimits:
+    """How much a metric may get worse between the start and the end
+    of a run before it counts as degraded. Ratios are relative to the
+    start; ``rss`` is in bytes.
+
+    """
+
+    throughput_drop: float = 0.3
+    latency_rise: float = 1.0
+    objects_growth: float = 0.1
+    rss_growth: int = 20 * 1024 * 1024
+    handlers_growth: int = 0
+
+
+@dataclass
+class SoakResult:
+    samples: list[SoakSample] = field(default_factory=list)
+    degraded: list[str] = field(default_factory=list)
+    injected: dict[str, int] = field(default_factory=dict)
+    instances: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.degraded
+
+
+def handler_count() -> int:
+    """Number of handlers attached to all loggers."""
+    loggers = [logging.getLogger()] + [
+        lg
+        for lg in logging.Logger.manager.loggerDict.values()
+        if isinstance(lg, logging.Logger)
+    ]
+    return sum(len(lg.handlers) for lg in loggers)
+
+
+def resident_memory() -> int | None:
+    """Current resident set size in bytes, on Linux only."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import resource
+
+    return pages * resource.getpagesize()
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def check_degradation(samples: list[SoakSample], limits: SoakLimits) -> list[str]:
+    """Compare the first and last quarter of the samples. Returns a
+    description of each metric that got worse than ``limits`` allow.
+
+    """
+    if len(samples) < 2:
+        return []
+    n = max(1, len(samples) // 4)
+    first, last = samples[:n], samples[-n:]
+
+    def median(window, name):
+        values = [getattr(s, name) for s in window if getattr(s, name) is not None]
+        return statistics.median(values) if values else None
+
+    degraded = []
+    before, after = median(first, "throughput"), median(last, "throughput")
+    if before and after < before * (1 - limits.throughput_drop):
+        degraded.append(f"throughput dropped from {before:.0f}/s to {after:.0f}/s")
+    before, after = median(first, "p99"), median(last, "p99")
+    if before and after > before * (1 + limits.latency_rise):
+        degraded.append(f"p99 latency rose from {before:.2f} ms to {after:.2f} ms")
+    before, after = first[0].handlers, samples[-1].handlers
+    if after - before > limits.handlers_growth:
+        degraded.append(f"logging handlers grew from {before} to {after}")
+    before, after = median(first, "objects"), median(last, "objects")
+    if before and after > before * (1 + limits.objects_growth):
+        degraded.append(f"live objects grew from {before:.0f} to {after:.0f}")
+    before, after = median(first, "rss"), median(last, "rss")
+    if before and after and after - before > limits.rss_growth:
+        degraded.append(f"RSS grew by {(after - before) / 2**20:.1f} MiB")
+    return degraded
+
+
+class _Worker:
+    def __init__(self, index: int, harness: "SoakTest") -> None:
+        self.index = index
+        self.harness = harness
+        self.laser = harness._new_laser(index)
+        self.generation = harness._generation
+        self.thread = threading.Thread(
+            target=self._run, name=f"vortran-soak-{index}", daemon=True
+        )
+
+    def _run(self) -> None:
+        harness = self.harness
+        step = 0
+        while not harness._stop.is_set():
+            if self.generation != harness._generation:
+                # replace the laser, as a long-running service would
+                # after a reconnect, to catch per-instance leaks
+                self.generation = harness._generation
+                self.laser = harness._new_laser(self.index)
+            kind = WORKLOAD[step % len(WORKLOAD)]
+            step += 1
+            start = time.perf_counter()
+            raised = False
+            try:
+                if kind == "set":
+                    ok = self.laser.send_query(f"LP={step % 100:05.1f}") is not None
+                else:
+                    ok = getattr(self.laser, kind) is not None
+            except Exception:
+                # e.g. a garbled value that still echoed the command
+                logger.debug("Soak transaction %s raised", kind, exc_info=True)
+                ok = False
+                raised = True
+            harness._record((time.perf_counter() - start) * 1000, ok, raised)
+
+
+class SoakTest:
+    """Drives ``lasers`` emulated lasers, one thread each, for
+    ``duration`` seconds and takes a SoakSample every ``interval``
+    seconds. Every ``recreate_every`` intervals all Laser instances are
+    replaced by new ones.
+
+    """
+
+    def __init__(
+        self,
+        lasers: int = 4,
+        duration: float = 3600.0,
+        interval: float = 10.0,
+        timeout_rate: float = 0.01,
+        error_rate: float = 0.01,
+        garble_rate: float = 0.01,
+        recreate_every: int = 1,
+        response_timeout: int = 20,
+        limits: SoakLimits | None = None,
+        seed: int | None = 0,
+    ) -> None:
+        self.lasers = lasers
+        self.duration = duration
+        self.interval = interval
+        self.fault_rates = dict(
+            timeout_rate=timeout_rate, error_rate=error_rate, garble_rate=garble_rate
+        )
+        self.recreate_every = recreate_every
+        self.response_timeout = response_timeout
+        self.limits = limits or SoakLimits()
+        self.seed = seed
+        self.result = SoakResult()
+        self._connections: dict[int, FaultInjectingConnection] = {}
+        self._injected: dict[str, int] = {}
+        self._latencies: list[float] = []
+        self._failures = 0
+        self._exceptions = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._generation = 0
+
+    def _new_laser(self, index: int) -> Laser:
+        device = VortranDevice(0x201A, 0x1001, bus=1, address=index + 1)
+        laser = Laser(device, self.response_timeout, 0)
+        seed = (
+            None if self.seed is None else self.seed + index + 1000 * self._generation
+        )
+        connection = FaultInjectingConnection(seed=seed, **self.fault_rates)
+        laser.connection = connection
+        laser.is_connected = True
+        with self._lock:
+            self._retire(index)
+            self._connections[index] = connection
+            self.result.instances += 1
+        return laser
+
+    def _retire(self, index: int) -> None:
+        """Add up the faults injected into a replaced connection."""
+        connection = self._connections.pop(index, None)
+        if connection is not None:
+            for kind, count in connection.injected.items():
+                self._injected[kind] = self._injected.get(kind, 0) + count
+
+    def _record(self, latency: float, ok: bool, raised: bool) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            if not ok:
+                self._failures += 1
+            if raised:
+                self._exceptions += 1
+
+    def _sample(self, elapsed: float, period: float) -> SoakSample:
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+            failures, self._failures = self._failures, 0
+            exceptions, self._exceptions = self._exceptions, 0
+        latencies.sort()
+        gc.collect()
+        return SoakSample(
+            elapsed=elapsed,
+            transactions=len(latencies),
+            failures=failures,
+            exceptions=exceptions,
+            throughput=len(latencies) / period if period > 0 else 0.0,
+            p50=_percentile(latencies, 0.5),
+            p99=_percentile(latencies, 0.99),
+            handlers=handler_count(),
+            objects=len(gc.get_objects()),
+            rss=resident_memory(),
+        )
+
+    def run(self, progress=None) -> SoakResult:
+        """Run the test. ``progress`` is called with every sample."""
+        workers = [_Worker(i, self) for i in range(self.lasers)]
+        start = time.monotonic()
+        last = start
+        for worker in workers:
+            worker.thread.start()
+        try:
+            intervals = 0
+            end = start + self.duration
+            while True:
+                # sample on a fixed grid; taking a sample takes time too.
+                # The last sample is always taken at the end of the run.
+                next_sample = min(start + (intervals + 1) * self.interval, end)
+                self._stop.wait(max(0.0, next_sample - time.monotonic()))
+                now = time.monotonic()
+                sample = self._sample(now - start, now - last)
+                last = now
+                self.result.samples.append(sample)
+                if progress is not None:
+                    progress(sample)
+                if now >= end:
+                    break
+                intervals += 1
+                if self.recreate_every and intervals % self.recreate_every == 0:
+                    self._generation += 1
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.thread.join()
+
+        for index in list(self._connections):
+            self._retire(index)
+        self.result.injected = dict(self._injected)
+        self.result.degraded = check_degradation(self.result.samples, self.limits)
+        for problem in self.result.degraded:
+            logger.error("Soak test degradation: %s", problem)
+        return self.result
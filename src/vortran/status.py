@@ -0,0 +1,31 @@
+"""
+status.py
+
+Status bits reported in the laser fault code (``?FC``). Kept free of
+USB imports so offline tools can use it.
+"""
+
+from enum import IntFlag
+
+
+class LaserStatus(IntFlag):
+    EMISSION_ACTIVE = 0
+    STANDBY = 1
+    WARMUP = 2
+    OUT_OF_RANGE = 4
+    INVALID_COMMAND = 8
+    INTERLOCK_OPEN = 16
+    TEC_OFF = 32
+    DIODE_OVER_CURRENT = 64
+    DIODE_TEMPERATURE_FAULT = 128
+    BASE_PLATE_TEMPERATURE_FAULT = 256
+    BUFFER_OVERFLOW = 512
+    EEPROM_ERROR = 1024
+    WATCH_DOG_ERROR = 8192
+    FATAL_ERROR = 16384
+    DIODE_END_OF_LIFE = 32768
+
+
+def decode_faults(bitmask: int) -> list[LaserStatus]:
+    """Returns the individual status bits set in a fault code."""
+    return [status for status in LaserStatus if status and bitmask & status]
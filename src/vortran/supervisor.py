@@ -0,0 +1,201 @@
+"""
+supervisor.py
+
+Keeps a USB connection alive: detects dead handles, reconnects with
+exponential backoff and records downtime and reconnect latency.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+import logging
+import threading
+import time
+
+import usb.core
+import usb.util
+
+from .usb import get_usb_backend
+from .usb_connection import USB_ReadWrite
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconnectMetrics:
+    """Statistics about disconnects and recoveries of one connection.
+    Times are in seconds.
+
+    """
+
+    disconnects: int = 0
+    reconnects: int = 0
+    failed_attempts: int = 0
+    reclaims: int = 0
+    reopens: int = 0
+    full_resets: int = 0
+    relocations: int = 0
+    total_downtime: float = 0.0
+    last_downtime: float | None = None
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=100))
+
+    @property
+    def mean_latency(self) -> float | None:
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies)
+
+
+class ConnectionSupervisor:
+    """Supervises a USB_ReadWrite (or Laser) connection.
+
+    Once attached, every ``send_usb`` call first makes sure the
+    connection is alive. Recovery escalates from the cheapest to the
+    most expensive step:
+
+    1. re-claim the interface on the existing handle,
+    2. re-open the device without a reset (re-finding it by serial
+       number if its bus address changed),
+    3. re-open the device with a full reset.
+
+    Between failed rounds the supervisor waits with exponential
+    backoff, starting at ``base_delay`` and capped at ``max_delay``.
+
+    """
+
+    def __init__(
+        self,
+        connection: USB_ReadWrite,
+        base_delay: float = 0.05,
+        max_delay: float = 5.0,
+        max_attempts: int = 5,
+    ) -> None:
+        self.connection = connection
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.metrics = ReconnectMetrics()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        connection.supervisor = self
+
+    def ensure_connected(self) -> bool:
+        """Returns True if the connection is usable, recovering it
+        first if needed.
+
+        """
+        if self.connection.is_connected:
+            return True
+        return self.recover()
+
+    def recover(self) -> bool:
+        """Try to bring a dead connection back. Returns True on success."""
+        with self._lock:
+            if self.connection.is_connected:
+                # another thread recovered while we were waiting
+                return True
+
+            down_since = self.connection.disconnected_at or time.monotonic()
+            self.metrics.disconnects += 1
+            started = time.monotonic()
+            delay = self.base_delay
+
+            for attempt in range(self.max_attempts):
+                if self._try_recover():
+                    now = time.monotonic()
+                    downtime = now - down_since
+                    self.metrics.reconnects += 1
+                    self.metrics.latencies.append(now - started)
+                    self.metrics.last_downtime = downtime
+                    self.metrics.total_downtime += downtime
+                    logger.info(
+                        "Reconnected to USB device (Bus=%s, Address=%s) after %.3f s",
+                        self.connection.bus,
+                        self.connection.address,
+                        downtime,
+                    )
+                    return True
+
+                self.metrics.failed_attempts += 1
+                logger.warning(
+                    "Reconnect attempt %d of %d failed, waiting %.2f s",
+                    attempt + 1,
+                    self.max_attempts,
+                    delay,
+                )
+                if self._stop.wait(delay):
+                    break
+                delay = min(delay * 2, self.max_delay)
+
+            # keep the original disconnect time for the next round
+            self.connection.disconnected_at = down_since
+            return False
+
+    def stop(self) -> None:
+        """Abort any backoff wait in progress."""
+        self._stop.set()
+
+    def _try_recover(self) -> bool:
+        conn = self.connection
+        if conn.reclaim():
+            self.metrics.reclaims += 1
+            return True
+
+        if self._relocate() and conn.open_connection(reset=False):
+            self.metrics.reopens += 1
+            return True
+
+        if conn.open_connection(reset=True):
+            self.metrics.full_resets += 1
+            return True
+        return False
+
+    def _relocate(self) -> bool:
+        """Find the device again, following it to a new bus address if
+        it was re-enumerated. Returns True if the device is present.
+
+        """
+        conn = self.connection
+        try:
+            candidates = list(
+                usb.core.find(
+                    find_all=True,
+                    backend=get_usb_backend(),
+                    idVendor=conn.vendor_id,
+                    idProduct=conn.product_id,
+                )
+            )
+        except usb.core.USBError as e:
+            logger.debug("Searching for USB device failed: %s", repr(e))
+            return False
+
+        match = None
+        for device in candidates:
+            if device.bus == conn.bus and device.address == conn.address:
+                match = device
+                break
+        if match is None and conn.serial_number is not None:
+            for device in candidates:
+                try:
+                    serial = usb.util.get_string(device, device.iSerialNumber)
+                except Exception:
+                    continue
+                if serial == conn.serial_number:
+                    match = device
+                    break
+        if match is None and conn.serial_number is None and len(candidates) == 1:
+            match = candidates[0]
+        if match is None:
+            return False
+
+        if (match.bus, match.address) != (conn.bus, conn.address):
+            logger.info(
+                "USB device moved from Bus=%s, Address=%s to Bus=%s, Address=%s",
+                conn.bus,
+                conn.address,
+                match.bus,
+                match.address,
+            )
+            conn.bus = match.bus
+            conn.address = match.address
+            self.metrics.relocations += 1
+        return True
@@ -0,0 +1,304 @@
+"""
+telemetry.py
+
+Columnar on-disk telemetry log.
+
+Samples are stored in chunk directories, one little-endian binary file
+per column plus a ``meta.json``. A chunk is written as
+``chunk_NNNNNN.partial`` and renamed once it is full and synced, so a
+crash can at most leave one partial chunk, which is repaired the next
+time a writer opens the log.
+
+Reading requires numpy; the files are memory-mapped so only the
+requested time range is touched.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+import array
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for reading
+    np = None
+
+if TYPE_CHECKING:
+    from .laser import Laser
+
+logger = logging.getLogger(__name__)
+
+# column name -> array typecode; every file holds little-endian values
+COLUMNS = {
+    "timestamp": "d",
+    "base_plate_temperature": "d",
+    "power": "d",
+    "current": "d",
+    "laser_hours": "d",
+    "fault": "I",
+}
+NUMPY_TYPES = {"d": "<f8", "I": "<u4"}
+FAULT_UNKNOWN = 0xFFFFFFFF
+PARTIAL_SUFFIX = ".partial"
+
+
+@dataclass
+class ChunkInfo:
+    path: Path
+    count: int
+    start: float
+    end: float
+
+
+def _chunk_name(index: int) -> str:
+    return f"chunk_{index:06d}"
+
+
+def _fsync_dir(path: Path) -> None:
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _column_rows(path: Path) -> int:
+    """Number of complete rows in a (possibly partial) chunk."""
+    rows = []
+    for name, typecode in COLUMNS.items():
+        column = path / name
+        size = column.stat().st_size if column.exists() else 0
+        rows.append(size // array.array(typecode).itemsize)
+    return min(rows)
+
+
+def _finalize(path: Path) -> Path | None:
+    """Truncate all columns of a partial chunk to the same length, write
+    its metadata and rename it. Empty chunks are removed.
+
+    """
+    count = _column_rows(path)
+    if count == 0:
+        for name in COLUMNS:
+            (path / name).unlink(missing_ok=True)
+        path.rmdir()
+        return None
+
+    for name, typecode in COLUMNS.items():
+        column = path / name
+        with open(column, "r+b") as f:
+            f.truncate(count * array.array(typecode).itemsize)
+            f.flush()
+            os.fsync(f.fileno())
+
+    timestamps = array.array("d")
+    with open(path / "timestamp", "rb") as f:
+        timestamps.frombytes(f.read())
+    if sys.byteorder == "big":
+        timestamps.byteswap()
+    meta = {
+        "count": count,
+        "start": timestamps[0],
+        "end": timestamps[-1],
+        "columns": {name: NUMPY_TYPES[t] for name, t in COLUMNS.items()},
+    }
+    tmp = path / "meta.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path / "meta.json")
+
+    final = path.with_name(path.name.removesuffix(PARTIAL_SUFFIX))
+    os.replace(path, final)
+    _fsync_dir(final.parent)
+    return final
+
+
+class TelemetryWriter:
+    """Appends telemetry samples to a columnar log directory.
+
+    Rows are buffered in memory and appended to the column files every
+    ``flush_every`` rows; a chunk is finalised after ``chunk_size``
+    rows. Timestamps must be non-decreasing.
+
+    """
+
+    def __init__(
+        self, path: str | Path, chunk_size: int = 65536, flush_every: int = 256
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.flush_every = flush_every
+        self._buffers = {name: array.array(t) for name, t in COLUMNS.items()}
+        self._rows_in_chunk = 0
+        self._chunk: Path | None = None
+
+        self._next_index = 0
+        for partial in sorted(self.path.glob("chunk_*" + PARTIAL_SUFFIX)):
+            logger.warning("Repairing unfinished telemetry chunk %s", partial)
+            _finalize(partial)
+        for chunk in self.path.glob("chunk_*"):
+            index = int(chunk.name.removesuffix(PARTIAL_SUFFIX)[6:])
+            self._next_index = max(self._next_index, index + 1)
+
+    def __enter__(self) -> "TelemetryWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def append(
+        self,
+        timestamp: float,
+        base_plate_temperature: float | None = None,
+        power: float | None = None,
+        current: float | None = None,
+        laser_hours: float | None = None,
+        fault: int | None = None,
+    ) -> None:
+        """Add one row. Missing values are stored as NaN, a missing
+        fault code as FAULT_UNKNOWN.
+
+        """
+        row = (
+            timestamp,
+            base_plate_temperature,
+            power,
+            current,
+            laser_hours,
+        )
+        for name, value in zip(COLUMNS, row):
+            self._buffers[name].append(math.nan if value is None else value)
+        self._buffers["fault"].append(FAULT_UNKNOWN if fault is None else fault)
+
+        if len(self._buffers["timestamp"]) >= self.flush_every:
+            self.flush()
+        if self._rows_in_chunk + len(self._buffers["timestamp"]) >= self.chunk_size:
+            self.flush()
+            self._finish_chunk()
+
+    def record(self, laser: "Laser", timestamp: float | None = None) -> None:
+        """Sample the logged properties from a laser and append them."""
+        self.append(
+            time.time() if timestamp is None else timestamp,
+            base_plate_temperature=laser.base_plate_temperature,
+            power=laser.power,
+            current=laser.current,
+            laser_hours=laser.laser_hours,
+            fault=laser.fault_bitmask,
+        )
+
+    def flush(self) -> None:
+        """Write buffered rows to the current chunk."""
+        count = len(self._buffers["timestamp"])
+        if count == 0:
+            return
+        if self._chunk is None:
+            self._chunk = self.path / (_chunk_name(self._next_index) + PARTIAL_SUFFIX)
+            self._chunk.mkdir()
+            self._next_index += 1
+        for name, buffer in self._buffers.items():
+            if sys.byteorder == "big":
+                buffer.byteswap()
+            with open(self._chunk / name, "ab") as f:
+                buffer.tofile(f)
+            del buffer[:]
+        self._rows_in_chunk += count
+
+    def close(self) -> None:
+        """Flush and finalise the current chunk."""
+        self.flush()
+        self._finish_chunk()
+
+    def _finish_chunk(self) -> None:
+        if self._chunk is not None:
+            _finalize(self._chunk)
+        self._chunk = None
+        self._rows_in_chunk = 0
+
+
+class TelemetryReader:
+    """Reads a telemetry log written by TelemetryWriter.
+
+    Column files are memory-mapped; ``read`` only copies the rows in
+    the requested time range.
+
+    """
+
+    def __init__(self, path: str | Path, include_partial: bool = True) -> None:
+        if np is None:
+            raise ImportError("Reading telemetry requires numpy")
+        self.path = Path(path)
+        self.include_partial = include_partial
+
+    def chunks(self) -> list[ChunkInfo]:
+        """All chunks in time order, including the one being written."""
+        result = []
+        for chunk in sorted(self.path.glob("chunk_*")):
+            if chunk.name.endswith(PARTIAL_SUFFIX):
+                if not self.include_partial:
+                    continue
+                count = _column_rows(chunk)
+                if count == 0:
+                    continue
+                stamps = self._map(chunk, "timestamp", count)
+                result.append(ChunkInfo(chunk, count, stamps[0], stamps[-1]))
+            else:
+                with open(chunk / "meta.json") as f:
+                    meta = json.load(f)
+                result.append(
+                    ChunkInfo(chunk, meta["count"], meta["start"], meta["end"])
+                )
+        return result
+
+    def read(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        columns: list[str] | None = None,
+    ) -> dict[str, "np.ndarray"]:
+        """Return the rows with start <= timestamp < end as one array
+        per column.
+
+        """
+        if columns is None:
+            columns = list(COLUMNS)
+        lo = -math.inf if start is None else start
+        hi = math.inf if end is None else end
+
+        parts: dict[str, list] = {name: [] for name in columns}
+        for chunk in self.chunks():
+            if chunk.end < lo or chunk.start >= hi:
+                continue
+            stamps = self._map(chunk.path, "timestamp", chunk.count)
+            first = np.searchsorted(stamps, lo, side="left")
+            last = np.searchsorted(stamps, hi, side="left")
+            if first == last:
+                continue
+            for name in columns:
+                parts[name].append(self._map(chunk.path, name, chunk.count)[first:last])
+
+        result = {}
+        for name in columns:
+            if len(parts[name]) == 1:
+                result[name] = parts[name][0]
+            elif parts[name]:
+                result[name] = np.concatenate(parts[name])
+            else:
+                result[name] = np.empty(0, dtype=NUMPY_TYPES[COLUMNS[name]])
+        return result
+
+    def _map(self, chunk: Path, name: str, count: int) -> "np.ndarray":
+        return np.memmap(
+            chunk / name, dtype=NUMPY_TYPES[COLUMNS[name]], mode="r", shape=(count,)
+        )
@@ -0,0 +1,144 @@
+"""
+timeouts.py
+
+Per-command response timeouts learned from observed latencies.
+"""
+
+from collections import deque
+from pathlib import Path
+import json
+import logging
+import math
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def command_key(cmd: str) -> str:
+    """Group commands that should share a timeout budget: queries by
+    name (``?LP``), setters by the command without its value (``LP=``).
+
+    """
+    cmd = cmd.strip().upper()
+    if "=" in cmd:
+        return cmd.split("=", 1)[0] + "="
+    return cmd
+
+
+class AdaptiveTimeouts:
+    """Learns a response timeout per command.
+
+    The budget is the ``percentile`` of the last ``window`` latencies
+    times ``margin``, clamped to [min_timeout, max_timeout]. Until
+    ``min_samples`` latencies have been seen, ``default`` is used.
+    After a timeout the budget of that command is doubled (up to
+    max_timeout) until the next successful response, so a command that
+    is slower than learned does not keep failing.
+
+    Learned latencies can be saved per device model, e.g. keyed by the
+    laser id, so a new connection starts with sensible budgets.
+
+    All times are in seconds.
+
+    """
+
+    def __init__(
+        self,
+        default: float = 1.0,
+        min_timeout: float = 0.01,
+        max_timeout: float = 2.0,
+        percentile: float = 99.0,
+        margin: float = 1.5,
+        window: int = 200,
+        min_samples: int = 20,
+    ) -> None:
+        self.default = default
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.margin = margin
+        self.window = window
+        self.min_samples = min_samples
+        self.timeouts_seen: dict[str, int] = {}
+        self._samples: dict[str, deque[float]] = {}
+        self._budgets: dict[str, float] = {}
+        self._backoff: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, cmd: str) -> float:
+        """Current budget for a command."""
+        key = command_key(cmd)
+        budget = self._budgets.get(key, self.default)
+        budget *= self._backoff.get(key, 1.0)
+        return min(max(budget, self.min_timeout), self.max_timeout)
+
+    def observe(self, cmd: str, latency: float) -> None:
+        """Record the latency of a successful response."""
+        key = command_key(cmd)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(latency)
+            self._backoff.pop(key, None)
+            if len(samples) >= self.min_samples:
+                self._budgets[key] = self._quantile(samples) * self.margin
+
+    def timed_out(self, cmd: str) -> None:
+        """Record that a command did not answer within its budget."""
+        key = command_key(cmd)
+        with self._lock:
+            self.timeouts_seen[key] = self.timeouts_seen.get(key, 0) + 1
+            self._backoff[key] = self._backoff.get(key, 1.0) * 2
+        logger.debug("Timeout budget for %s raised to %.3f s", key, self.timeout(key))
+
+    def _quantile(self, samples: deque[float]) -> float:
+        ordered = sorted(samples)
+        index = math.ceil(self.percentile / 100 * len(ordered)) - 1
+        return ordered[min(max(index, 0), len(ordered) - 1)]
+
+    def to_dict(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {key: list(samples) for key, samples in self._samples.items()}
+
+    def update(self, data: dict[str, list[float]]) -> None:
+        """Seed the latency history, e.g. from a saved file."""
+        for key, samples in data.items():
+            for latency in samples[-self.window :]:
+                self.observe(key, latency)
+
+    def save(self, path: str | Path, model: str) -> None:
+        """Store the learned latencies for a device model in a JSON file
+        shared by all models.
+
+        """
+        path = Path(path)
+        data = {}
+        if path.exists():
+            with open(path) as f:
+                data = json.load(f)
+        data[model] = self.to_dict()
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path: str | Path, model: str) -> bool:
+        """Load the latencies saved for a device model. Returns False if
+        there are none.
+
+        """
+        path = Path(path)
+        if not path.exists():
+            return False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read timeout file %s: %s", path, e)
+            return False
+        if model not in data:
+            return False
+        self.update(data[model])
+        return True
@@ -24,6 +24,8 @@ class VortranDevice:
     bus: int
     address: int
     is_manager: bool = False
+    # name of the manager a laser is attached to, see map_lasers_to_managers
+    manager: str | None = None
 
 
 def _find_libusb_in_site_packages() -> Path | None:
@@ -181,6 +183,64 @@ def get_usb_ports() -> dict[str, VortranDevice]:
     return found_vortran_devices
 
 
+def get_port_paths(
+    devices: dict[str, VortranDevice],
+) -> dict[str, tuple[int, ...]]:
+    """Returns the USB port path (hub ports from the root) of each
+    device, where the backend reports it.
+
+    """
+    locations = {(d.bus, d.address): name for name, d in devices.items()}
+    paths = {}
+    try:
+        for dev in usb.core.find(find_all=True, backend=get_usb_backend()):
+            name = locations.get((dev.bus, dev.address))
+            if name is not None and dev.port_numbers:
+                paths[name] = tuple(dev.port_numbers)
+    except (usb.core.USBError, NotImplementedError) as e:
+        logger.warning("Failed to read USB port numbers: %s", e)
+    return paths
+
+
+def map_lasers_to_managers(
+    devices: dict[str, VortranDevice],
+    port_paths: dict[str, tuple[int, ...]] | None = None,
+) -> dict[str, str]:
+    """Find the manager each laser is attached to and record it in the
+    laser's ``manager`` field. Returns a laser name -> manager name map.
+
+    A laser belongs to a manager if both are on the same bus behind
+    the same hub, i.e. their port paths only differ in the last port.
+    Devices plugged straight into a root port share no hub and are
+    never matched this way. If port paths are not available, lasers
+    are assigned to the manager on their bus if there is exactly one.
+
+    """
+    if port_paths is None:
+        port_paths = get_port_paths(devices)
+
+    managers = {name: d for name, d in devices.items() if d.is_manager}
+    mapping = {}
+    for name, laser in devices.items():
+        if laser.is_manager:
+            continue
+        on_bus = [m for m, d in managers.items() if d.bus == laser.bus]
+        candidates = [
+            m
+            for m in on_bus
+            if name in port_paths
+            and m in port_paths
+            and len(port_paths[name]) > 1
+            and port_paths[m][:-1] == port_paths[name][:-1]
+        ]
+        if not candidates and name not in port_paths and len(on_bus) == 1:
+            candidates = on_bus
+        if len(candidates) == 1:
+            mapping[name] = candidates[0]
+            laser.manager = candidates[0]
+    return mapping
+
+
 def parse_bus_and_address(text: str) -> tuple[int | None, int | None]:
     """Get the bus and address from the usb string."""
 
@@ -2,17 +2,59 @@
 # Example was developed using Python 3.11
 # Please see Readme.txt
 
+from typing import Any
 import platform
 import usb.core
 import usb.backend.libusb1
 import array
+import errno
 import logging
+import threading
 import time
 
+from .reader import EndpointReader
+from .reassembly import ResponseBuffer
 from .usb import VortranDevice, get_usb_backend
 
 logger = logging.getLogger(__name__)
 
+# libusb error codes that mean the device handle is gone
+LIBUSB_ERROR_IO = -1
+LIBUSB_ERROR_NO_DEVICE = -4
+DISCONNECT_ERRNOS = (errno.ENODEV, errno.EIO, errno.ESHUTDOWN)
+
+
+def is_disconnect_error(error: usb.core.USBError) -> bool:
+    """Returns True if a USB error means the device handle is dead,
+    as opposed to e.g. a timeout.
+
+    """
+    if isinstance(error, usb.core.USBTimeoutError):
+        return False
+    return (
+        error.backend_error_code in (LIBUSB_ERROR_IO, LIBUSB_ERROR_NO_DEVICE)
+        or error.errno in DISCONNECT_ERRNOS
+    )
+
+
+def turns_emission_on(cmd: str) -> bool:
+    """Whether ``cmd`` is the ``LE=1`` setter."""
+    return cmd.replace(" ", "").strip().upper() == "LE=1"
+
+
+def _console_logger() -> logging.Logger:
+    """The shared logger to the console. Its handler is only added
+    once, not for every connection.
+
+    """
+    console_logger = logging.getLogger("console_logger")
+    if not console_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        console_logger.setLevel(logging.INFO)
+        console_logger.addHandler(handler)
+    return console_logger
+
 
 class USB_ReadWrite:
     SET_CMD_QUERY = bytes([0xA0])
@@ -32,14 +74,33 @@ class USB_ReadWrite:
         self.product_id = laser.product_id
         self.bus = laser.bus
         self.address = laser.address
+        self.manager = laser.manager
         self.read_timeout = 40
         self.write_timeout = 0
+        # flush read timeout in ms, status and response windows in s
+        self.flush_timeout = 30
+        self.status_timeout = 0.05
+        self.response_timeout = timeout / 1000
+        self.timeouts = None
         self.retries = retries
         self.connection = None
         self.logger = logger
         self.run_continuously = True
         self.is_protocol_laser = is_protocol_laser
         self.is_paused = False
+        self.is_connected = False
+        self.disconnected_at: float | None = None
+        self.serial_number: str | None = None
+        self.supervisor = None
+        self.reader: EndpointReader | None = None
+        self.response_buffer = ResponseBuffer()
+        # serialises transactions when several threads share a device
+        self.lock = threading.RLock()
+        # set while an emergency frame is sent; ordinary transactions
+        # give up as soon as they see it
+        self.preempt = threading.Event()
+        # set by an emergency off; LE=1 is refused until allow_emission()
+        self.emission_inhibited = threading.Event()
 
         # DEFINE EMPTY COMMANDS USED FOR GETTING STATUS AND READING RESPONSE
         self.prefix_1 = bytearray(self.SET_CMD_QUERY)
@@ -53,38 +114,43 @@ class USB_ReadWrite:
         self.data_in_array_2 = array.array("B", full_data_2)
         self.data_in_array_3 = array.array("B", full_data_3)
         self.data_in_array_4 = array.array("B", full_data_4)
+        # encoded once so an emergency shutdown doesn't have to
+        self.emission_off_frame = self.encode_command("LE=0")
 
-        # SETUP LOGGER TO CONSOLE
-        log_format = "%(message)s"
-        handler = logging.StreamHandler()
-        handler.setFormatter(logging.Formatter(log_format))
-        self.console_logger = logging.getLogger("console_logger")
-        self.console_logger.setLevel(logging.INFO)
-        self.console_logger.addHandler(handler)
+        self.console_logger = _console_logger()
+
+    def _find_device(self) -> Any | None:
+        backend = get_usb_backend()
+
+        if backend:
+            return usb.core.find(
+                backend=backend,
+                idVendor=self.vendor_id,
+                idProduct=self.product_id,
+                bus=self.bus,
+                address=self.address,
+            )
+        return usb.core.find(
+            idVendor=self.vendor_id,
+            idProduct=self.product_id,
+            bus=self.bus,
+            address=self.address,
+        )
+
+    def open_connection(self, reset: bool = True) -> bool:
+        """Find the device and claim its interface.
 
-    def open_connection(self) -> bool:
+        With reset=False the costly device reset and configuration
+        step is skipped, which is enough to re-attach to a device that
+        is still configured, e.g. after a short disconnect.
+
+        """
         is_connection_open = False
         num_attempts = 0
 
         while not is_connection_open and num_attempts <= self.retries:
             try:
-                backend = get_usb_backend()
-
-                if backend:
-                    self.connection = usb.core.find(
-                        backend=backend,
-                        idVendor=self.vendor_id,
-                        idProduct=self.product_id,
-                        bus=self.bus,
-                        address=self.address,
-                    )
-                else:
-                    self.connection = usb.core.find(
-                        idVendor=self.vendor_id,
-                        idProduct=self.product_id,
-                        bus=self.bus,
-                        address=self.address,
-                    )
+                self.connection = self._find_device()
 
                 # Linux-specific kernel driver handling
                 if platform.system() == "Linux" and self.connection:
@@ -96,16 +162,22 @@ class USB_ReadWrite:
                 else:
                     is_connection_open = True
 
-                self.connection.reset()
-                self.connection.set_configuration()
+                if reset:
+                    self.connection.reset()
+                    self.connection.set_configuration()
                 usb.util.claim_interface(self.connection, 0)
+                self.is_connected = True
+                self.disconnected_at = None
+                if self.serial_number is None:
+                    self.serial_number = self._read_serial_number()
 
                 if is_connection_open:
-                    msg_out = "Successfully connected to USB Vendor_ID: {self.vendor_id}, Product_ID:{self.product_id}, Bus:{self.bus}, Address:{self.address}"
+                    msg_out = f"Successfully connected to USB Vendor_ID: {self.vendor_id}, Product_ID:{self.product_id}, Bus:{self.bus}, Address:{self.address}"
                     if self.logger:
                         self.logger.log.info(msg_out)
 
             except Exception as e:
+                is_connection_open = False
                 logger.error("USB connection failed: %s", repr(e))
                 if self.logger:
                     self.logger.log.error(repr(e))
@@ -124,11 +196,84 @@ class USB_ReadWrite:
                         self.logger.log.warning(msg_out)
         return is_connection_open
 
-    def read_usb(self, timeout: int, include_first_byte: bool = False) -> str | None:
+    def reclaim(self) -> bool:
+        """Lightweight recovery: release and re-claim the interface on
+        the existing handle and check that the device answers a status
+        request. No device reset is done.
+
+        """
+        if self.connection is None:
+            return False
+        try:
+            usb.util.release_interface(self.connection, 0)
+            usb.util.claim_interface(self.connection, 0)
+            self.connection.ctrl_transfer(0x21, 0x09, 0x200, 0x00, self.data_in_array_2)
+            # read directly: a background reader idles while disconnected.
+            # Stale packets may still be queued before the status reply.
+            for _ in range(4):
+                packet = self.connection.read(0x81, 64, self.read_timeout)
+                if bytes(packet[:2]) == b"\x01\xff":
+                    break
+            else:
+                logger.debug("Reclaiming USB interface: no status reply")
+                return False
+        except (usb.core.USBError, ValueError) as e:
+            logger.debug("Reclaiming USB interface failed: %s", repr(e))
+            return False
+        self.is_connected = True
+        self.disconnected_at = None
+        return True
+
+    def _read_serial_number(self) -> str | None:
+        try:
+            return usb.util.get_string(self.connection, self.connection.iSerialNumber)
+        except Exception:
+            return None
+
+    def _handle_usb_error(self, error: usb.core.USBError) -> None:
+        """Mark the connection as dead if the error was a disconnect."""
+        if is_disconnect_error(error) and self.is_connected:
+            logger.warning(
+                "USB device (Bus=%s, Address=%s) disconnected", self.bus, self.address
+            )
+            self.is_connected = False
+            self.disconnected_at = time.monotonic()
+
+    def start_reader(self, maxlen: int = 64, poll_timeout: int = 100) -> EndpointReader:
+        """Read the endpoint on a background thread from now on. Reads
+        then wait on the reader's queue and wake up as soon as a packet
+        arrives, and the flush read before each command is replaced by
+        discarding queued packets.
+
+        """
+        if self.reader is None:
+            self.reader = EndpointReader(self, maxlen=maxlen, poll_timeout=poll_timeout)
+        self.reader.start()
+        return self.reader
+
+    def stop_reader(self) -> None:
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+
+    def read_packet(self, timeout: int) -> array.array | None:
+        """Read one raw 64 byte packet from the device."""
+        if self.reader is not None and self.reader.is_running:
+            return self.reader.get(timeout)
         try:
-            data = self.connection.read(0x81, 64, timeout)
+            return self.connection.read(0x81, 64, timeout)
+        except usb.core.USBTimeoutError:
+            # expected, e.g. for every flush read
+            logger.debug("USB read timed out (timeout=%s)", timeout)
+            return None
         except usb.core.USBError as e:
             logger.error("USB read error (timeout=%s): %s", timeout, e.args)
+            self._handle_usb_error(e)
+            return None
+
+    def read_usb(self, timeout: int, include_first_byte: bool = False) -> str | None:
+        data = self.read_packet(timeout)
+        if data is None:
             return None
 
         if include_first_byte:
@@ -139,53 +284,209 @@ class USB_ReadWrite:
         result_str = byte_str.replace("\x00", "")
         return result_str if result_str else None
 
-    def send_usb(self, cmd: str, writeOnly: bool = False) -> str | None:
+    def send_usb(
+        self,
+        cmd: str,
+        writeOnly: bool = False,
+        flush: bool = True,
+        timeout: float | None = None,
+    ) -> str | None:
+        """Send a command and return the response. ``flush=False``
+        skips the flush read (for tight loops that check the response
+        themselves); ``timeout`` (in s) overrides the response window.
+
+        """
+        with self.lock:
+            return self._send_usb(cmd, writeOnly, flush, timeout)
+
+    def emergency_off(self, lock_timeout: float = 0.1) -> bool:
+        """Turn the emission off (``LE=0``) through a priority path.
+
+        The pre-encoded frame is written at once, without waiting for
+        the transaction lock or a flush read. A transaction running on
+        another thread is preempted: it stops polling and returns None
+        within one read timeout. ``LE=1`` is refused from then on until
+        ``allow_emission()``. Returns whether the frame was written.
+
+        """
+        try:
+            return self.write_emission_off()
+        finally:
+            self.release_preempt(lock_timeout)
+
+    def write_emission_off(self) -> bool:
+        """The first half of emergency_off: inhibit the emission,
+        preempt running transactions and write the frame. Must be
+        followed by ``release_preempt()``.
+
+        """
+        self.emission_inhibited.set()
+        self.preempt.set()
+        try:
+            if self.connection is None:
+                return False
+            self.connection.ctrl_transfer(
+                0x21, 0x09, 0x200, 0x00, self.emission_off_frame
+            )
+            return True
+        except usb.core.USBError as e:
+            logger.error("Emergency off failed: %s", repr(e.args))
+            self._handle_usb_error(e)
+            return False
+
+    def release_preempt(self, lock_timeout: float = 0.1) -> None:
+        """The second half of emergency_off: wait up to ``lock_timeout``
+        seconds for a preempted transaction to give up the lock, then
+        let transactions run again.
+
+        """
+        if self.lock.acquire(timeout=lock_timeout):
+            self.lock.release()
+        self.preempt.clear()
+
+    def allow_emission(self) -> None:
+        """Accept ``LE=1`` again after an emergency off."""
+        self.emission_inhibited.clear()
+
+    def emission_refused(self, cmd: str) -> bool:
+        """Whether ``cmd`` turns the emission on while it is inhibited."""
+        if self.emission_inhibited.is_set() and turns_emission_on(cmd):
+            logger.warning("%s refused after an emergency off", cmd.strip())
+            return True
+        return False
+
+    def _write_command(self, cmd: str) -> None:
+        """Write the frame of ``cmd``. Should an emergency off have
+        happened while ``LE=1`` was written, the emission off frame is
+        written again after it.
+
+        """
+        self.connection.ctrl_transfer(0x21, 0x09, 0x200, 0x00, self.encode_command(cmd))
+        if self.emission_inhibited.is_set() and turns_emission_on(cmd):
+            self.connection.ctrl_transfer(
+                0x21, 0x09, 0x200, 0x00, self.emission_off_frame
+            )
+
+    def encode_command(self, cmd: str) -> array.array:
+        """Build the 64 byte frame (0xA0 + command + padding) that sends
+        a command to the device.
+
+        """
+        if not cmd.endswith("\r\n"):
+            cmd = cmd + "\r\n"
+        data = bytearray(cmd, "ascii")
+        padding = bytearray([0xFF] * (63 - len(cmd)))
+        return array.array("B", self.prefix_1 + data + padding)
+
+    def _send_usb(
+        self,
+        cmd: str,
+        writeOnly: bool = False,
+        flush: bool = True,
+        timeout: float | None = None,
+    ) -> str | None:
+        if self.supervisor is not None and not self.supervisor.ensure_connected():
+            return None
         response = None
-        workflow_timeout = 0.05
         if not cmd.endswith("\r\n"):
             cmd = cmd + "\r\n"
         stripped_cmd = (
             cmd.replace("\r\n", "").lower()
         )  # This part doesn't make sense given how the example code calls commands.
+        if self.emission_refused(cmd):
+            return None
         try:
-            response = self.read_usb(timeout=30)
+            if self.preempt.is_set():
+                logger.debug("Command %s preempted", stripped_cmd)
+                return None
+            if self.reader is not None and self.reader.is_running:
+                self.reader.clear()
+            elif flush:
+                response = self.read_usb(timeout=self.flush_timeout)
             if self.is_protocol_laser:
-                data = bytearray(cmd, "ascii")
-                padding = bytearray([0xFF] * (63 - len(cmd)))
-                full_data = self.prefix_1 + data + padding
-                data_in_array_1 = array.array("B", full_data)
-
-                self.connection.ctrl_transfer(0x21, 0x09, 0x200, 0x00, data_in_array_1)
-                cmd_sent_time = time.time()
-                while time.time() - cmd_sent_time < workflow_timeout:
-                    self.connection.ctrl_transfer(
-                        0x21, 0x09, 0x200, 0x00, self.data_in_array_2
-                    )
-                    status_confirmed = self.read_usb(
-                        self.read_timeout, include_first_byte=True
-                    )
-                    if status_confirmed and chr(0x01) + chr(0xFF) in status_confirmed:
-                        if writeOnly:
-                            return "OK"
-                        if not writeOnly:
-                            break
-                    time.sleep(0.005)
+                # an emergency off may have come during the flush read
+                if self.preempt.is_set() or self.emission_refused(cmd):
+                    return None
+                self._write_command(cmd)
+                if self._wait_status() and writeOnly:
+                    return "OK"
+                if self.preempt.is_set():
+                    return None
 
-                self.connection.ctrl_transfer(
-                    0x21, 0x09, 0x200, 0x00, self.data_in_array_3
-                )
-                sent_time = time.time()
-                response = ""
-                while time.time() - sent_time < 1:
-                    response = self.read_usb(self.read_timeout)
-                    if response and (
-                        "\n" in response or stripped_cmd in response.lower()
-                    ):
-                        self.connection.ctrl_transfer(
-                            0x21, 0x09, 0x200, 0x00, self.data_in_array_4
-                        )
-                        break
-                return response
+                return self._read_response(stripped_cmd, timeout)
 
         except usb.core.USBError as e:
             logger.error("USB communication error: %s", repr(e.args))
+            self._handle_usb_error(e)
+
+    def reread_response(self, cmd: str) -> str | None:
+        """Ask the device for the response to the last command again,
+        without re-sending the command. Useful when a reply arrived
+        after the response window closed.
+
+        """
+        stripped_cmd = cmd.replace("\r\n", "").lower()
+        with self.lock:
+            try:
+                return self._read_response(stripped_cmd)
+            except usb.core.USBError as e:
+                logger.error("USB communication error: %s", repr(e.args))
+                self._handle_usb_error(e)
+        return None
+
+    def _wait_status(self) -> bool:
+        """Poll the response status (0xA1) until the device confirms the
+        command or the status window closes.
+
+        """
+        cmd_sent_time = time.time()
+        while time.time() - cmd_sent_time < self.status_timeout:
+            if self.preempt.is_set():
+                return False
+            self.connection.ctrl_transfer(0x21, 0x09, 0x200, 0x00, self.data_in_array_2)
+            status_confirmed = self.read_usb(self.read_timeout, include_first_byte=True)
+            if status_confirmed and chr(0x01) + chr(0xFF) in status_confirmed:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def _read_response(
+        self, stripped_cmd: str, timeout: float | None = None
+    ) -> str | None:
+        """Request the pending response (0xA2) and read it, acknowledging
+        it (0xA3) once complete. Responses spanning several packets are
+        reassembled.
+
+        """
+        self.connection.ctrl_transfer(0x21, 0x09, 0x200, 0x00, self.data_in_array_3)
+        if timeout is not None:
+            response_timeout = timeout
+        elif self.timeouts is not None:
+            response_timeout = self.timeouts.timeout(stripped_cmd)
+        else:
+            response_timeout = self.response_timeout
+        buffer = self.response_buffer
+        buffer.reset(echo=stripped_cmd)
+        sent_time = time.monotonic()
+        while (elapsed := time.monotonic() - sent_time) < response_timeout:
+            if self.preempt.is_set():
+                logger.debug("Response to %s preempted", stripped_cmd)
+                return None
+            # don't block in a single read beyond the budget
+            remaining = int((response_timeout - elapsed) * 1000)
+            packet = self.read_packet(max(1, min(self.read_timeout, remaining)))
+            if packet is None:
+                complete = buffer.timed_out_read()
+            else:
+                complete = buffer.feed(packet[1:])
+            if complete:
+                self.connection.ctrl_transfer(
+                    0x21, 0x09, 0x200, 0x00, self.data_in_array_4
+                )
+                if self.timeouts is not None:
+                    self.timeouts.observe(stripped_cmd, time.monotonic() - sent_time)
+                break
+        else:
+            if self.timeouts is not None:
+                self.timeouts.timed_out(stripped_cmd)
+        return buffer.text() or None
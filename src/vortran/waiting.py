@@ -0,0 +1,296 @@
+"""
+waiting.py
+
+Waiting for state transitions (warm-up, power settling, faults
+clearing) with adaptive polling shared between all waiters of a laser.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import threading
+import time
+import weakref
+from typing import Any
+
+from .status import LaserStatus
+
+logger = logging.getLogger(__name__)
+
+# bits that are states rather than faults
+NON_FAULT_BITS = LaserStatus.STANDBY | LaserStatus.WARMUP
+
+
+@dataclass
+class WaitResult:
+    """Outcome of a wait. ``elapsed`` is the time in seconds until the
+    condition was first seen to hold (or until the timeout).
+
+    """
+
+    condition: str
+    satisfied: bool
+    elapsed: float
+    polls: int
+    value: Any = None
+
+    def __bool__(self) -> bool:
+        return self.satisfied
+
+
+class WaitCondition:
+    """A condition on one laser property.
+
+    ``predicate`` is called with each polled value. ``hold`` requires
+    it to stay true for that many seconds. ``eta`` may return an
+    estimate (in s) of how long until the condition holds, given the
+    recent (time, value) samples; it steers the polling interval.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prop: str,
+        predicate: Callable[[Any], bool],
+        hold: float = 0.0,
+        eta: Callable[[list[tuple[float, Any]]], float | None] | None = None,
+    ) -> None:
+        self.name = name
+        self.prop = prop
+        self.predicate = predicate
+        self.hold = hold
+        self.eta = eta
+
+    def prepare(self, laser) -> None:
+        """Called once before waiting, e.g. to read a setpoint."""
+
+
+def warmup_done(expected: float | None = None) -> WaitCondition:
+    """Warm-up bit cleared. With the ``expected`` warm-up time (in s)
+    polling stays slow until the transition is near.
+
+    """
+    condition = WaitCondition(
+        "warmup done",
+        "fault_bitmask",
+        lambda value: not value & LaserStatus.WARMUP,
+    )
+    if expected is not None:
+        started = time.monotonic()
+        condition.eta = lambda samples: expected - (time.monotonic() - started)
+    return condition
+
+
+def fault_cleared(status: LaserStatus | None = None) -> WaitCondition:
+    """The given status bits, by default all fault bits, cleared."""
+    bits = ~NON_FAULT_BITS if status is None else status
+    name = "faults cleared" if status is None else f"{status.name} cleared"
+    return WaitCondition(name, "fault_bitmask", lambda value: not value & bits)
+
+
+class _PowerSettled(WaitCondition):
+    def __init__(self, setpoint, tolerance, relative, hold) -> None:
+        super().__init__("power settled", "power", self._check, hold, self._eta)
+        self.setpoint = setpoint
+        self.tolerance = tolerance
+        self.relative = relative
+
+    def prepare(self, laser) -> None:
+        if self.setpoint is None:
+            self.setpoint = laser.laser_power_setting
+        if self.setpoint is None:
+            raise ValueError("Power setpoint could not be read")
+
+    def _limit(self) -> float:
+        if self.relative:
+            return self.tolerance * max(abs(self.setpoint), 1e-9)
+        return self.tolerance
+
+    def _check(self, power: float) -> bool:
+        return abs(power - self.setpoint) <= self._limit()
+
+    def _eta(self, samples: list[tuple[float, Any]]) -> float | None:
+        # extrapolate the approach of the last two samples
+        if len(samples) < 2:
+            return None
+        (t0, p0), (t1, p1) = samples[-2], samples[-1]
+        e0, e1 = abs(p0 - self.setpoint), abs(p1 - self.setpoint)
+        if t1 <= t0 or e1 >= e0:
+            return None
+        rate = (e0 - e1) / (t1 - t0)
+        return max(0.0, e1 - self._limit()) / rate
+
+
+def power_settled(
+    setpoint: float | None = None,
+    tolerance: float = 0.02,
+    relative: bool = True,
+    hold: float = 0.0,
+) -> WaitCondition:
+    """Measured power within ``tolerance`` of ``setpoint`` (default:
+    the current power setting), relative to it unless ``relative`` is
+    False (then in mW), for at least ``hold`` seconds.
+
+    """
+    return _PowerSettled(setpoint, tolerance, relative, hold)
+
+
+class _Waiter:
+    def __init__(self, condition: WaitCondition, poller: "LaserPoller") -> None:
+        self.condition = condition
+        self.started = time.monotonic()
+        self.interval = poller.min_interval
+        self.samples: list[tuple[float, Any]] = []
+        self.polls = 0
+        self.true_since: float | None = None
+        self.result: WaitResult | None = None
+        self.done = threading.Event()
+
+    def update(self, now: float, value: Any, poller: "LaserPoller") -> None:
+        self.polls += 1
+        if value is None:
+            return
+        changed = bool(self.samples) and self.samples[-1][1] != value
+        self.samples = self.samples[-4:] + [(now, value)]
+        condition = self.condition
+        if condition.predicate(value):
+            if self.true_since is None:
+                self.true_since = now
+            if now - self.true_since >= condition.hold:
+                self.finish(True, value)
+                return
+            # confirm the hold quickly
+            self.interval = poller.min_interval
+            return
+        self.true_since = None
+
+        eta = condition.eta(self.samples) if condition.eta else None
+        if eta is not None:
+            # poll a few times before the expected transition
+            self.interval = eta / 4
+        elif changed:
+            self.interval = poller.min_interval
+        else:
+            self.interval *= poller.backoff
+        self.interval = min(
+            max(self.interval, poller.min_interval), poller.max_interval
+        )
+
+    def finish(self, satisfied: bool, value: Any = None) -> None:
+        elapsed = (self.true_since if satisfied else time.monotonic()) - self.started
+        if value is None and self.samples:
+            value = self.samples[-1][1]
+        self.result = WaitResult(
+            self.condition.name, satisfied, max(0.0, elapsed), self.polls, value
+        )
+        self.done.set()
+
+
+class LaserPoller:
+    """Polls the properties needed by all current waiters of one laser.
+
+    Each round reads every property needed once, however many waiters
+    use it, and then sleeps until the earliest next poll any waiter
+    asks for. A waiter polls at ``min_interval`` while its value
+    changes or its transition is expected soon, and backs off by
+    ``backoff`` per unchanged poll up to ``max_interval``. The thread
+    only runs while there are waiters. The laser is only referenced
+    weakly, so the poller (which the laser keeps) doesn't keep it alive.
+
+    """
+
+    def __init__(
+        self,
+        laser,
+        min_interval: float = 0.01,
+        max_interval: float = 0.5,
+        backoff: float = 1.5,
+    ) -> None:
+        self._laser = weakref.ref(laser)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.rounds = 0
+        self.reads = 0
+        self._waiters: list[_Waiter] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def wait(
+        self, condition: WaitCondition, timeout: float | None = None
+    ) -> WaitResult:
+        condition.prepare(self._laser())
+        waiter = _Waiter(condition, self)
+        with self._cond:
+            self._waiters.append(waiter)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="vortran-wait-poller", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        if not waiter.done.wait(timeout):
+            with self._cond:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if waiter.result is None:
+                waiter.finish(False)
+        return waiter.result
+
+    def _run(self) -> None:
+        next_poll: dict[int, float] = {}
+        while True:
+            with self._cond:
+                if not self._waiters:
+                    self._thread = None
+                    return
+                waiters = list(self._waiters)
+                now = time.monotonic()
+                due_at = min(next_poll.get(id(w), now) for w in waiters)
+                if due_at > now:
+                    self._cond.wait(due_at - now)
+                    continue
+
+            now = time.monotonic()
+            due = [w for w in waiters if next_poll.get(id(w), now) <= now]
+            values = self._read({w.condition.prop for w in due})
+            self.rounds += 1
+
+            now = time.monotonic()
+            with self._cond:
+                for waiter in due:
+                    waiter.update(now, values[waiter.condition.prop], self)
+                    if waiter.done.is_set():
+                        if waiter in self._waiters:
+                            self._waiters.remove(waiter)
+                        next_poll.pop(id(waiter), None)
+                    else:
+                        next_poll[id(waiter)] = now + waiter.interval
+                live = {id(w) for w in self._waiters}
+                next_poll = {k: v for k, v in next_poll.items() if k in live}
+
+    def _read(self, props: set[str]) -> dict[str, Any]:
+        # the laser is only held while reading
+        laser = self._laser()
+        values = {}
+        for prop in props:
+            try:
+                values[prop] = getattr(laser, prop)
+            except Exception:
+                logger.exception("Polling %s failed", prop)
+                values[prop] = None
+            self.reads += 1
+        return values
+
+
+_pollers_lock = threading.Lock()
+
+
+def get_poller(laser) -> LaserPoller:
+    """The poller shared by all waiters of a laser, kept on the laser."""
+    with _pollers_lock:
+        poller = getattr(laser, "_poller", None)
+        if poller is None:
+            poller = laser._poller = LaserPoller(laser)
+        return poller
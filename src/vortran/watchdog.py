@@ -0,0 +1,199 @@
+"""
+watchdog.py
+
+Safety watchdog: turns the emission of all watched lasers off when
+triggered, through the priority path of USB_ReadWrite.emergency_off,
+and measures how long that took.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import threading
+import time
+
+from .faults import FaultEvent, FaultWatcher
+from .laser import Laser
+from .status import LaserStatus
+from .waiting import NON_FAULT_BITS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Shutdown:
+    """The emergency off of one laser. ``latency`` is the time in
+    seconds from the trigger to the frame being written.
+
+    """
+
+    laser: Laser
+    reason: str
+    ok: bool
+    timestamp: float
+    latency: float
+
+
+ShutdownCallback = Callable[[Shutdown], None]
+
+
+class SafetyWatchdog:
+    """Shuts off all ``lasers`` when triggered.
+
+    Triggers are ``trigger()`` (e.g. from application interlock
+    logic), a check registered with ``add_check`` returning True, an
+    active fault bit in ``fault_mask`` reported by a FaultWatcher
+    attached with ``watch_faults``, or no ``heartbeat()`` for
+    ``heartbeat_timeout`` seconds. Checks and the heartbeat are
+    evaluated every ``interval`` seconds, which bounds their detection
+    delay; the shutdown itself does not wait for other traffic. A
+    check that raises counts as fired.
+
+    Once tripped, the watchdog stays tripped (and further triggers
+    still shut the lasers off) and the lasers refuse ``LE=1`` until
+    ``reset()``.
+
+    """
+
+    def __init__(
+        self,
+        lasers: list[Laser],
+        heartbeat_timeout: float | None = None,
+        interval: float = 0.01,
+        fault_mask: int = ~NON_FAULT_BITS,
+    ) -> None:
+        self.lasers = list(lasers)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.interval = interval
+        self.fault_mask = fault_mask
+        self.shutdowns: list[Shutdown] = []
+        self.max_latency = 0.0
+        self.tripped = threading.Event()
+        self._checks: list[tuple[str, Callable[[], bool]]] = []
+        self._callbacks: list[ShutdownCallback] = []
+        self._watchers: list[FaultWatcher] = []
+        self._last_beat = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_check(self, check: Callable[[], bool], name: str | None = None) -> None:
+        """Trip when ``check()`` returns True. Runs on the watchdog
+        thread, so it should be cheap.
+
+        """
+        self._checks.append((name or getattr(check, "__name__", "check"), check))
+
+    def add_callback(self, callback: ShutdownCallback) -> None:
+        """Called after each laser was shut off."""
+        self._callbacks.append(callback)
+
+    def watch_faults(self, watcher: FaultWatcher) -> None:
+        """Trip on fault bits in ``fault_mask`` raised on ``watcher``'s laser."""
+        watcher.add_callback(self._on_fault)
+        self._watchers.append(watcher)
+
+    def heartbeat(self) -> None:
+        self._last_beat = time.monotonic()
+
+    def reset(self) -> None:
+        """Re-arm after a trip and allow the emission again. The
+        heartbeat starts over.
+
+        """
+        self._last_beat = time.monotonic()
+        for laser in self.lasers:
+            laser.allow_emission()
+        self.tripped.clear()
+
+    def trigger(self, reason: str = "triggered") -> list[Shutdown]:
+        """Shut off all lasers now, on the calling thread."""
+        start = time.monotonic()
+        self.tripped.set()
+        shutdowns = []
+        # write every frame before waiting for any lock, so a busy laser
+        # doesn't delay the others
+        for laser in self.lasers:
+            ok = laser.write_emission_off()
+            latency = time.monotonic() - start
+            shutdowns.append(Shutdown(laser, reason, ok, time.time(), latency))
+        for laser in self.lasers:
+            laser.release_preempt()
+        logger.critical("Safety watchdog tripped: %s", reason)
+        with self._lock:
+            self.shutdowns.extend(shutdowns)
+            self.max_latency = max([self.max_latency] + [s.latency for s in shutdowns])
+        for shutdown in shutdowns:
+            if not shutdown.ok:
+                logger.error(
+                    "Emergency off failed for laser (Bus=%s, Address=%s)",
+                    shutdown.laser.bus,
+                    shutdown.laser.address,
+                )
+            for callback in list(self._callbacks):
+                try:
+                    callback(shutdown)
+                except Exception:
+                    logger.exception("Shutdown callback failed")
+        return shutdowns
+
+    def _on_fault(self, event: FaultEvent) -> None:
+        if event.active and event.status & self.fault_mask:
+            self.trigger(f"fault {LaserStatus(event.status).name}")
+
+    def check(self) -> str | None:
+        """Evaluate the heartbeat and checks once; trip and return the
+        reason if one fired.
+
+        """
+        reason = None
+        if (
+            self.heartbeat_timeout is not None
+            and time.monotonic() - self._last_beat > self.heartbeat_timeout
+        ):
+            reason = "heartbeat timeout"
+        else:
+            for name, check in list(self._checks):
+                try:
+                    fired = check()
+                except Exception:
+                    logger.exception("Watchdog check %s failed", name)
+                    fired = True
+                if fired:
+                    reason = f"check {name}"
+                    break
+        if reason is not None and not self.tripped.is_set():
+            self.trigger(reason)
+            return reason
+        return None
+
+    def start(self) -> None:
+        """Start checking on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="vortran-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for watcher in self._watchers:
+            watcher.remove_callback(self._on_fault)
+        self._watchers = []
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def __enter__(self) -> "SafetyWatchdog":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
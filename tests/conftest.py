@@ -0,0 +1,70 @@
+"""Shared fixtures: lasers wired to an emulated device."""
+
+import pytest
+
+from vortran.emulation import EmulatedConnection
+from vortran.laser import Laser
+from vortran.usb import VortranDevice
+
+from emulated import FaultyConnection
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the benchmark tests")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: timing comparison, only run with --benchmark"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def _make_laser(
+    timeout: int = 500,
+    values: dict[str, str] | None = None,
+    bus: int = 1,
+    address: int = 1,
+    connection: EmulatedConnection | None = None,
+    manager: str | None = None,
+    **kwargs,
+) -> Laser:
+    """A Laser with an open connection to an emulated device. Further
+    keyword arguments are passed to FaultyConnection.
+
+    """
+    device = VortranDevice(0x201A, 0x1001, bus=bus, address=address, manager=manager)
+    laser = Laser(device, timeout, 0)
+    if connection is None:
+        connection = FaultyConnection(values, bus=bus, address=address, **kwargs)
+    laser.connection = connection
+    laser.is_connected = True
+    return laser
+
+
+@pytest.fixture
+def make_laser():
+    """Factory for emulated lasers, for tests that need several."""
+    return _make_laser
+
+
+@pytest.fixture
+def laser_options() -> dict:
+    """Arguments of the ``laser`` fixture; override in a test module to
+    change e.g. the timeout or the emulated values.
+
+    """
+    return {}
+
+
+@pytest.fixture
+def laser(laser_options):
+    return _make_laser(**laser_options)
@@ -0,0 +1,25 @@
+"""Emulated devices with scripted faults, for the tests."""
+
+from vortran.emulation import EmulatedConnection
+
+
+class FaultyConnection(EmulatedConnection):
+    """Emulated laser that leaves the next ``late_responses`` response
+    requests unanswered (a reply arriving late), and then answers one
+    with ``wrong_response`` instead of the real reply, if set.
+
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.late_responses = 0
+        self.wrong_response: str | None = None
+
+    def pending_reply(self) -> str | None:
+        if self.late_responses > 0:
+            self.late_responses -= 1
+            return None
+        if self.wrong_response is not None:
+            reply, self.wrong_response = self.wrong_response, None
+            return reply
+        return super().pending_reply()
@@ -0,0 +1,120 @@
+"""Tests for analytics module."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vortran.analytics import (
+    drift_slope,
+    fault_statistics,
+    rms_noise,
+    rolling_mean,
+    rolling_std,
+    summarize,
+)
+from vortran.laser import LaserStatus
+from vortran.telemetry import FAULT_UNKNOWN
+
+
+class TestRolling:
+    """Tests for rolling_mean and rolling_std functions."""
+
+    def test_rolling_mean(self):
+        """Test against a plain Python loop."""
+        values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+        np.testing.assert_allclose(rolling_mean(values, 2), [1.5, 2.5, 3.5, 4.5])
+
+    def test_rolling_mean_ignores_nan(self):
+        """Test that NaN samples are skipped."""
+        values = np.array([1.0, np.nan, 3.0, np.nan, np.nan])
+        result = rolling_mean(values, 2)
+        np.testing.assert_allclose(result[:3], [1.0, 3.0, 3.0])
+        assert np.isnan(result[3])
+
+    def test_rolling_std(self):
+        """Test against numpy's std for every window."""
+        rng = np.random.default_rng(1)
+        values = 1000 + rng.normal(size=50)
+        expected = [values[i : i + 10].std() for i in range(41)]
+        np.testing.assert_allclose(rolling_std(values, 10), expected, atol=1e-9)
+
+    def test_fleet_rows(self):
+        """Test that 2D input is handled row by row."""
+        values = np.array([[1.0, 2.0, 3.0], [10.0, 10.0, 10.0]])
+        np.testing.assert_allclose(rolling_mean(values, 3), [[2.0], [10.0]])
+
+    def test_invalid_window(self):
+        """Test that a window of zero is rejected."""
+        with pytest.raises(ValueError):
+            rolling_mean(np.ones(3), 0)
+
+
+class TestNoiseAndDrift:
+    """Tests for rms_noise and drift_slope functions."""
+
+    def test_rms_noise(self):
+        """Test RMS of a square wave around its mean."""
+        power = np.array([49.0, 51.0] * 50)
+        assert rms_noise(power) == pytest.approx(1.0)
+        assert rms_noise(power, relative=True) == pytest.approx(0.02)
+
+    def test_rms_noise_window_removes_drift(self):
+        """Test that a linear ramp is not counted as noise."""
+        power = np.linspace(40, 60, 1001)
+        assert rms_noise(power) > 5
+        assert rms_noise(power, window=11) == pytest.approx(0.0, abs=1e-9)
+
+    def test_drift_slope_per_hour(self):
+        """Test slope of a known ramp with a NaN gap."""
+        t = np.arange(0, 7200.0, 60.0)
+        temperature = 25 + 0.5 * t / 3600
+        temperature[10] = np.nan
+        assert drift_slope(t, temperature) == pytest.approx(0.5)
+
+    def test_drift_slope_fleet(self):
+        """Test one slope per row."""
+        t = np.arange(10.0)
+        values = np.vstack([t, -2 * t])
+        np.testing.assert_allclose(drift_slope(t, values, per=1.0), [1.0, -2.0])
+
+
+class TestFaultStatistics:
+    """Tests for fault_statistics function."""
+
+    def test_counts_and_durations(self):
+        """Test rising edges and hold durations."""
+        t = np.array([0.0, 1.0, 2.0, 3.0, 5.0, 6.0])
+        interlock = int(LaserStatus.INTERLOCK_OPEN)
+        warmup = int(LaserStatus.WARMUP)
+        faults = np.array(
+            [warmup, warmup | interlock, 0, interlock, FAULT_UNKNOWN, 0],
+            dtype=np.uint32,
+        )
+        stats = fault_statistics(t, faults)
+        assert stats[LaserStatus.INTERLOCK_OPEN].count == 2
+        assert stats[LaserStatus.INTERLOCK_OPEN].duration == pytest.approx(4.0)
+        assert stats[LaserStatus.WARMUP].count == 1
+        assert stats[LaserStatus.WARMUP].duration == pytest.approx(2.0)
+        assert stats[LaserStatus.FATAL_ERROR].count == 0
+
+    def test_empty(self):
+        """Test that no samples give zero statistics."""
+        stats = fault_statistics(np.empty(0), np.empty(0, dtype=np.uint32))
+        assert stats[LaserStatus.WARMUP].count == 0
+
+
+def test_summarize():
+    """Test summarising a telemetry dictionary."""
+    t = np.arange(0, 3600.0, 1.0)
+    data = {
+        "timestamp": t,
+        "power": np.full_like(t, 50.0),
+        "base_plate_temperature": 25 + t / 3600,
+        "fault": np.zeros(len(t), dtype=np.uint32),
+    }
+    summary = summarize(data)
+    assert summary.samples == 3600
+    assert summary.mean_power == 50.0
+    assert summary.power_rms_noise == 0.0
+    assert summary.temperature_drift == pytest.approx(1.0)
+    assert summary.faults[LaserStatus.INTERLOCK_OPEN].count == 0
@@ -0,0 +1,167 @@
+"""Tests for bulk module."""
+
+import random
+import timeit
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vortran.bulk import parse_buffer, parse_file
+from vortran.emulation import EmulatedConnection
+from vortran.parser import parse_output
+
+
+def capture(count=500, seed=0, commands=("?LP", "?BPT", "?FC", "?LS", "?FD")):
+    emulation = EmulatedConnection({"BPT": "25.3", "FC": "16"})
+    rng = random.Random(seed)
+    return [emulation.respond(rng.choice(commands)) for _ in range(count)]
+
+
+class TestParseBuffer:
+    """Tests for parse_buffer function."""
+
+    def test_matches_parse_output(self):
+        """Test that the columns equal looping over parse_output."""
+        responses = capture()
+        result = parse_buffer("".join(responses))
+        expected = {}
+        for response in responses:
+            for line in response.splitlines()[1:-1]:
+                key = line.split("=")[0].lstrip("?")
+                expected.setdefault(key, []).append(parse_output(f"\n{line}\n\n")[0])
+        assert set(result.columns) == set(expected)
+        for key in ["LP", "BPT", "FC", "LPS", "DELAY"]:
+            np.testing.assert_array_equal(
+                result[key].values, [float(v) for v in expected[key]]
+            )
+            assert result[key].valid.all()
+        assert result["?FD"].text() == expected["FD"]
+        assert result.records == sum(len(v) for v in expected.values())
+        assert result.junk == 0
+
+    @pytest.mark.parametrize(
+        "lines",
+        [
+            ["?lp=50.0", "?Lp=1", "?LP=2"],
+            ["?C=0", "?X=1.5", "?DELAY=1"],
+            ["?ABCDEFGH=2", "?ABCDEFG=3", "?A=4"],
+            ["?LP=50.0", "?FC=16"],
+            ["?FD=No Faults", "?B=-0.5"],
+        ],
+    )
+    def test_edge_cases_match_parse_output(self, lines):
+        """Test key case, short and long keys and a record ending the
+        buffer against parse_output and float().
+
+        """
+        result = parse_buffer("\r\n".join(lines))
+        expected = {}
+        for line in lines:
+            key = line.split("=")[0].lstrip("?").upper()
+            expected.setdefault(key, []).append(parse_output(f"\n{line}\n\n")[0])
+        assert set(result.columns) == set(expected)
+        for key, texts in expected.items():
+            assert result[key].text() == texts
+            for value, text in zip(result[key].values, texts):
+                try:
+                    assert value == float(text)
+                except ValueError:
+                    assert np.isnan(value)
+
+    @pytest.mark.parametrize(
+        "text, value", [("25.3", 25.3), (" -1.5 ", -1.5), ("+7", 7.0), (".5", 0.5)]
+    )
+    def test_numbers(self, text, value):
+        """Test conversion like float()."""
+        assert parse_buffer(f"?X={text}\r\n")["X"].values[0] == value
+
+    @pytest.mark.parametrize(
+        "text", ["", "5x.0", "1..2", "1 2", "--1", "1e5", "9" * 20]
+    )
+    def test_malformed_values(self, text):
+        """Test that malformed values are NaN and flagged."""
+        column = parse_buffer(f"?LP=50.0\r\n?LP={text}\r\n")["LP"]
+        assert column.valid.tolist() == [True, False]
+        assert np.isnan(column.values[1])
+        assert column.malformed == 1
+
+    def test_junk_lines(self):
+        """Test that lines that aren't records are counted."""
+        result = parse_buffer("\r\ngarbage\r\n?=1\r\n?LP50\r\n?lp=1.0\r\n")
+        assert result.junk == 3
+        assert result.records == 1
+        assert result["LP"].values.tolist() == [1.0]
+
+    def test_keys(self):
+        """Test restricting the result to some keys."""
+        result = parse_buffer("".join(capture()), keys=["?LP", "FC", "?XYZ"])
+        assert set(result.columns) == {"LP", "FC", "XYZ"}
+        assert len(result["XYZ"]) == 0
+        assert (result["FC"].values == 16).all()
+
+    def test_positions_align(self):
+        """Test that positions give the order across columns."""
+        result = parse_buffer("?LP=1\n?BPT=2\n?LP=3\n")
+        assert result["LP"].position.tolist() == [0, 2]
+        assert result["BPT"].position.tolist() == [1]
+
+    @pytest.mark.parametrize(
+        "data, key, value",
+        [
+            (b"?X=1", "X", 1.0),
+            (b"?ABCDEFGH=2", "ABCDEFGH", 2.0),
+            (b"?L\n?FC=16", "FC", 16.0),
+        ],
+    )
+    def test_record_at_end(self, data, key, value):
+        """Test a record that runs up to the end of the buffer."""
+        assert parse_buffer(data)[key].values.tolist() == [value]
+
+    def test_long_key(self):
+        """Test that keys longer than KEY_WIDTH make junk lines."""
+        result = parse_buffer(b"?ABCDEFGHI=1\n?ABCDEFGH=2\n")
+        assert result.junk == 1
+        assert result["abcdefgh"].values.tolist() == [2.0]
+
+    def test_empty(self):
+        """Test an empty buffer."""
+        result = parse_buffer(b"")
+        assert result.records == 0 and result.columns == {}
+
+
+def test_parse_file(tmp_path):
+    """Test parsing a memory-mapped capture file."""
+    path = tmp_path / "capture.txt"
+    path.write_bytes("".join(capture(100)).encode())
+    result = parse_file(path, keys=["?LP"])
+    assert (result["LP"].values == 50.0).all()
+    # still readable after the mapping was closed
+    assert set(result["LP"].text()) == {"50.0"}
+    (tmp_path / "empty.txt").write_bytes(b"")
+    assert parse_file(tmp_path / "empty.txt").records == 0
+
+
+@pytest.mark.benchmark
+def test_benchmark_against_parse_output(tmp_path):
+    """Compare parse_file with reading the same capture file and
+    looping over parse_output and float() per response. Run with
+    ``pytest --benchmark``.
+
+    """
+    path = tmp_path / "capture.txt"
+    path.write_bytes("".join(capture(200000, commands=("?LP", "?BPT", "?FC"))).encode())
+
+    def loop():
+        text = path.read_bytes().decode("latin-1")
+        for response in text.split("\r\n\r\n"):
+            for value in parse_output(response + "\r\n\r\n"):
+                try:
+                    float(value)
+                except ValueError:
+                    pass
+
+    loop_time = min(timeit.repeat(loop, number=1, repeat=3))
+    bulk_time = min(timeit.repeat(lambda: parse_file(path), number=1, repeat=3))
+    print(f"parse_output loop {loop_time:.3f} s, parse_file {bulk_time:.3f} s")
+    assert loop_time > 2 * bulk_time
@@ -0,0 +1,95 @@
+"""Tests for cache module."""
+
+import json
+import time
+
+import pytest
+
+import vortran.laser
+from vortran.cache import DeviceCache, DeviceInfo
+from vortran.emulation import EmulatedConnection
+from vortran.laser import Laser, get_lasers
+from vortran.usb import VortranDevice
+
+STATIC_QUERIES = ["?LI", "?LW", "?RP", "?MAXP", "?FV"]
+
+
+@pytest.fixture
+def laser(laser):
+    laser.serial_number = "EMU0001"
+    return laser
+
+
+class TestDeviceCache:
+    """Tests for DeviceCache class."""
+
+    def test_miss_reads_device(self, laser, tmp_path):
+        """Test that an unknown device is queried and stored."""
+        cache = DeviceCache(tmp_path / "devices.json")
+        info = cache.attach(laser)
+        assert info.laser_id == "EMULATED"
+        assert info.wavelength == 488.0
+        assert laser.connection.commands == ["?LI"] + STATIC_QUERIES
+        assert cache.misses == 1
+        data = json.loads((tmp_path / "devices.json").read_text())
+        assert data["EMU0001"]["max_power"] == 100.0
+
+    def test_hit_needs_one_query(self, laser, tmp_path):
+        """Test that a cached device is validated with a single query."""
+        DeviceCache(tmp_path / "devices.json").attach(laser)
+        laser.connection.commands.clear()
+        laser.info = None
+
+        cache = DeviceCache(tmp_path / "devices.json")
+        cache.attach(laser)
+        assert laser.connection.commands == ["?LI"]
+        assert cache.hits == 1
+        assert laser.laser_wavelength == 488.0
+        assert laser.laser_max_power == 100.0
+        assert laser.firmware_version == ["1.0.0"]
+        assert laser.connection.commands == ["?LI"]
+
+    def test_replaced_device(self, laser, tmp_path):
+        """Test that a different laser id invalidates the entry."""
+        cache = DeviceCache(tmp_path / "devices.json")
+        cache.put("EMU0001", DeviceInfo("OTHER", 405.0, 50.0, 50.0, "0.9", time.time()))
+        info = cache.attach(laser)
+        assert info.laser_id == "EMULATED"
+        assert cache.misses == 1
+
+    def test_stale_entry_refreshed(self, laser, tmp_path):
+        """Test that stale entries are used and refreshed in the
+        background.
+
+        """
+        cache = DeviceCache(tmp_path / "devices.json", max_age=60)
+        cache.put("EMU0001", DeviceInfo("EMULATED", 405.0, 50.0, 50.0, "0.9", 0.0))
+        info = cache.attach(laser)
+        assert info.wavelength == 405.0
+        cache.wait()
+        assert cache.refreshes == 1
+        assert laser.laser_wavelength == 488.0
+        assert cache.get("EMU0001").updated > 0
+
+    def test_corrupt_file(self, tmp_path):
+        """Test that an unreadable cache file is ignored."""
+        path = tmp_path / "devices.json"
+        path.write_text("{not json")
+        assert DeviceCache(path).get("EMU0001") is None
+
+
+def test_get_lasers_with_cache(monkeypatch, tmp_path):
+    """Test that get_lasers connects and fills in the metadata."""
+    device = VortranDevice(0x201A, 0x1001, bus=1, address=4)
+    monkeypatch.setattr(vortran.laser, "get_usb_ports", lambda: {"usb_laser": device})
+
+    def open_connection(self, reset=True):
+        self.connection = EmulatedConnection()
+        self.is_connected = True
+        self.serial_number = "EMU0001"
+        return True
+
+    monkeypatch.setattr(Laser, "open_connection", open_connection)
+    lasers = get_lasers(cache=tmp_path / "devices.json")
+    assert lasers[0].info.laser_id == "EMULATED"
+    assert lasers[0].rated_power == 100.0
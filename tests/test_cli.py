@@ -0,0 +1,97 @@
+"""Tests for cli module."""
+
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from vortran import cli
+from vortran.usb import VortranDevice
+
+
+@pytest.fixture
+def lasers(make_laser):
+    lasers = [make_laser(1000, {"FC": "16"}, address=i + 1) for i in range(2)]
+    for laser in lasers:
+        laser.open_connection = lambda: True
+    with patch("vortran.laser.get_lasers", return_value=lasers):
+        yield lasers
+
+
+class TestCli:
+    """Tests for the vortran command line tool."""
+
+    def test_requires_subcommand(self):
+        """Test that a subcommand is required."""
+        with pytest.raises(SystemExit):
+            cli.main([])
+
+    def test_list(self, capsys):
+        """Test listing devices."""
+        devices = {"usb_a": VortranDevice(0x04D8, 0x003F, 1, 2, is_manager=True)}
+        with patch("vortran.usb.get_usb_ports", return_value=devices):
+            assert cli.main(["list"]) == 0
+        out = capsys.readouterr().out
+        assert "usb_a" in out and "manager" in out
+
+    def test_status(self, lasers, capsys):
+        """Test the status output."""
+        assert cli.main(["status", "--laser", "1"]) == 0
+        out = capsys.readouterr().out
+        assert "Laser 1 (bus 1, address 2)" in out
+        assert "INTERLOCK_OPEN" in out
+
+    def test_status_failed_open(self, lasers, capsys):
+        """Test that a laser failing to open doesn't shift the indices."""
+        lasers[0].open_connection = lambda: False
+        assert cli.main(["status"]) == 0
+        captured = capsys.readouterr()
+        assert "Laser 1 (bus 1, address 2)" in captured.out
+        assert "Laser 0" not in captured.out
+        assert "address 1" in captured.err
+
+    def test_watch(self, lasers, capsys):
+        """Test a bounded number of refreshes."""
+        assert cli.main(["watch", "-n", "2", "-r", "100", "--no-clear"]) == 0
+        out = capsys.readouterr().out
+        assert out.count("DELAY") == 2
+        assert "50.0" in out
+        # a single ?LS per laser and refresh
+        for laser in lasers:
+            assert laser.connection.commands == ["?LS", "?LS"]
+
+    def test_bench(self, lasers, capsys):
+        """Test benchmarking including the ?LS status query."""
+        assert cli.main(["bench", "-n", "3", "?LP", "?LS"]) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 5
+        assert all(line.split()[-1] == "0" for line in lines[1:])
+
+    def test_invalid_laser_index(self, lasers):
+        """Test selecting a laser that does not exist."""
+        with pytest.raises(SystemExit):
+            cli.main(["status", "--laser", "5"])
+
+    @staticmethod
+    def soak(*limits: str) -> int:
+        args = ["soak", "-d", "0.3", "-i", "0.1", "--lasers", "2", "--seed", "1"]
+        vortran_logger = logging.getLogger("vortran")
+        level = vortran_logger.level
+        try:
+            return cli.main(args + list(limits))
+        finally:
+            vortran_logger.setLevel(level)
+
+    def test_soak(self, capsys):
+        """Test a very short soak run within generous limits."""
+        code = self.soak("--max-throughput-drop", "1", "--max-latency-rise", "1e9")
+        out = capsys.readouterr().out
+        assert code == 0
+        assert "q/s" in out and "injected faults" in out
+
+    def test_soak_degraded(self, capsys):
+        """Test that a degraded run exits with 1."""
+        # any latency at the end counts as a rise
+        code = self.soak("--max-latency-rise", "-1")
+        assert code == 1
+        assert "DEGRADED: p99 latency" in capsys.readouterr().err
@@ -0,0 +1,98 @@
+"""Tests for config module."""
+
+import pytest
+
+from vortran.config import LaserConfig, apply_configs
+
+
+class TestLaserConfig:
+    """Tests for LaserConfig class."""
+
+    def test_settings(self):
+        """Test conversion to device commands."""
+        config = LaserConfig(control_mode="current", power=12.34, pulsed=True)
+        assert config.settings() == {"C": "1", "LP": "012.3", "PUL": "1"}
+
+    def test_invalid_control_mode(self):
+        """Test that unknown control modes are rejected."""
+        with pytest.raises(ValueError):
+            LaserConfig(control_mode="voltage")
+
+
+class TestApplyConfig:
+    """Tests for Laser.apply_config."""
+
+    def test_nothing_to_do(self, laser):
+        """Test that a matching state costs a single ?LS query."""
+        report = laser.apply_config(
+            LaserConfig(control_mode="power", power=50.0, external_power_control=False)
+        )
+        assert not report.changed
+        assert report.queries == 1
+        assert laser.connection.commands == ["?LS"]
+        assert sorted(report.unchanged) == ["C", "EPC", "LP"]
+        assert report.unread == []
+
+    def test_minimal_diff(self, laser):
+        """Test that only differing settings are sent."""
+        report = laser.apply_config(
+            LaserConfig(power=20.0, delay=False, pulse_power=10)
+        )
+        assert [(c.key, c.old, c.new) for c in report.changes] == [
+            ("LP", "50.0", "020.0"),
+            ("PP", "50.0", "010.0"),
+        ]
+        assert laser.connection.commands == ["?LS", "?PP", "LP=020.0", "PP=010.0"]
+        assert laser.connection.values["LP"] == "020.0"
+        assert report.ok
+        assert report.elapsed > 0
+
+    def test_safe_order(self, laser):
+        """Test that the control mode is set before setpoints and
+        setpoints before the modes using them.
+
+        """
+        laser.apply_config(
+            LaserConfig(pulsed=True, pulse_power=5, control_mode="current", power=1)
+        )
+        sent = [c for c in laser.connection.commands if "=" in c]
+        assert sent == ["C=1", "LP=001.0", "PP=005.0", "PUL=1"]
+
+    def test_dry_run(self, laser):
+        """Test that a dry run only reports."""
+        report = laser.apply_config(LaserConfig(power=20.0), dry_run=True)
+        assert report.changes[0].key == "LP"
+        assert laser.connection.commands == ["?LS"]
+
+    def test_state_read_failed(self, laser, monkeypatch):
+        """Test that a failed state read is reported, not taken as a
+        state that differs everywhere.
+
+        """
+        send_query = laser.send_query
+        monkeypatch.setattr(
+            laser,
+            "send_query",
+            lambda cmd, *args: None if cmd == "?LS" else send_query(cmd, *args),
+        )
+        report = laser.apply_config(LaserConfig(power=50.0, pulse_power=50))
+        assert report.unread == ["LP"]
+        assert report.unchanged == ["PP"]
+        assert [(c.key, c.old) for c in report.changes] == [("LP", None)]
+        assert report.ok
+
+    def test_no_response(self, laser):
+        """Test that a lost device is reported as an error."""
+        laser.connection.alive = False
+        report = laser.apply_config(LaserConfig(power=20.0))
+        assert not report.ok
+
+
+def test_apply_configs_in_parallel(make_laser):
+    """Test that a fleet is configured concurrently."""
+    lasers = [make_laser(address=address) for address in range(1, 5)]
+    reports = apply_configs(lasers, LaserConfig(power=10.0))
+    assert all(report.changed for report in reports)
+    assert all(laser.connection.values["LP"] == "010.0" for laser in lasers)
+    with pytest.raises(ValueError):
+        apply_configs(lasers, [LaserConfig()])
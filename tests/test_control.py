@@ -0,0 +1,119 @@
+"""Tests for control module."""
+
+import time
+
+import pytest
+
+from vortran.control import PowerController
+
+from emulated import FaultyConnection
+
+
+class LossyLaser(FaultyConnection):
+    """Emits only ``efficiency`` of the power setting."""
+
+    efficiency = 0.8
+
+    def respond(self, cmd):
+        if cmd == "?LP":
+            power = float(self.values["LPS"]) * self.efficiency
+            return f"\r\n?LP={power:.2f}\r\n\r\n"
+        if cmd.startswith("LP="):
+            self.values["LPS"] = cmd[3:]
+        return super().respond(cmd)
+
+
+@pytest.fixture
+def laser_options():
+    return {"timeout": 1000, "connection": LossyLaser({"LPS": "50.0"})}
+
+
+class TestPowerController:
+    """Tests for PowerController class."""
+
+    def test_converges(self, laser):
+        """Test that the integral term removes the offset."""
+        controller = PowerController(laser, 50.0, kp=0.2, ki=50.0)
+        assert controller.bias == 50.0
+        for _ in range(500):
+            controller.step()
+            time.sleep(0.001)
+        assert controller.measurement == pytest.approx(50.0, abs=0.2)
+        assert float(laser.connection.values["LPS"]) == pytest.approx(62.5, abs=0.3)
+
+    def test_setpoint_clamped_to_max_power(self, laser):
+        """Test that the setpoint is limited by laser_max_power."""
+        controller = PowerController(laser, 500.0)
+        assert controller.setpoint == 100.0
+        controller.setpoint = -5
+        assert controller.setpoint == 0.0
+
+    def test_anti_windup(self, laser):
+        """Test that the integral does not wind up beyond saturation."""
+        laser.connection.efficiency = 0.1
+        controller = PowerController(laser, 90.0, kp=0.0, ki=100.0)
+        for _ in range(500):
+            controller.step()
+            time.sleep(0.001)
+            if controller.output == 100.0:
+                break
+        assert controller.output == 100.0
+        for _ in range(200):
+            controller.step()
+        assert controller.bias + controller.ki * controller.integral <= 100.0
+
+    def test_write_only_and_skip_unchanged(self, laser):
+        """Test that writes skip the response and unchanged outputs."""
+        laser.connection.efficiency = 1.0
+        controller = PowerController(laser, 50.0, kp=1.0, ki=0.0)
+        controller.step()
+        controller.step()
+        setters = [c for c in laser.connection.commands if c.startswith("LP=")]
+        assert setters == ["LP=050.0"]
+        assert controller.stats().skipped_writes == 1
+
+    def test_thread_reports_rate(self, laser):
+        """Test the background loop and its timing statistics."""
+        controller = PowerController(laser, 50.0, rate=200)
+        controller.start()
+        time.sleep(0.2)
+        controller.stop()
+        stats = controller.stats()
+        assert stats.iterations > 5
+        assert 0 < stats.rate <= 250
+        assert stats.jitter >= 0
+
+    def test_no_flush_read(self, laser, monkeypatch):
+        """Test that the loop only reads packets the device has sent."""
+        controller = PowerController(laser, 50.0)
+        connection = laser.connection
+        read = connection.read
+        empty_reads = []
+
+        def counting_read(*args, **kwargs):
+            # a flush read finds nothing to read
+            if not connection._packets:
+                empty_reads.append(args)
+            return read(*args, **kwargs)
+
+        monkeypatch.setattr(connection, "read", counting_read)
+        for _ in range(10):
+            assert controller.step() is not None
+        assert empty_reads == []
+
+    def test_lost_reply_skips_iteration(self, laser):
+        """Test that a lost reply is neither re-read nor re-sent."""
+        controller = PowerController(laser, 50.0, timeout=0.05)
+        laser.connection.commands.clear()
+        laser.connection.late_responses = 1
+        start = time.monotonic()
+        assert controller.step() is None
+        assert time.monotonic() - start < 0.5
+        assert controller.failed_reads == 1
+        assert laser.connection.commands == ["?LP"]
+        assert controller.step() is not None
+
+    def test_invalid_actuator(self, laser):
+        """Test that unknown actuators are rejected."""
+        with pytest.raises(ValueError):
+            PowerController(laser, 50.0, actuator="voltage")
@@ -0,0 +1,90 @@
+"""Tests for faults module."""
+
+import time
+
+
+from vortran.faults import FaultWatcher
+from vortran.laser import LaserStatus, decode_faults
+
+
+class TestDecodeFaults:
+    """Tests for decode_faults function."""
+
+    def test_no_faults(self):
+        """Test that zero decodes to an empty list."""
+        assert decode_faults(0) == []
+
+    def test_multiple_faults(self):
+        """Test decoding of several bits."""
+        assert decode_faults(16 + 128) == [
+            LaserStatus.INTERLOCK_OPEN,
+            LaserStatus.DIODE_TEMPERATURE_FAULT,
+        ]
+
+
+class TestFaultCode:
+    """Tests for the fault properties of Laser."""
+
+    def test_fault_bitmask_single_round_trip(self, laser):
+        """Test that the bitmask is read with one command."""
+        laser.connection.values["FC"] = "18"
+        assert laser.fault_bitmask == 18
+        assert laser.connection.commands == ["?FC"]
+
+    def test_fault_code(self, laser):
+        """Test fault_code decodes the bitmask."""
+        laser.connection.values["FC"] = "16"
+        assert laser.fault_code == [LaserStatus.INTERLOCK_OPEN]
+
+
+class TestFaultWatcher:
+    """Tests for FaultWatcher class."""
+
+    def test_no_event_without_change(self, laser):
+        """Test that an unchanged bitmask is not decoded."""
+        watcher = FaultWatcher(laser)
+        assert watcher.poll() == []
+        assert watcher.poll() == []
+        assert laser.connection.commands == ["?FC", "?FC"]
+
+    def test_events_on_transition(self, laser):
+        """Test raised and cleared events and the status filter."""
+        watcher = FaultWatcher(laser)
+        seen = []
+        interlock = []
+        watcher.add_callback(seen.append)
+        watcher.add_callback(interlock.append, LaserStatus.INTERLOCK_OPEN)
+        watcher.poll()
+
+        laser.connection.values["FC"] = str(16 + 128)
+        events = watcher.poll()
+        assert [(e.status, e.active) for e in events] == [
+            (LaserStatus.INTERLOCK_OPEN, True),
+            (LaserStatus.DIODE_TEMPERATURE_FAULT, True),
+        ]
+        assert events[0].text == ["No Faults"]
+        assert events[0].latency >= 0
+
+        laser.connection.values["FC"] = "128"
+        events = watcher.poll()
+        assert [(e.status, e.active) for e in events] == [
+            (LaserStatus.INTERLOCK_OPEN, False)
+        ]
+        assert len(seen) == 3
+        assert [e.active for e in interlock] == [True, False]
+
+    def test_background_thread(self, laser):
+        """Test that the thread picks up a change."""
+        watcher = FaultWatcher(laser, interval=0.001, fetch_text=False)
+        seen = []
+        watcher.add_callback(seen.append)
+        watcher.start()
+        try:
+            laser.connection.values["FC"] = "16"
+            deadline = time.monotonic() + 2
+            while not seen and time.monotonic() < deadline:
+                time.sleep(0.001)
+        finally:
+            watcher.stop()
+        assert seen[0].status == LaserStatus.INTERLOCK_OPEN
+        assert seen[0].text is None
@@ -0,0 +1,75 @@
+"""Startup cost of the vortran package, measured with -X importtime."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# generous default so slow CI machines don't fail; lower it locally to
+# catch smaller regressions
+BUDGET_MS = float(os.getenv("VORTRAN_IMPORT_BUDGET_MS", "100"))
+
+
+def import_times(code: str) -> dict[str, int]:
+    """Run code in a fresh interpreter and return the import time in
+    microseconds of every module it imported, excluding the modules it
+    imported in turn, so times can be added up.
+
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_time)
+    return times
+
+
+class TestImportTime:
+    """Tests for lazy loading of the package."""
+
+    def test_package_import_loads_nothing(self):
+        """Test that importing the package does not load submodules."""
+        times = import_times("import vortran")
+        assert [m for m in times if m.startswith("vortran.")] == []
+        assert "usb" not in times
+
+    def test_offline_names_skip_pyusb(self):
+        """Test that parsing and status helpers don't pull in pyusb."""
+        times = import_times(
+            "import vortran; vortran.parse_output; vortran.LaserStatus"
+        )
+        assert "vortran.parser" in times
+        assert "vortran.status" in times
+        assert not any(m == "usb" or m.startswith("usb.") for m in times)
+        assert not any(m.startswith("vortran.laser") for m in times)
+        total = sum(t for m, t in times.items() if m.split(".")[0] == "vortran")
+        assert total / 1000 < BUDGET_MS
+
+    def test_device_names_load_on_access(self):
+        """Test that device classes are imported on first use."""
+        times = import_times("import vortran; vortran.Laser")
+        assert "vortran.laser" in times
+        assert "usb.core" in times
+
+    def test_submodule_attributes(self):
+        """Test that submodules are reachable as package attributes."""
+        times = import_times(
+            "import vortran; vortran.status.LaserStatus; vortran.parser.parse_output"
+        )
+        assert "vortran.status" in times
+        assert "usb" not in times
+
+    def test_unknown_attribute(self):
+        """Test that unknown names still raise AttributeError."""
+        import vortran
+
+        with pytest.raises(AttributeError):
+            vortran.no_such_module
@@ -0,0 +1,207 @@
+"""Tests for manager module and manager discovery."""
+
+from types import SimpleNamespace
+import time
+
+import pytest
+import usb.core
+
+from vortran.manager import PipelinedLasers, get_managers
+from vortran.usb import VortranDevice, get_port_paths, map_lasers_to_managers
+
+
+def device(bus, address, is_manager=False):
+    if is_manager:
+        return VortranDevice(0x04D8, 0x003F, bus, address, is_manager=True)
+    return VortranDevice(0x201A, 0x1001, bus, address)
+
+
+@pytest.fixture
+def attached(make_laser):
+    """Lasers attached to a manager, with the address as power."""
+
+    def attached(address, manager="m1"):
+        return make_laser(100, {"LP": f"{address}.0"}, address=address, manager=manager)
+
+    return attached
+
+
+class TestMapLasersToManagers:
+    """Tests for map_lasers_to_managers function."""
+
+    def test_by_port_path(self):
+        """Test that lasers behind the manager's hub are assigned to it."""
+        devices = {
+            "m1": device(1, 2, True),
+            "m2": device(1, 6, True),
+            "a": device(1, 3),
+            "b": device(1, 4),
+            "c": device(1, 7),
+        }
+        paths = {
+            "m1": (1, 1),
+            "a": (1, 2),
+            "b": (1, 3),
+            "m2": (2, 1),
+            "c": (2, 4),
+        }
+        mapping = map_lasers_to_managers(devices, paths)
+        assert mapping == {"a": "m1", "b": "m1", "c": "m2"}
+        assert devices["c"].manager == "m2"
+
+    def test_single_manager_per_bus_fallback(self):
+        """Test assignment by bus when port paths are unknown."""
+        devices = {
+            "m1": device(1, 2, True),
+            "a": device(1, 3),
+            "b": device(2, 4),
+        }
+        assert map_lasers_to_managers(devices, {}) == {"a": "m1"}
+        assert devices["b"].manager is None
+
+    def test_port_numbers(self, monkeypatch):
+        """Test with port numbers as pyusb reports them: two managers
+        with their internal hubs behind an external hub, and a laser and
+        a manager plugged straight into root ports.
+
+        """
+        devices = {
+            "m1": device(1, 5, True),
+            "a": device(1, 6),
+            "b": device(1, 7),
+            "m2": device(1, 9, True),
+            "c": device(1, 10),
+            "m3": device(2, 2, True),
+            "d": device(2, 3),
+        }
+        ports = {
+            (1, 4): (2,),  # the external hub
+            (1, 5): (2, 1, 1),
+            (1, 6): (2, 1, 2),
+            (1, 7): (2, 1, 4),
+            (1, 8): (2, 3),  # the second manager's hub
+            (1, 9): (2, 3, 1),
+            (1, 10): (2, 3, 2),
+            (1, 11): (3,),  # not a Vortran device
+            (2, 2): (1,),
+            (2, 3): (4,),
+        }
+        usb_devices = [
+            SimpleNamespace(bus=bus, address=address, port_numbers=path)
+            for (bus, address), path in ports.items()
+        ]
+        usb_devices.append(SimpleNamespace(bus=1, address=1, port_numbers=None))
+        monkeypatch.setattr(usb.core, "find", lambda **kwargs: iter(usb_devices))
+
+        paths = get_port_paths(devices)
+        assert paths["m1"] == (2, 1, 1) and paths["d"] == (4,)
+        assert len(paths) == len(devices)
+        mapping = map_lasers_to_managers(devices)
+        assert mapping == {"a": "m1", "b": "m1", "c": "m2"}
+        assert devices["d"].manager is None
+
+
+class TestPipelinedLasers:
+    """Tests for PipelinedLasers class."""
+
+    def test_query_all_skips_flush(self, attached):
+        """Test grouped queries return every laser's response."""
+        lasers = [attached(3), attached(4)]
+        manager = PipelinedLasers("m1", lasers)
+        assert manager.parse_all("?LP") == [["3.0"], ["4.0"]]
+        assert manager.grouped_ok == 2
+        assert manager.fallbacks == 0
+        assert all(laser.connection.commands == ["?LP"] for laser in lasers)
+
+    def test_status_query(self, attached):
+        """Test that ?LS is verified by its keys."""
+        manager = PipelinedLasers("m1", [attached(3)])
+        assert manager.parse_all("?LS") == [["0", "50.0", "100.0", "0", "0"]]
+
+    def test_fallback_per_laser(self, attached):
+        """Test that a failed grouped response is retried per laser."""
+        lasers = [attached(3), attached(4)]
+        lasers[1].connection.late_responses = 1
+        manager = PipelinedLasers("m1", lasers)
+        assert manager.parse_all("?LP") == [["3.0"], ["4.0"]]
+        assert manager.fallbacks == 1
+
+    def test_send_all_never_resends(self, attached):
+        """Test that setters are only re-read on failure."""
+        lasers = [attached(3), attached(4)]
+        lasers[0].connection.late_responses = 10
+        manager = PipelinedLasers("m1", lasers)
+        results = manager.send_all("LE=1")
+        assert results[0] is None
+        assert results[1] is not None
+        assert lasers[0].connection.commands == ["LE=1"]
+        assert lasers[1].connection.values["LE"] == "1"
+
+    def test_send_all_after_grouping_disabled(self, attached):
+        """Test that setters are sent per laser once grouping is off."""
+        lasers = [attached(3), attached(4)]
+        manager = PipelinedLasers("m1", lasers)
+        manager.grouped = False
+        results = manager.send_all("LP=20.0")
+        assert all(result is not None for result in results)
+        assert all(laser.connection.values["LP"] == "20.0" for laser in lasers)
+        assert manager.fallbacks == 2
+
+    def test_send_all_to_unwritten_laser(self, attached):
+        """Test that a laser the group write failed for gets the setter."""
+        lasers = [attached(3), attached(4)]
+        manager = PipelinedLasers("m1", lasers)
+        original = lasers[1].connection.ctrl_transfer
+        calls = []
+
+        def fail_first(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise usb.core.USBError("Pipe error", -9, 32)
+            return original(*args)
+
+        lasers[1].connection.ctrl_transfer = fail_first
+        results = manager.send_all("LE=1")
+        assert all(result is not None for result in results)
+        assert lasers[1].connection.commands == ["LE=1"]
+
+    def test_grouped_discards_queued_packets(self, make_laser):
+        """Test that packets a background reader queued are not taken
+        for the response.
+
+        """
+        laser = make_laser(
+            100, {"LP": "3.0"}, address=3, manager="m1", blocking_reads=True
+        )
+        reader = laser.start_reader()
+        try:
+            connection = laser.connection
+            connection._packets.append(connection._packet([0x01, 0xFF]))
+            connection._packets.append(
+                connection._packet([0x00], b"\r\n?LP=99.0\r\n\r\n")
+            )
+            deadline = time.monotonic() + 1
+            while len(reader) < 2 and time.monotonic() < deadline:
+                time.sleep(0.005)
+            manager = PipelinedLasers("m1", [laser])
+            assert manager.parse_all("?LP") == [["3.0"]]
+            assert manager.fallbacks == 0
+        finally:
+            laser.stop_reader()
+
+    def test_disables_grouping(self, attached):
+        """Test falling back for good after repeated failures."""
+        laser = attached(3)
+        manager = PipelinedLasers("m1", [laser], max_failed_rounds=2)
+        for _ in range(2):
+            laser.connection.late_responses = 1
+            manager.query_all("?LP")
+        assert not manager.grouped
+        assert manager.parse_all("?LP") == [["3.0"]]
+
+
+def test_get_managers(attached):
+    """Test grouping lasers by manager."""
+    lasers = [attached(3), attached(4, None), attached(5)]
+    groups = {m.name: m.lasers for m in get_managers(lasers)}
+    assert groups == {"m1": [lasers[0], lasers[2]], None: [lasers[1]]}
@@ -1,7 +1,7 @@
 """Tests for parser module."""
 
 import pytest
-from vortran.parser import parse_output, verify_result
+from vortran.parser import parse_key_values, parse_output, verify_result
 
 
 class TestParseOutput:
@@ -97,3 +97,20 @@ class TestVerifyResult:
         command = ["LP", "C"]
         # Current implementation uses 'in' operator, so substrings match
         assert verify_result(input_str, command) is True
+
+
+class TestParseKeyValues:
+    """Tests for parse_key_values function."""
+
+    def test_status_response(self):
+        """Test parsing a multi-line status response."""
+        input_str = "\r\n?C=0\r\n?LPS=50.0\r\n?EPC=1\r\n\r\n"
+        assert parse_key_values(input_str) == {"C": "0", "LPS": "50.0", "EPC": "1"}
+
+    def test_none_input(self):
+        """Test parsing None input."""
+        assert parse_key_values(None) is None
+
+    def test_skips_lines_without_value(self):
+        """Test that lines without an equals sign are ignored."""
+        assert parse_key_values("\nMALFORMED\nlp = 1.0\n") == {"LP": "1.0"}
@@ -0,0 +1,94 @@
+"""Tests for reader module and USB_ReadWrite.start_reader."""
+
+import time
+
+import pytest
+
+
+@pytest.fixture
+def laser_options():
+    return {"blocking_reads": True}
+
+
+@pytest.fixture
+def laser(laser):
+    yield laser
+    laser.stop_reader()
+
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestEndpointReader:
+    """Tests for EndpointReader class."""
+
+    def test_queries(self, laser):
+        """Test that transactions work through the reader queue."""
+        reader = laser.start_reader()
+        assert laser.power == 50.0
+        assert laser.laser_status == ["0", "50.0", "100.0", "0", "0"]
+        assert reader.received >= 4
+        assert len(reader) == 0
+
+    def test_no_flush_read(self, laser):
+        """Test that queries don't wait for a flush read timeout."""
+        laser.start_reader()
+        start = time.monotonic()
+        for _ in range(10):
+            assert laser.power == 50.0
+        assert time.monotonic() - start < 10 * laser.flush_timeout / 1000
+
+    def test_stale_packets_discarded(self, laser):
+        """Test that packets left over from earlier are dropped before a
+        command is sent.
+
+        """
+        reader = laser.start_reader()
+        laser.connection.ctrl_transfer(
+            0x21, 0x09, 0x200, 0, laser.encode_command("?BPT")
+        )
+        laser.connection.ctrl_transfer(0x21, 0x09, 0x200, 0, laser.data_in_array_3)
+        assert wait_for(lambda: len(reader) > 0)
+        assert laser.power == 50.0
+
+    def test_clear_during_read(self, laser):
+        """Test that a packet read before clear() but queued after it is
+        dropped, and one read after it is kept.
+
+        """
+        reader = laser.start_reader()
+        packet = laser.connection._packet([0x01, 0xFF])
+        generation = reader._generation
+        assert reader.clear() == 0
+        reader._put(packet, generation)
+        assert len(reader) == 0
+        reader._put(packet, reader._generation)
+        assert reader.get(0) is packet
+
+    def test_bounded_queue(self, laser):
+        """Test that the oldest packets are dropped when full."""
+        reader = laser.start_reader(maxlen=2)
+        for _ in range(4):
+            laser.connection.ctrl_transfer(0x21, 0x09, 0x200, 0, laser.data_in_array_2)
+        assert wait_for(lambda: reader.received == 4)
+        assert reader.dropped == 2
+        assert len(reader) == 2
+
+    def test_disconnect(self, laser):
+        """Test that a read error marks the laser disconnected."""
+        reader = laser.start_reader()
+        laser.connection.alive = False
+        assert wait_for(lambda: not laser.is_connected)
+        assert reader.errors > 0
+        assert laser.power is None
+
+    def test_stop(self, laser):
+        """Test that stopping falls back to direct reads."""
+        laser.start_reader()
+        laser.stop_reader()
+        assert laser.reader is None
+        assert laser.power == 50.0
@@ -0,0 +1,95 @@
+"""Tests for reassembly module and multi-packet responses."""
+
+import pytest
+
+from vortran.parser import parse_output
+from vortran.reassembly import PAYLOAD_SIZE, ResponseBuffer
+
+
+def _payload(text: str) -> bytes:
+    data = text.encode("ascii")
+    return data + bytes(PAYLOAD_SIZE - len(data))
+
+
+@pytest.fixture
+def laser_options():
+    return {"timeout": 20}
+
+
+class TestResponseBuffer:
+    """Tests for ResponseBuffer class."""
+
+    def test_single_packet(self):
+        """Test that a short packet with a line end completes."""
+        buffer = ResponseBuffer()
+        buffer.reset(echo="?lp")
+        assert buffer.feed(_payload("\r\n?LP=50.0\r\n\r\n"))
+        assert buffer.text() == "\r\n?LP=50.0\r\n\r\n"
+        assert buffer.packets == 1
+
+    def test_full_packet_is_not_complete(self):
+        """Test that a full packet waits for the next one."""
+        buffer = ResponseBuffer()
+        text = "\r\n?FD=" + "x" * 80 + "\r\n\r\n"
+        assert not buffer.feed(_payload(text[:PAYLOAD_SIZE]))
+        assert buffer.feed(_payload(text[PAYLOAD_SIZE:]))
+        assert buffer.text() == text
+        assert buffer.packets == 2
+
+    def test_echo_across_packets(self):
+        """Test that an echo split over two packets is found."""
+        buffer = ResponseBuffer()
+        buffer.reset(echo="?fd")
+        text = "x" * (PAYLOAD_SIZE - 2) + "?FD=1"
+        buffer.feed(_payload(text[:PAYLOAD_SIZE]))
+        assert not buffer.has_echo
+        assert buffer.feed(_payload(text[PAYLOAD_SIZE:]))
+        assert buffer.has_echo
+
+    def test_timed_out_read(self):
+        """Test completion when a full packet ending a line is the last."""
+        buffer = ResponseBuffer()
+        text = "x" * (PAYLOAD_SIZE - 2) + "\r\n"
+        assert not buffer.feed(_payload(text))
+        assert buffer.timed_out_read()
+        buffer.reset()
+        assert not buffer.feed(_payload("y" * PAYLOAD_SIZE))
+        assert not buffer.timed_out_read()
+
+    def test_overflow(self):
+        """Test that oversized responses are truncated."""
+        buffer = ResponseBuffer(max_size=100)
+        assert not buffer.feed(_payload("a" * PAYLOAD_SIZE))
+        assert buffer.feed(_payload("b" * PAYLOAD_SIZE))
+        assert buffer.overflow
+        assert buffer.size == 100
+
+    def test_reset(self):
+        """Test that reset clears the previous response."""
+        buffer = ResponseBuffer()
+        buffer.feed(_payload("\r\n?LP=50.0\r\n"))
+        buffer.reset()
+        assert buffer.text() == ""
+        assert not buffer.has_line_end
+
+
+class TestMultiPacketResponse:
+    """Tests for long responses read through USB_ReadWrite."""
+
+    def test_long_fault_description(self, laser):
+        """Test that a response spanning three packets is parsed in one
+        transaction.
+
+        """
+        text = "Fault " + "; ".join(f"condition {i}" for i in range(12))
+        laser.connection.values["FD"] = text
+        assert laser.fault_text == [text]
+        assert laser.connection.commands == ["?FD"]
+        assert laser.retry_stats.first_try == 1
+
+    def test_long_status(self, laser):
+        """Test that ?LS longer than one packet keeps all keys."""
+        laser.connection.values["DELAY"] = "1" * 60
+        result = parse_output(laser.send_query("?LS", ["?C", "?LPS"]))
+        assert result[-1] == "1" * 60
+        assert len(result) == 5
@@ -0,0 +1,122 @@
+"""Tests for retry module and Laser.send_query."""
+
+import threading
+
+import pytest
+
+from vortran.retry import RetryBudget, RetryPolicy
+
+
+@pytest.fixture
+def laser_options():
+    return {"timeout": 20}
+
+
+class TestRetryPolicy:
+    """Tests for RetryPolicy class."""
+
+    def test_queries_are_idempotent(self):
+        """Test that only queries and whitelisted setters are resent."""
+        policy = RetryPolicy(idempotent={"LP="})
+        assert policy.may_resend("?LE")
+        assert policy.may_resend("LP=50.0")
+        assert not policy.may_resend("LE=1")
+
+    def test_per_command_budget(self):
+        """Test budget overrides."""
+        policy = RetryPolicy(budgets={"?FD": RetryBudget(rereads=3, resends=0)})
+        assert policy.budget("?FD").rereads == 3
+        assert policy.budget("?LP") == RetryBudget(1, 1)
+
+
+class TestSendQuery:
+    """Tests for the retry behaviour of Laser.send_query."""
+
+    def test_first_try(self, laser):
+        """Test that a good response is not retried."""
+        assert laser.power == 50.0
+        assert laser.retry_stats.first_try == 1
+        assert laser.retry_stats.retry_time == 0
+
+    def test_late_response_is_reread(self, laser):
+        """Test that a timeout is recovered without re-sending."""
+        laser.connection.late_responses = 1
+        assert laser.power == 50.0
+        assert laser.connection.commands == ["?LP"]
+        assert laser.retry_stats.timeouts == 1
+        assert laser.retry_stats.reread_successes == 1
+        assert laser.retry_stats.resends == 0
+
+    def test_mismatch_is_resent(self, laser):
+        """Test that a wrong response leads to re-sending."""
+        laser.connection.wrong_response = "\r\n?BPT=25.0\r\n\r\n"
+        assert laser.power == 50.0
+        assert laser.connection.commands == ["?LP", "?LP"]
+        assert laser.retry_stats.mismatches == 1
+        assert laser.retry_stats.rereads == 0
+        assert laser.retry_stats.resend_successes == 1
+
+    def test_reread_then_resend(self, laser):
+        """Test escalation when the re-read also times out."""
+        laser.connection.late_responses = 2
+        assert laser.power == 50.0
+        assert laser.connection.commands == ["?LP", "?LP"]
+        assert laser.retry_stats.rereads == 1
+        assert laser.retry_stats.resend_successes == 1
+
+    def test_gives_up(self, laser):
+        """Test that the budget bounds the retries."""
+        laser.connection.late_responses = 10
+        assert laser.power is None
+        assert laser.retry_stats.failures == 1
+        assert laser.retry_stats.retry_time > 0
+
+    def test_setter_not_resent(self, laser):
+        """Test that non-idempotent commands are never re-sent."""
+        laser.connection.late_responses = 10
+        assert laser.send_query("LE=1") is None
+        assert laser.connection.commands == ["LE=1"]
+        assert laser.retry_stats.blocked_resends == 1
+
+    def test_ladder_holds_the_lock(self, laser, monkeypatch):
+        """Test that no other transaction can run between a timed out
+        query and its re-read.
+
+        """
+        laser.connection.late_responses = 1
+        send_usb = laser.send_usb
+        acquired = []
+
+        def try_lock() -> None:
+            acquired.append(laser.lock.acquire(blocking=False))
+            if acquired[-1]:
+                laser.lock.release()
+
+        def checked_send_usb(*args, **kwargs):
+            result = send_usb(*args, **kwargs)
+            other = threading.Thread(target=try_lock)
+            other.start()
+            other.join()
+            return result
+
+        monkeypatch.setattr(laser, "send_usb", checked_send_usb)
+        assert laser.power == 50.0
+        assert laser.retry_stats.reread_successes == 1
+        assert acquired == [False]
+
+    def test_preempted_ladder(self, laser, monkeypatch):
+        """Test that retries stop when an emergency off preempts."""
+        laser.connection.late_responses = 1
+        send_usb = laser.send_usb
+
+        def preempted_send_usb(*args, **kwargs):
+            laser.preempt.set()
+            return send_usb(*args, **kwargs)
+
+        monkeypatch.setattr(laser, "send_usb", preempted_send_usb)
+        try:
+            assert laser.power is None
+        finally:
+            laser.preempt.clear()
+        assert laser.retry_stats.rereads == 0
+        assert laser.retry_stats.failures == 1
@@ -0,0 +1,141 @@
+"""Tests for scheduler module."""
+
+import time
+
+import pytest
+
+from vortran.emulation import EmulatedConnection
+from vortran.scheduler import PollScheduler
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SlowConnection(EmulatedConnection):
+    """Emulated device that takes ``delay`` seconds of ``clock`` time to
+    answer each command.
+
+    """
+
+    def __init__(self, clock: FakeClock, delay: float = 0.005) -> None:
+        super().__init__()
+        self.clock = clock
+        self.delay = delay
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue, wIndex, data) -> int:
+        if data[0] == 0xA0:
+            self.clock.now += self.delay
+        return super().ctrl_transfer(bmRequestType, bRequest, wValue, wIndex, data)
+
+
+def run_until(scheduler: PollScheduler, bus: int, end: float) -> None:
+    """Run the tasks of one bus worker, without its thread, until
+    ``end``, skipping idle time.
+
+    """
+    worker = scheduler._workers[bus]
+    clock = scheduler.clock
+    while worker.tasks and clock.now < end:
+        if not worker._ready:
+            release = min(task.release for task in worker.tasks)
+            if release >= end:
+                return
+            clock.now = max(clock.now, release)
+        worker.run_once(worker._next())
+
+
+class TestPollScheduler:
+    """Tests for PollScheduler class."""
+
+    def test_one_worker_per_bus(self, make_laser):
+        """Test that lasers are grouped by bus."""
+        lasers = [
+            make_laser(bus=1, address=1),
+            make_laser(bus=1, address=2),
+            make_laser(bus=2, address=1),
+        ]
+        scheduler = PollScheduler(lasers, rates={"power": 10})
+        assert sorted(scheduler.buses) == [1, 2]
+        assert len(scheduler._workers[1].tasks) == 2
+
+    def test_unknown_property(self, make_laser):
+        """Test that misspelled properties are rejected."""
+        with pytest.raises(ValueError):
+            PollScheduler([make_laser(bus=1, address=1)], rates={"powr": 1})
+
+    def test_per_property_rates(self, make_laser):
+        """Test that faster properties are polled more often."""
+        laser = make_laser(bus=1, address=1)
+        rates = {"fault_bitmask": 50, "base_plate_temperature": 5}
+        scheduler = PollScheduler([laser], rates=rates, clock=FakeClock())
+        run_until(scheduler, 1, 0.99)
+        commands = laser.connection.commands
+        assert commands.count("?FC") == 50
+        assert commands.count("?BPT") == 5
+        assert scheduler.get(laser, "base_plate_temperature") == 25.0
+        assert scheduler.get(laser, "fault_bitmask") == 0
+        assert scheduler.stats()[1].missed_deadlines == 0
+
+    def test_threads(self, make_laser):
+        """Test polling with one worker thread per bus."""
+        lasers = [make_laser(bus=1, address=1), make_laser(bus=2, address=1)]
+        with PollScheduler(lasers, rates={"fault_bitmask": 100}) as scheduler:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and any(
+                scheduler.get(laser, "fault_bitmask") is None for laser in lasers
+            ):
+                time.sleep(0.01)
+        assert [scheduler.get(laser, "fault_bitmask") for laser in lasers] == [0, 0]
+        assert all(stats.polls > 0 for stats in scheduler.stats().values())
+
+    def test_earliest_deadline_first(self, make_laser):
+        """Test that the task with the earliest deadline runs first."""
+        laser = make_laser(bus=1, address=1)
+        order = []
+        scheduler = PollScheduler(
+            [laser],
+            rates={"laser_hours": 1, "fault_bitmask": 100},
+            callback=lambda laser, name, value: order.append(name),
+        )
+        worker = scheduler._workers[1]
+        worker.run_once(worker._next())
+        assert order == ["fault_bitmask"]
+
+    def test_missed_deadlines(self, make_laser):
+        """Test that an overloaded bus reports missed deadlines without
+        affecting the other bus.
+
+        """
+        clock = FakeClock()
+        slow = make_laser(bus=1, address=1, connection=SlowConnection(clock))
+        fast = make_laser(bus=2, address=1)
+        rates = {"fault_bitmask": 400, "power": 400}
+        scheduler = PollScheduler([slow, fast], rates=rates, clock=clock)
+        run_until(scheduler, 1, 0.3)
+        clock.now = 0.0
+        run_until(scheduler, 2, 0.3)
+        stats = scheduler.stats()
+        # 800 polls/s of 5 ms each: the slow bus can do a quarter of them
+        assert stats[1].missed_deadlines > 0
+        assert stats[1].polls < stats[2].polls
+        assert stats[1].busy_time == pytest.approx(stats[1].polls * 0.005)
+        assert stats[2].missed_deadlines == 0
+
+    def test_remove(self, make_laser):
+        """Test that removed properties are no longer polled."""
+        laser = make_laser(bus=1, address=1)
+        rates = {"power": 100, "fault_bitmask": 100}
+        scheduler = PollScheduler([laser], rates=rates, clock=FakeClock())
+        run_until(scheduler, 1, 0.045)
+        scheduler.remove(laser, "power")
+        count = laser.connection.commands.count("?LP")
+        run_until(scheduler, 1, 0.095)
+        assert laser.connection.commands.count("?LP") == count > 0
+        assert laser.connection.commands.count("?FC") == 10
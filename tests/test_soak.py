@@ -0,0 +1,105 @@
+"""Tests for soak module."""
+
+import logging
+
+import pytest
+
+from vortran.emulation import EmulatedConnection
+from vortran.soak import (
+    FaultInjectingConnection,
+    SoakLimits,
+    SoakSample,
+    SoakTest,
+    check_degradation,
+    handler_count,
+)
+from vortran.usb import VortranDevice
+from vortran.usb_connection import USB_ReadWrite
+
+
+def sample(**kwargs):
+    values = dict(
+        elapsed=0.0,
+        transactions=1000,
+        failures=0,
+        exceptions=0,
+        throughput=1000.0,
+        p50=0.1,
+        p99=1.0,
+        handlers=1,
+        objects=10000,
+        rss=50 * 2**20,
+    )
+    values.update(kwargs)
+    return SoakSample(**values)
+
+
+def test_no_handler_per_instance():
+    """Test that connections don't add a console handler each."""
+    USB_ReadWrite(VortranDevice(0x201A, 0x1001, bus=1, address=1), 20)
+    before = handler_count()
+    for address in range(2, 50):
+        USB_ReadWrite(VortranDevice(0x201A, 0x1001, bus=1, address=address), 20)
+    assert handler_count() == before
+    assert len(logging.getLogger("console_logger").handlers) == 1
+
+
+class TestCheckDegradation:
+    """Tests for check_degradation function."""
+
+    def test_stable(self):
+        """Test that a steady run passes."""
+        assert check_degradation([sample() for _ in range(8)], SoakLimits()) == []
+
+    @pytest.mark.parametrize(
+        "change, metric",
+        [
+            ({"throughput": 500.0}, "throughput"),
+            ({"p99": 5.0}, "latency"),
+            ({"handlers": 3}, "handlers"),
+            ({"objects": 20000}, "objects"),
+            ({"rss": 100 * 2**20}, "RSS"),
+        ],
+    )
+    def test_degraded(self, change, metric):
+        """Test that each metric is checked."""
+        samples = [sample() for _ in range(4)] + [sample(**change) for _ in range(4)]
+        degraded = check_degradation(samples, SoakLimits())
+        assert len(degraded) == 1
+        assert metric in degraded[0]
+
+
+class TestFaultInjectingConnection:
+    """Tests for FaultInjectingConnection class."""
+
+    def test_is_emulated_laser(self):
+        """Test that without faults it behaves like the emulation."""
+        assert issubclass(FaultInjectingConnection, EmulatedConnection)
+        connection = FaultInjectingConnection(seed=1)
+        assert connection.injected == {"timeout": 0, "error": 0, "garble": 0}
+
+
+def test_short_soak(caplog):
+    """Test a short run with all fault types injected."""
+    caplog.set_level(logging.CRITICAL, logger="vortran")
+    test = SoakTest(
+        lasers=3,
+        duration=1.0,
+        interval=0.1,
+        timeout_rate=0.02,
+        error_rate=0.02,
+        garble_rate=0.02,
+        limits=SoakLimits(throughput_drop=0.9, latency_rise=10.0),
+    )
+    result = test.run()
+    # a slow sample can delay the next grid point, but the last sample
+    # is always taken at the end of the run
+    elapsed = [sample.elapsed for sample in result.samples]
+    assert len(elapsed) >= 2
+    assert elapsed == sorted(set(elapsed))
+    assert elapsed[-1] >= 1.0
+    assert all(result.injected.values())
+    assert result.instances > 3
+    assert sum(s.transactions for s in result.samples) > 100
+    assert result.samples[-1].handlers == result.samples[0].handlers
+    assert result.ok, result.degraded
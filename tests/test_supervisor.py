@@ -0,0 +1,113 @@
+"""Tests for supervisor module."""
+
+from unittest.mock import patch
+
+import pytest
+import usb.core
+
+from vortran.emulation import EmulatedConnection
+from vortran.laser import Laser
+from vortran.supervisor import ConnectionSupervisor
+from vortran.usb import VortranDevice
+
+
+class FakeBus:
+    """Replacement for usb.core.find over a list of emulated devices."""
+
+    def __init__(self, *devices):
+        self.devices = list(devices)
+
+    def find(self, find_all=False, backend=None, **kwargs):
+        found = [
+            d
+            for d in self.devices
+            if d.alive
+            and kwargs.get("bus", d.bus) == d.bus
+            and kwargs.get("address", d.address) == d.address
+        ]
+        if find_all:
+            return iter(found)
+        return found[0] if found else None
+
+
+def get_string(device, index):
+    return device.serial_number
+
+
+@pytest.fixture
+def bus():
+    fake = FakeBus(EmulatedConnection(bus=1, address=5))
+    with (
+        patch("usb.core.find", fake.find),
+        patch("usb.util.get_string", get_string),
+        patch("vortran.usb_connection.platform.system", return_value="Darwin"),
+    ):
+        yield fake
+
+
+@pytest.fixture
+def laser(bus):
+    laser = Laser(VortranDevice(0x201A, 0x1001, bus=1, address=5), 500, 0)
+    assert laser.open_connection()
+    return laser
+
+
+class TestConnectionSupervisor:
+    """Tests for ConnectionSupervisor class."""
+
+    def test_open_connection_records_serial(self, laser):
+        """Test that opening the connection stores the serial number."""
+        assert laser.is_connected
+        assert laser.serial_number == "EMU0001"
+        assert laser.connection.resets == 1
+
+    def test_reclaim_without_reset(self, laser):
+        """Test that a transient failure is fixed by re-claiming."""
+        supervisor = ConnectionSupervisor(laser, base_delay=0)
+        laser.is_connected = False
+
+        assert laser.power == 50.0
+        assert supervisor.metrics.reclaims == 1
+        assert supervisor.metrics.reconnects == 1
+        assert laser.connection.resets == 1
+
+    def test_reclaim_needs_status_reply(self, laser, monkeypatch):
+        """Test that re-claiming fails if the status request goes unanswered."""
+        laser.is_connected = False
+
+        def no_reply(*args):
+            raise usb.core.USBTimeoutError("Operation timed out", -7, 110)
+
+        monkeypatch.setattr(laser.connection, "read", no_reply)
+        assert not laser.reclaim()
+        assert not laser.is_connected
+
+    def test_disconnect_detected_on_send(self, laser):
+        """Test that a dead handle marks the connection as disconnected."""
+        laser.connection.alive = False
+        assert laser.send_usb("?LP") is None
+        assert not laser.is_connected
+        assert laser.disconnected_at is not None
+
+    def test_relocate_by_serial(self, bus, laser):
+        """Test following a device that re-enumerated at a new address."""
+        supervisor = ConnectionSupervisor(laser, base_delay=0)
+        laser.connection.alive = False
+        laser.send_usb("?LP")
+
+        bus.devices.append(EmulatedConnection(bus=1, address=9))
+        assert laser.power == 50.0
+        assert laser.address == 9
+        assert supervisor.metrics.relocations == 1
+        assert supervisor.metrics.reopens == 1
+        assert supervisor.metrics.last_downtime > 0
+
+    def test_gives_up_after_max_attempts(self, laser):
+        """Test backoff stops after max_attempts failed rounds."""
+        supervisor = ConnectionSupervisor(laser, base_delay=0, max_attempts=3)
+        laser.connection.alive = False
+        laser.send_usb("?LP")
+
+        assert laser.send_usb("?LP") is None
+        assert supervisor.metrics.failed_attempts == 3
+        assert supervisor.metrics.reconnects == 0
@@ -0,0 +1,100 @@
+"""Tests for telemetry module."""
+
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vortran.telemetry import (
+    FAULT_UNKNOWN,
+    TelemetryReader,
+    TelemetryWriter,
+)
+
+
+def fill(path, rows, chunk_size=10, flush_every=4):
+    writer = TelemetryWriter(path, chunk_size=chunk_size, flush_every=flush_every)
+    for i in range(rows):
+        writer.append(
+            float(i), base_plate_temperature=20 + i, power=i * 0.5, fault=i % 3
+        )
+    return writer
+
+
+class TestTelemetryWriter:
+    """Tests for TelemetryWriter class."""
+
+    def test_chunks_are_finalized(self, tmp_path):
+        """Test that full chunks are renamed and the rest on close."""
+        writer = fill(tmp_path, 25)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "chunk_000000",
+            "chunk_000001",
+            "chunk_000002.partial",
+        ]
+        writer.close()
+        counts = [c.count for c in TelemetryReader(tmp_path).chunks()]
+        assert counts == [10, 10, 5]
+
+    def test_missing_values(self, tmp_path):
+        """Test that None is stored as NaN / FAULT_UNKNOWN."""
+        with TelemetryWriter(tmp_path) as writer:
+            writer.append(1.0)
+        data = TelemetryReader(tmp_path).read()
+        assert math.isnan(data["power"][0])
+        assert data["fault"][0] == FAULT_UNKNOWN
+
+    def test_repair_after_crash(self, tmp_path):
+        """Test that a torn partial chunk is truncated and finalised."""
+        writer = fill(tmp_path, 13)
+        writer.flush()
+        partial = tmp_path / "chunk_000001.partial"
+        with open(partial / "power", "ab") as f:
+            f.write(b"\x00\x01\x02")  # torn write of the next row
+
+        writer = TelemetryWriter(tmp_path)
+        assert not partial.exists()
+        writer.append(100.0)
+        writer.close()
+        data = TelemetryReader(tmp_path).read()
+        assert list(data["timestamp"]) == list(range(13)) + [100.0]
+
+    def test_record_from_laser(self, tmp_path, make_laser):
+        """Test sampling a laser."""
+        laser = make_laser(values={"FC": "16"})
+        with TelemetryWriter(tmp_path) as writer:
+            writer.record(laser, timestamp=5.0)
+        data = TelemetryReader(tmp_path).read()
+        assert data["power"][0] == 50.0
+        assert data["current"][0] == 100.0
+        assert data["fault"][0] == 16
+
+
+class TestTelemetryReader:
+    """Tests for TelemetryReader class."""
+
+    def test_time_range_across_chunks(self, tmp_path):
+        """Test reading a range that spans chunk boundaries."""
+        fill(tmp_path, 35).close()
+        data = TelemetryReader(tmp_path).read(start=8, end=22)
+        assert list(data["timestamp"]) == list(range(8, 22))
+        assert data["fault"].dtype == np.uint32
+        np.testing.assert_array_equal(data["base_plate_temperature"], np.arange(28, 42))
+
+    def test_reads_unfinished_chunk(self, tmp_path):
+        """Test that flushed rows of the open chunk are visible."""
+        writer = fill(tmp_path, 14)
+        writer.flush()
+        reader = TelemetryReader(tmp_path)
+        assert len(reader.read()["timestamp"]) == 14
+        assert (
+            len(TelemetryReader(tmp_path, include_partial=False).read()["power"]) == 10
+        )
+
+    def test_empty_range(self, tmp_path):
+        """Test a range without samples."""
+        fill(tmp_path, 5).close()
+        data = TelemetryReader(tmp_path).read(start=100, columns=["power"])
+        assert list(data) == ["power"]
+        assert len(data["power"]) == 0
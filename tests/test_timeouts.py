@@ -0,0 +1,91 @@
+"""Tests for timeouts module."""
+
+import pytest
+
+from vortran.timeouts import AdaptiveTimeouts, command_key
+
+
+class TestCommandKey:
+    """Tests for command_key function."""
+
+    def test_query(self):
+        """Test that queries keep their name."""
+        assert command_key("?lp\r\n") == "?LP"
+
+    def test_setter(self):
+        """Test that setters drop their value."""
+        assert command_key("LP=050.0") == "LP="
+
+
+class TestAdaptiveTimeouts:
+    """Tests for AdaptiveTimeouts class."""
+
+    def test_default_until_min_samples(self):
+        """Test the default is used before enough data was seen."""
+        timeouts = AdaptiveTimeouts(default=1.0, min_samples=5)
+        for _ in range(4):
+            timeouts.observe("?LP", 0.01)
+        assert timeouts.timeout("?LP") == 1.0
+        timeouts.observe("?LP", 0.01)
+        assert timeouts.timeout("?LP") == pytest.approx(0.015)
+
+    def test_percentile_and_bounds(self):
+        """Test the budget follows the high percentile and is clamped."""
+        timeouts = AdaptiveTimeouts(
+            min_samples=1, percentile=90, margin=2, min_timeout=0.05, max_timeout=1
+        )
+        for latency in [0.01] * 9 + [0.2]:
+            timeouts.observe("?FD", latency)
+        assert timeouts.timeout("?FD") == pytest.approx(0.05)
+        for latency in [0.2] * 10:
+            timeouts.observe("?FD", latency)
+        assert timeouts.timeout("?FD") == pytest.approx(0.4)
+        timeouts.observe("?LI", 5.0)
+        assert timeouts.timeout("?LI") == 1
+
+    def test_backoff_after_timeout(self):
+        """Test that a timeout widens the budget until the next success."""
+        timeouts = AdaptiveTimeouts(min_samples=1, margin=1)
+        timeouts.observe("?LP", 0.1)
+        timeouts.timed_out("?LP")
+        timeouts.timed_out("?LP")
+        assert timeouts.timeout("?LP") == pytest.approx(0.4)
+        assert timeouts.timeouts_seen == {"?LP": 2}
+        timeouts.observe("?LP", 0.1)
+        assert timeouts.timeout("?LP") == pytest.approx(0.1)
+
+    def test_save_and_load_per_model(self, tmp_path):
+        """Test persisting latencies per device model."""
+        path = tmp_path / "timeouts.json"
+        timeouts = AdaptiveTimeouts(min_samples=1, margin=1)
+        timeouts.observe("?LP", 0.02)
+        timeouts.save(path, "488-50")
+        AdaptiveTimeouts().save(path, "405-100")
+
+        loaded = AdaptiveTimeouts(min_samples=1, margin=1)
+        assert loaded.load(path, "488-50")
+        assert loaded.timeout("?LP") == pytest.approx(0.02)
+        assert not AdaptiveTimeouts().load(path, "638-140")
+
+
+def test_laser_learns_timeouts(tmp_path, make_laser):
+    """Test that send_usb feeds observed latencies."""
+    laser = make_laser(1000)
+    path = tmp_path / "timeouts.json"
+
+    timeouts = laser.enable_adaptive_timeouts(path, min_samples=1)
+    assert laser.power == 50.0
+    assert timeouts.to_dict()["?LP"][0] < 1.0
+    laser.save_timeouts(path)
+
+    laser.enable_adaptive_timeouts(path, min_samples=1)
+    assert laser.timeouts.timeout("?LP") < 1.0
+
+
+def test_device_model(make_laser):
+    """Test that lasers of the same model share their key."""
+    laser = make_laser(1000)
+    other = make_laser(1000, {"LI": "OTHER UNIT"}, address=2)
+    assert laser.device_model == "488-100-1.0.0"
+    assert other.device_model == laser.device_model
+    assert make_laser(1000, {"RP": "50.0"}).device_model == "488-50-1.0.0"
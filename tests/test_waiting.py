@@ -0,0 +1,163 @@
+"""Tests for waiting module."""
+
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from vortran.status import LaserStatus
+from vortran.waiting import (
+    LaserPoller,
+    WaitCondition,
+    _Waiter,
+    fault_cleared,
+    get_poller,
+)
+
+
+def later(delay, action):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+
+class TestWaitUntil:
+    """Tests for Laser.wait_until and its helpers."""
+
+    def test_already_satisfied(self, laser):
+        """Test that a condition that holds returns after one poll."""
+        result = laser.wait_for_fault_cleared(timeout=1)
+        assert result.satisfied
+        assert result.polls == 1
+        assert result.value == 0
+
+    def test_warmup(self, laser):
+        """Test waiting for the warm-up bit to clear."""
+        laser.connection.values["FC"] = str(int(LaserStatus.WARMUP))
+        later(0.2, lambda: laser.connection.values.update(FC="0"))
+        result = laser.wait_for_warmup(timeout=2)
+        assert result
+        assert result.elapsed > 0.15
+        assert result.polls > 1
+
+    def test_timeout(self, laser):
+        """Test that a timeout returns an unsatisfied result."""
+        laser.connection.values["FC"] = str(int(LaserStatus.INTERLOCK_OPEN))
+        result = laser.wait_for_fault_cleared(timeout=0.2)
+        assert not result
+        assert result.value == int(LaserStatus.INTERLOCK_OPEN)
+        assert result.elapsed >= 0.2
+
+    def test_fault_cleared_ignores_states(self, laser):
+        """Test that standby and warm-up are not faults."""
+        laser.connection.values["FC"] = str(
+            int(LaserStatus.STANDBY | LaserStatus.WARMUP)
+        )
+        assert laser.wait_for_fault_cleared(timeout=1)
+        assert not laser.wait_until(fault_cleared(LaserStatus.STANDBY), timeout=0.1)
+
+    def test_power_settled(self, laser):
+        """Test waiting for the measured power to reach the setting."""
+        laser.connection.values.update(LPS="60.0", LP="50.0")
+
+        def ramp():
+            for power in (54, 57, 59, 59.9):
+                time.sleep(0.05)
+                laser.connection.values["LP"] = str(power)
+
+        later(0, ramp)
+        result = laser.wait_for_power(tolerance=0.01, timeout=2)
+        assert result
+        assert result.value == pytest.approx(59.9)
+
+    def test_power_hold(self, laser):
+        """Test that the power has to stay in range for ``hold``."""
+        result = laser.wait_for_power(setpoint=50.0, hold=0.1, timeout=1)
+        assert result
+        assert result.polls > 1
+
+
+class TestLaserPoller:
+    """Tests for LaserPoller class."""
+
+    def test_shared_per_laser(self, laser):
+        """Test that all waiters of a laser use the same poller."""
+        assert get_poller(laser) is get_poller(laser)
+
+    def test_laser_collected(self, make_laser):
+        """Test that the poller doesn't keep its laser alive."""
+        laser = make_laser()
+        values = laser.connection.values
+        values["FC"] = str(int(LaserStatus.INTERLOCK_OPEN))
+        later(0.05, lambda: values.update(FC="0"))
+        assert laser.wait_for_fault_cleared(timeout=1)
+        thread = get_poller(laser)._thread
+        collected = weakref.ref(laser)
+        del laser
+        gc.collect()
+        assert collected() is None
+        if thread is not None:
+            thread.join(1)
+
+    def test_shared_reads(self, laser, monkeypatch):
+        """Test that waiters on the same property share the queries."""
+        poller = LaserPoller(laser, min_interval=0.02, max_interval=0.02)
+        laser.connection.values["FC"] = str(int(LaserStatus.INTERLOCK_OPEN))
+        # hold the first read until all waiters are registered, so the
+        # others are due together from then on
+        all_waiting = threading.Event()
+        read = poller._read
+
+        def gated_read(props):
+            all_waiting.wait(1)
+            return read(props)
+
+        monkeypatch.setattr(poller, "_read", gated_read)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(poller.wait(fault_cleared(), 0.3))
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while len(poller._waiters) < 3 and any(t.is_alive() for t in threads):
+            time.sleep(0.001)
+        all_waiting.set()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 3
+        polls = sum(result.polls for result in results)
+        assert poller.reads < polls
+        assert laser.connection.commands.count("?FC") == poller.reads
+
+    def test_backoff(self, laser):
+        """Test that an unchanged value is polled less and less often,
+        and at the minimum interval again once it changes.
+
+        """
+        poller = LaserPoller(laser, min_interval=0.01, max_interval=0.2)
+        never = WaitCondition("never", "fault_bitmask", lambda value: False)
+        waiter = _Waiter(never, poller)
+        intervals = []
+        for now in range(10):
+            waiter.update(now, 0, poller)
+            intervals.append(waiter.interval)
+        assert intervals[0] == pytest.approx(0.015)
+        assert intervals == sorted(intervals)
+        assert intervals[-1] == 0.2
+        waiter.update(10, 1, poller)
+        assert waiter.interval == 0.01
+        assert waiter.polls == 11 and not waiter.done.is_set()
+
+    def test_poller_thread_stops(self, laser):
+        """Test that the polling thread exits once nobody waits."""
+        poller = LaserPoller(laser)
+        assert poller.wait(fault_cleared(), timeout=1)
+        thread = poller._thread
+        if thread is not None:
+            thread.join(1)
+        assert poller._thread is None
@@ -0,0 +1,181 @@
+"""Tests for watchdog module."""
+
+import threading
+import time
+
+import pytest
+
+from vortran.faults import FaultWatcher
+from vortran.manager import PipelinedLasers
+from vortran.status import LaserStatus
+from vortran.watchdog import SafetyWatchdog
+
+
+@pytest.fixture
+def lasers(make_laser):
+    return [make_laser(values={"LE": "1"}, address=a) for a in (1, 2)]
+
+
+class TestEmergencyOff:
+    """Tests for USB_ReadWrite.emergency_off."""
+
+    def test_sends_pre_encoded_frame(self, lasers):
+        """Test that LE=0 is written without a flush or status poll."""
+        laser = lasers[0]
+        assert laser.emergency_off()
+        assert laser.connection.commands == ["LE=0"]
+        assert laser.connection.values["LE"] == "0"
+        assert not laser.preempt.is_set()
+        assert laser.emission_inhibited.is_set()
+
+    def test_preempts_transaction(self, make_laser):
+        """Test that a transaction waiting for its response gives up."""
+        laser = make_laser(2000, {"LE": "1"})
+        laser.connection.late_responses = 1000
+        results = []
+        thread = threading.Thread(target=lambda: results.append(laser.send_usb("?LP")))
+        thread.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        assert laser.emergency_off()
+        thread.join()
+        assert time.monotonic() - start < 0.5
+        assert results == [None]
+        assert laser.connection.values["LE"] == "0"
+
+    def test_refuses_emission_on(self, lasers):
+        """Test that LE=1 is refused until allow_emission()."""
+        laser = lasers[0]
+        laser.emergency_off()
+        assert laser.send_usb("LE=1") is None
+        assert laser.connection.values["LE"] == "0"
+        assert laser.send_usb("?LP") is not None
+        laser.allow_emission()
+        assert laser.send_usb("LE=1") is not None
+        assert laser.connection.values["LE"] == "1"
+
+    def test_raced_emission_on(self, lasers, monkeypatch):
+        """Test that an emergency off during an LE=1 write wins."""
+        laser = lasers[0]
+        write = laser.connection.ctrl_transfer
+
+        def emergency_during_write(*args):
+            result = write(*args)
+            if laser.connection.commands[-1:] == ["LE=1"]:
+                laser.emission_inhibited.set()
+            return result
+
+        monkeypatch.setattr(laser.connection, "ctrl_transfer", emergency_during_write)
+        laser.send_usb("LE=1")
+        assert laser.connection.commands[-2:] == ["LE=1", "LE=0"]
+        assert laser.connection.values["LE"] == "0"
+
+    def test_disconnected(self, lasers):
+        """Test that a failed write is reported."""
+        lasers[0].connection.alive = False
+        assert not lasers[0].emergency_off()
+
+
+class TestSafetyWatchdog:
+    """Tests for SafetyWatchdog class."""
+
+    def test_trigger_all_lasers(self, lasers):
+        """Test that a trigger shuts off every laser and is measured."""
+        watchdog = SafetyWatchdog(lasers)
+        seen = []
+        watchdog.add_callback(seen.append)
+        shutdowns = watchdog.trigger("interlock")
+        assert [s.ok for s in shutdowns] == [True, True]
+        assert all(laser.connection.values["LE"] == "0" for laser in lasers)
+        assert seen == shutdowns
+        assert watchdog.tripped.is_set()
+        assert 0 < watchdog.max_latency < 0.1
+
+    def test_busy_laser_does_not_delay_others(self, lasers):
+        """Test that waiting for a busy laser's lock comes after every
+        frame is written.
+
+        """
+        locked, done = threading.Event(), threading.Event()
+
+        def busy():
+            with lasers[0].lock:
+                locked.set()
+                done.wait(1)
+
+        thread = threading.Thread(target=busy)
+        thread.start()
+        locked.wait(1)
+        shutdowns = SafetyWatchdog(lasers).trigger()
+        done.set()
+        thread.join()
+        assert shutdowns[1].latency < 0.02
+        assert all(laser.connection.values["LE"] == "0" for laser in lasers)
+
+    def test_emission_stays_off(self, lasers):
+        """Test that LE=1 is refused after a trip, also when sent to the
+        group, and accepted again after reset.
+
+        """
+        watchdog = SafetyWatchdog(lasers)
+        manager = PipelinedLasers(None, lasers)
+        watchdog.trigger()
+        assert lasers[0].send_usb("LE=1") is None
+        assert manager.send_all("LE=1") == [None, None]
+        assert all(laser.connection.values["LE"] == "0" for laser in lasers)
+        assert all("LE=1" not in laser.connection.commands for laser in lasers)
+        watchdog.reset()
+        assert all(manager.send_all("LE=1"))
+        assert all(laser.connection.values["LE"] == "1" for laser in lasers)
+
+    def test_heartbeat_timeout(self, lasers):
+        """Test that a missing heartbeat trips the watchdog."""
+        with SafetyWatchdog(lasers, heartbeat_timeout=0.1) as watchdog:
+            for _ in range(5):
+                time.sleep(0.04)
+                watchdog.heartbeat()
+            assert not watchdog.tripped.is_set()
+            assert watchdog.tripped.wait(1)
+        assert watchdog.shutdowns[0].reason == "heartbeat timeout"
+        assert lasers[1].connection.values["LE"] == "0"
+
+    def test_check(self, lasers):
+        """Test that a check returning True trips once."""
+        door_open = threading.Event()
+        with SafetyWatchdog(lasers) as watchdog:
+            watchdog.add_check(door_open.is_set, "door")
+            time.sleep(0.05)
+            assert not watchdog.tripped.is_set()
+            door_open.set()
+            assert watchdog.tripped.wait(1)
+            time.sleep(0.05)
+        assert [s.reason for s in watchdog.shutdowns] == ["check door"] * 2
+
+    def test_failing_check_trips(self, lasers):
+        """Test that a check that raises counts as fired."""
+        watchdog = SafetyWatchdog(lasers)
+        watchdog.add_check(lambda: 1 / 0, "broken")
+        assert watchdog.check() == "check broken"
+
+    def test_fault_bits(self, lasers):
+        """Test tripping on a fault reported by a FaultWatcher."""
+        watchdog = SafetyWatchdog(lasers)
+        watcher = FaultWatcher(lasers[0], fetch_text=False)
+        watchdog.watch_faults(watcher)
+        watcher.poll()
+        lasers[0].connection.values["FC"] = str(int(LaserStatus.WARMUP))
+        watcher.poll()
+        assert not watchdog.tripped.is_set()
+        lasers[0].connection.values["FC"] = str(int(LaserStatus.DIODE_OVER_CURRENT))
+        watcher.poll()
+        assert watchdog.tripped.is_set()
+        assert watchdog.shutdowns[0].reason == "fault DIODE_OVER_CURRENT"
+        assert lasers[1].connection.values["LE"] == "0"
+
+    def test_reset(self, lasers):
+        """Test that reset re-arms the watchdog."""
+        watchdog = SafetyWatchdog(lasers)
+        watchdog.trigger()
+        watchdog.reset()
+        assert not watchdog.tripped.is_set()
+        assert watchdog.check() is None